@@ -0,0 +1,89 @@
+"""
+Parse time and peak memory of CSVParser's dictionary rows against
+CSVColumnarParser's columns (and pandas DataFrames and pyarrow Tables, when
+they are installed), on a ten column upload.
+
+Run from the repository root:
+
+    $ python benchmarks/columnar_parse.py [rows]
+"""
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'testsettings')
+
+import django
+django.setup()
+
+from rest_framework_csv.parsers import CSVColumnarParser, CSVParser
+
+
+def generate_csv(count):
+    categories = ['pending', 'active', 'closed', 'archived']
+    lines = ['id,name,category,amount,ratio,active,day,score,code,notes']
+    for i in range(count):
+        lines.append('%d,Item %d,%s,%d.%02d,%f,%s,2024-%02d-%02d,%d,C%05d,' % (
+            i, i, categories[i % 4], i % 1000, i % 100, i / 7, 'true' if i % 2 else 'false',
+            i % 12 + 1, i % 28 + 1, i % 100, i % 50000))
+    return ('\r\n'.join(lines) + '\r\n').encode('utf-8')
+
+
+def run(parser, body, parser_context):
+    # Time one parse, then trace the memory of another (tracing slows it down).
+    gc.collect()
+    start = time.perf_counter()
+    data = parser.parse(BytesIO(body), parser_context=parser_context)
+    elapsed = time.perf_counter() - start
+    data = None
+
+    gc.collect()
+    tracemalloc.start()
+    data = parser.parse(BytesIO(body), parser_context=parser_context)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, data
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    body = generate_csv(count)
+    column_types = {'id': 'int', 'amount': 'decimal', 'ratio': 'float', 'active': 'bool',
+                    'day': 'date', 'score': 'int'}
+    configurations = [
+        ('CSVParser, dict rows', CSVParser(), {}),
+        ('CSVParser, compact rows', CSVParser(), {'compact_rows': True}),
+        ('CSVColumnarParser', CSVColumnarParser(), {}),
+        ('CSVParser, typed', CSVParser(), {'column_types': column_types}),
+        ('CSVColumnarParser, typed', CSVColumnarParser(), {'column_types': column_types}),
+    ]
+    try:
+        import pandas  # noqa
+        configurations.append(('CSVColumnarParser, pandas', CSVColumnarParser(),
+                               {'columnar_format': 'pandas'}))
+    except ImportError:
+        pass
+    try:
+        import pyarrow
+        configurations.append(('CSVColumnarParser, arrow', CSVColumnarParser(),
+                               {'columnar_format': 'arrow'}))
+    except ImportError:
+        pyarrow = None
+
+    print('%d rows x 10 columns, %.1f MB' % (count, len(body) / 1e6))
+    print('%-28s %10s %12s' % ('configuration', 'seconds', 'peak MB'))
+    for name, parser, parser_context in configurations:
+        elapsed, peak, data = run(parser, body, parser_context)
+        if pyarrow is not None and isinstance(data, pyarrow.Table):
+            # Arrow allocates its buffers outside of Python's allocator.
+            peak += pyarrow.default_memory_pool().max_memory()
+        data = None
+        print('%-28s %10.3f %12.1f' % (name, elapsed, peak / 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Render time of CSVRenderer for columnar data passed directly, against the
+same data converted into a list of dictionaries first. Uses a pandas
+DataFrame when pandas is installed, and OrderedColumns otherwise.
+
+Run from the repository root:
+
+    $ python benchmarks/columnar_render.py [rows]
+"""
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'testsettings')
+
+import django
+django.setup()
+
+from rest_framework_csv.orderedrows import OrderedColumns
+from rest_framework_csv.renderers import CSVRenderer, CSVStreamingRenderer
+
+HEADER = ['id', 'name', 'category', 'amount', 'ratio', 'active', 'score', 'code']
+
+
+def generate_columns(count):
+    categories = ['pending', 'active', 'closed', 'archived']
+    columns = [
+        list(range(count)),
+        ['Item %d' % i for i in range(count)],
+        [categories[i % 4] for i in range(count)],
+        [i % 1000 for i in range(count)],
+        [i / 7 for i in range(count)],
+        [i % 2 == 0 for i in range(count)],
+        [i % 100 for i in range(count)],
+        ['C%05d' % (i % 50000) for i in range(count)],
+    ]
+    return OrderedColumns(HEADER, columns, count)
+
+
+def best_of(repeat, run):
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = run()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    data = generate_columns(count)
+    try:
+        import pandas
+        data = pandas.DataFrame(data)
+        to_records = lambda: data.to_dict('records')
+    except ImportError:
+        to_records = lambda: [dict(zip(HEADER, row)) for row in zip(*data.values())]
+
+    def streaming():
+        renderer = CSVStreamingRenderer()
+        return b''.join(renderer.render(data, renderer_context={'chunk_size': 1000}))
+
+    configurations = [
+        ('records with header', lambda: CSVRenderer().render(to_records(), renderer_context={'header': HEADER})),
+        ('columnar', lambda: CSVRenderer().render(data)),
+        ('columnar streaming', streaming),
+    ]
+
+    print('%d rows x %d columns (%s)' % (count, len(HEADER), type(data).__name__))
+    print('%-22s %10s %10s' % ('configuration', 'seconds', 'speedup'))
+    baseline = expected = None
+    for name, run in configurations:
+        elapsed, dump = best_of(3, run)
+        if baseline is None:
+            baseline, expected = elapsed, dump
+        assert dump == expected, name
+        print('%-22s %10.3f %9.2fx' % (name, elapsed, baseline / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Time and peak Python memory of reading an uploaded CSV file twice (e.g. once
+to validate it and once to save it) with CSVParser, which holds the parsed
+rows, and with CSVMappedParser, which parses the memory-mapped file again on
+each pass.
+
+Run from the repository root:
+
+    $ python benchmarks/mapped_parse.py [rows]
+"""
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from tempfile import TemporaryFile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'testsettings')
+
+import django
+django.setup()
+
+from rest_framework_csv.parsers import CSVMappedParser, CSVParser
+
+
+def generate_file(count):
+    file = TemporaryFile()
+    file.write(b'id,name,email,category,score,active,note\r\n')
+    categories = ['pending', 'active', 'closed', 'archived']
+    for i in range(count):
+        file.write(('%d,Item %d,user%d@example.com,%s,%s,%s,"Note, with a comma %d"\r\n' % (
+            i, i, i, categories[i % 4], i * 0.5, i % 2 == 0, i)).encode('utf-8'))
+    file.flush()
+    return file
+
+
+def read_twice(parser, file, compact_rows):
+    file.seek(0)
+    data = parser.parse(file, parser_context={'compact_rows': compact_rows})
+    validated = sum(1 for row in data if row['id'])
+    saved = sum(1 for row in data if row['email'])
+    assert validated == saved
+    if hasattr(data, 'close'):
+        data.close()
+    return saved
+
+
+def measure(parser, file, compact_rows):
+    times = []
+    for _ in range(3):
+        gc.collect()
+        start = time.perf_counter()
+        read_twice(parser, file, compact_rows)
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    read_twice(parser, file, compact_rows)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(times), peak
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    file = generate_file(count)
+    print('%d rows, %.1f MB' % (count, file.tell() / 1e6))
+    print('%-24s %10s %12s' % ('parser', 'seconds', 'peak MB'))
+    for compact_rows in (False, True):
+        for parser in (CSVParser(), CSVMappedParser()):
+            elapsed, peak = measure(parser, file, compact_rows)
+            name = '%s%s' % (type(parser).__name__, ', compact' if compact_rows else '')
+            print('%-24s %10.3f %12.1f' % (name, elapsed, peak / 1e6))
+
+
+if __name__ == '__main__':
+    main()
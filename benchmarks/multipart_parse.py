@@ -0,0 +1,94 @@
+"""
+Time and peak Python memory of importing a CSV file uploaded with a form,
+with DRF's MultiPartParser followed by CSVStreamingParser on the uploaded
+file, and with CSVMultiPartParser, which parses the file as the request
+body is read.
+
+Run from the repository root:
+
+    $ python benchmarks/multipart_parse.py [rows]
+"""
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'testsettings')
+
+import django
+django.setup()
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from rest_framework.parsers import MultiPartParser
+from rest_framework.test import APIRequestFactory
+
+from rest_framework_csv.parsers import CSVMultiPartParser, CSVStreamingParser
+
+
+def generate_body(count):
+    lines = ['id,name,email,category,score,active,note']
+    categories = ['pending', 'active', 'closed', 'archived']
+    for i in range(count):
+        lines.append('%d,Item %d,user%d@example.com,%s,%s,%s,"Note, with a comma %d"' % (
+            i, i, i, categories[i % 4], i * 0.5, i % 2 == 0, i))
+    csv_file = SimpleUploadedFile('items.csv', ('\r\n'.join(lines) + '\r\n').encode('utf-8'))
+    return encode_multipart(BOUNDARY, {'source': 'benchmark', 'file': csv_file})
+
+
+def make_request(body):
+    # Only the headers of the request are used; the body is read from a
+    # separate stream.
+    request = APIRequestFactory().post('/', b'', content_type=MULTIPART_CONTENT)
+    request.META['CONTENT_LENGTH'] = str(len(body))
+    return request
+
+
+def upload_then_parse(body):
+    request = make_request(body)
+    result = MultiPartParser().parse(BytesIO(body), MULTIPART_CONTENT, {'request': request})
+    return CSVStreamingParser().parse(result.files['file'])
+
+
+def parse_while_reading(body):
+    request = make_request(body)
+    result = CSVMultiPartParser().parse(BytesIO(body), MULTIPART_CONTENT, {'request': request})
+    return result.files['file']
+
+
+def run(parse, body):
+    return sum(1 for row in parse(body) if row['id'])
+
+
+def measure(parse, body):
+    times = []
+    for _ in range(3):
+        gc.collect()
+        start = time.perf_counter()
+        run(parse, body)
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    run(parse, body)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(times), peak
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    body = generate_body(count)
+    print('%d rows, %.1f MB' % (count, len(body) / 1e6))
+    print('%-36s %10s %12s' % ('parser', 'seconds', 'peak MB'))
+    for name, parse in [('MultiPartParser + CSVStreamingParser', upload_then_parse),
+                        ('CSVMultiPartParser', parse_while_reading)]:
+        elapsed, peak = measure(parse, body)
+        print('%-36s %10.3f %12.1f' % (name, elapsed, peak / 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Parse time of CSVParser serially and in parallel, with process and thread
+pools of different sizes. 'main cpu' is the CPU time of the main process,
+which is what the parse time comes down to with enough cores.
+
+Run from the repository root:
+
+    $ python benchmarks/parallel_parse.py [rows]
+"""
+import gc
+import os
+import sys
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'testsettings')
+
+import django
+django.setup()
+
+from rest_framework_csv.parsers import CSVParser
+
+
+def generate_body(count):
+    lines = ['id,name,email,category,score,active,note']
+    categories = ['pending', 'active', 'closed', 'archived']
+    for i in range(count):
+        lines.append('%d,Item %d,user%d@example.com,%s,%s,%s,"Note, with a comma %d"' % (
+            i, i, i, categories[i % 4], i * 0.5, i % 2 == 0, i))
+    return ('\r\n'.join(lines) + '\r\n').encode('utf-8')
+
+
+def run(body, workers=None, executor='process', compact_rows=False):
+    parser = CSVParser()
+    parser.parallel_workers = workers
+    parser.parallel_executor = executor
+    parser.parallel_threshold = 1024 * 1024
+    parser.parallel_chunk_size = max(len(body) // (4 * (workers or 1)), 1024 * 1024)
+    context = {'compact_rows': compact_rows}
+    # Warm up the pool, so that starting the workers isn't counted.
+    parser.parse(BytesIO(body[:2 * 1024 * 1024].rpartition(b'\n')[0] + b'\n'), parser_context=context)
+
+    times = []
+    for _ in range(3):
+        gc.collect()
+        start, cpu_start = time.perf_counter(), time.process_time()
+        data = parser.parse(BytesIO(body), parser_context=context)
+        times.append((time.perf_counter() - start, time.process_time() - cpu_start))
+    return min(times) + (data,)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    body = generate_body(count)
+    configurations = [('serial', None, 'process')]
+    for executor in ('process', 'thread'):
+        for workers in (1, 2, 4, 8):
+            configurations.append(('%s x %d' % (executor, workers), workers, executor))
+
+    print('%d rows, %.1f MB, %d cores' % (count, len(body) / 1e6, os.cpu_count()))
+    for compact_rows in (False, True):
+        print('%-14s %10s %10s %10s' % ('compact rows' if compact_rows else 'dict rows',
+                                         'seconds', 'speedup', 'main cpu'))
+        baseline = expected = None
+        for name, workers, executor in configurations:
+            elapsed, cpu, data = run(body, workers, executor, compact_rows)
+            if baseline is None:
+                baseline, expected = elapsed, data
+            assert data == expected
+            print('%-14s %10.3f %9.2fx %10.3f' % (name, elapsed, baseline / elapsed, cpu))
+            del data
+
+
+if __name__ == '__main__':
+    main()
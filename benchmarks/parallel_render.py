@@ -0,0 +1,64 @@
+"""
+Render time of CSVRenderer serially and in parallel, with process and thread
+pools of different sizes.
+
+Run from the repository root:
+
+    $ python benchmarks/parallel_render.py [rows]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'testsettings')
+
+import django
+django.setup()
+
+from rest_framework_csv.renderers import CSVRenderer
+
+
+HEADER = ['id', 'name', 'email', 'owner.id', 'owner.name', 'score', 'active']
+
+
+def generate_rows(count):
+    return [{'id': i, 'name': 'Item %d' % i, 'email': 'user%d@example.com' % i,
+             'owner': {'id': i % 100, 'name': 'Owner %d' % (i % 100)},
+             'score': i * 0.5, 'active': i % 2 == 0}
+            for i in range(count)]
+
+
+def run(data, workers=None, executor='process'):
+    renderer = CSVRenderer()
+    renderer.header = HEADER
+    renderer.parallel_workers = workers
+    renderer.parallel_executor = executor
+    # Warm up the pool, so that starting the workers isn't counted.
+    renderer.render(data[:renderer.parallel_threshold])
+    start = time.perf_counter()
+    dump = renderer.render(data)
+    return time.perf_counter() - start, dump
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    data = generate_rows(count)
+    configurations = [('serial', None, 'process')]
+    for executor in ('process', 'thread'):
+        for workers in (1, 2, 4, 8):
+            configurations.append(('%s x %d' % (executor, workers), workers, executor))
+
+    print('%d rows, %d cores' % (count, os.cpu_count()))
+    print('%-14s %10s %10s' % ('configuration', 'seconds', 'speedup'))
+    baseline = expected = None
+    for name, workers, executor in configurations:
+        elapsed, dump = run(data, workers, executor)
+        if baseline is None:
+            baseline, expected = elapsed, dump
+        assert dump == expected
+        print('%-14s %10.3f %9.2fx' % (name, elapsed, baseline / elapsed))
+
+
+if __name__ == '__main__':
+    main()
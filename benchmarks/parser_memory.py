@@ -0,0 +1,91 @@
+"""
+Peak memory and parse time of CSVParser with dictionary rows and compact
+rows, on a wide (50 column) upload.
+
+Run from the repository root:
+
+    $ python benchmarks/parser_memory.py [rows] [--unique]
+"""
+import os
+import sys
+import time
+import tracemalloc
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'testsettings')
+
+import django
+django.setup()
+
+from rest_framework_csv.parsers import CSVParser, CSVStreamingParser
+
+
+COLUMNS = 50
+
+
+def generate_csv(count, unique=False):
+    """
+    Generate a CSV body. By default the columns look like typical exports:
+    a mix of ids, flags, categories, small numbers, blanks, and free text.
+    With unique=True every cell holds a different number.
+    """
+    categories = ['pending', 'active', 'closed', 'archived']
+    lines = [','.join('column_%d' % column for column in range(COLUMNS))]
+    for i in range(count):
+        if unique:
+            cells = [str(i * COLUMNS + column) for column in range(COLUMNS)]
+        else:
+            cells = [str(i)]
+            for column in range(1, COLUMNS):
+                kind = column % 5
+                if kind == 0:
+                    cells.append(categories[(i + column) % 4])
+                elif kind == 1:
+                    cells.append(str((i * column) % 10))
+                elif kind == 2:
+                    cells.append('')
+                elif kind == 3:
+                    cells.append('true' if (i + column) % 2 else 'false')
+                else:
+                    cells.append('Item %d-%d' % (i, column))
+        lines.append(','.join(cells))
+    return ('\r\n'.join(lines) + '\r\n').encode('utf-8')
+
+
+def run(parser, body, parser_context):
+    stream = BytesIO(body)
+    tracemalloc.start()
+    start = time.perf_counter()
+    data = parser.parse(stream, parser_context=parser_context)
+    if isinstance(parser, CSVStreamingParser):
+        # Keep the rows, as a consumer that validates everything would.
+        data = list(data)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, len(data)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    unique = '--unique' in sys.argv
+    body = generate_csv(count, unique)
+    configurations = [
+        ('CSVParser, dict rows', CSVParser(), {}),
+        ('CSVParser, compact rows', CSVParser(), {'compact_rows': True}),
+        ('CSVStreamingParser, dict rows', CSVStreamingParser(), {}),
+        ('CSVStreamingParser, compact rows', CSVStreamingParser(), {'compact_rows': True}),
+    ]
+
+    print('%d rows x %d columns%s, %.1f MB' % (
+        count, COLUMNS, ' (unique cells)' if unique else '', len(body) / 1e6))
+    print('%-34s %10s %12s' % ('configuration', 'seconds', 'peak MB'))
+    for name, parser, parser_context in configurations:
+        elapsed, peak, rows = run(parser, body, parser_context)
+        assert rows == count
+        print('%-34s %10.3f %12.1f' % (name, elapsed, peak / 1e6))
+
+
+if __name__ == '__main__':
+    main()
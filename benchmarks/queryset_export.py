@@ -0,0 +1,63 @@
+"""
+Render time of a queryset export through the serializer, and straight from
+values_list().
+
+Run from the repository root:
+
+    $ python benchmarks/queryset_export.py [rows]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'testsettings')
+
+import django
+django.setup()
+
+from django.db import connection
+
+from rest_framework_csv.renderers import CSVRenderer
+from rest_framework_csv.tests import Session, SessionSerializer, Venue
+
+
+HEADER = ['id', 'title', 'venue.name', 'venue.capacity']
+
+
+def create_data(count):
+    with connection.schema_editor() as editor:
+        editor.create_model(Venue)
+        editor.create_model(Session)
+    venues = Venue.objects.bulk_create(
+        [Venue(name='Venue %d' % i, capacity=i * 10) for i in range(100)])
+    Session.objects.bulk_create(
+        [Session(title='Session %d' % i, venue=venues[i % 100]) for i in range(count)],
+        batch_size=5000)
+
+
+def run(render):
+    start = time.perf_counter()
+    dump = render()
+    return time.perf_counter() - start, dump
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    create_data(count)
+    renderer = CSVRenderer()
+    renderer.header = HEADER
+    queryset = Session.objects.select_related('venue').order_by('pk')
+
+    print('%d rows' % count)
+    print('%-14s %10s' % ('configuration', 'seconds'))
+    serializer_time, expected = run(
+        lambda: renderer.render(SessionSerializer(queryset, many=True).data))
+    print('%-14s %10.3f' % ('serializer', serializer_time))
+    values_time, dump = run(lambda: renderer.render(queryset))
+    assert dump == expected
+    print('%-14s %10.3f %9.1fx' % ('values_list', values_time, serializer_time / values_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Peak memory and render time of CSVRenderer.render, relative to the size of
+the rendered output.
+
+Run from the repository root:
+
+    $ python benchmarks/render_memory.py [megabytes] [encoding]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'testsettings')
+
+import django
+django.setup()
+
+from rest_framework_csv.renderers import CSVRenderer
+
+
+HEADER = ['id', 'name', 'description']
+
+# Every item shares one long description, so that the output can be large
+# without the data taking up as much memory.
+DESCRIPTION = 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 16
+
+
+def main():
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    encoding = sys.argv[2] if len(sys.argv) > 2 else 'utf-8'
+    count = megabytes * 10 ** 6 // (len(DESCRIPTION) + 20)
+    data = [{'id': i, 'name': 'Item %d' % i, 'description': DESCRIPTION}
+            for i in range(count)]
+    renderer = CSVRenderer()
+    renderer_context = {'header': HEADER, 'encoding': encoding}
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    dump = renderer.render(data, renderer_context=renderer_context)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    print('%d rows, %.1f MB of %s output' % (count, len(dump) / 1e6, encoding))
+    print('%10s %12s %16s' % ('seconds', 'peak MB', 'peak / output'))
+    print('%10.3f %12.1f %16.2f' % (elapsed, peak / 1e6, peak / len(dump)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Renders per second of CSVRenderer for small responses, as served at high
+request rates, with and without sharing compiled flatteners between renders
+(the cache is cleared before each render to measure the latter).
+
+Run from the repository root:
+
+    $ python benchmarks/small_renders.py [renders]
+"""
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'testsettings')
+
+import django
+django.setup()
+
+from rest_framework_csv.flatteners import shared_shapes
+from rest_framework_csv.renderers import CSVRenderer
+
+HEADER = ['id', 'name', 'owner.id', 'owner.name', 'score']
+LABELS = {'id': 'ID', 'owner.name': 'Owner'}
+
+
+def generate_rows(count):
+    return [{'id': i, 'name': 'Item %d' % i, 'owner': {'id': i % 10, 'name': 'Owner %d' % (i % 10)},
+             'score': i / 7} for i in range(count)]
+
+
+def best_of(repeat, renders, run):
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        for _ in range(renders):
+            run()
+        times.append(time.perf_counter() - start)
+    return renders / min(times)
+
+
+def main():
+    renders = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    renderer = CSVRenderer()
+    context = {'header': HEADER, 'labels': LABELS}
+
+    print('%-24s %12s %12s %10s' % ('configuration', 'unshared/s', 'shared/s', 'speedup'))
+    for count, renderer_context in [(1, context), (10, context), (10, {}), (100, context)]:
+        data = generate_rows(count)
+
+        def render():
+            return renderer.render(data, renderer_context=renderer_context)
+
+        def render_unshared():
+            shared_shapes.cache_clear()
+            return render()
+
+        unshared = best_of(3, renders, render_unshared)
+        shared = best_of(3, renders, render)
+        name = '%d rows%s' % (count, ', header + labels' if renderer_context else '')
+        print('%-24s %12.0f %12.0f %9.2fx' % (name, unshared, shared, shared / unshared))
+
+
+if __name__ == '__main__':
+    main()
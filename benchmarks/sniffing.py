@@ -0,0 +1,74 @@
+"""
+Overhead of detecting the delimiter (sniff_dialect) when parsing, compared
+to passing the delimiter: with the detected delimiter cached (the same
+header as an earlier upload), and without (the cache is cleared before each
+parse).
+
+Run from the repository root:
+
+    $ python benchmarks/sniffing.py [parses]
+"""
+import gc
+import os
+import sys
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'testsettings')
+
+import django
+django.setup()
+
+from rest_framework_csv.dialects import dialect_cache
+from rest_framework_csv.parsers import CSVParser, CSVStreamingParser
+
+
+def generate_body(count, ambiguous=False):
+    lines = ['id;name;email;category;%s;active;note' % ('score|rank' if ambiguous else 'score')]
+    categories = ['pending', 'active', 'closed', 'archived']
+    for i in range(count):
+        lines.append('%d;Item %d;user%d@example.com;%s;%s;%s;"Note; with a semicolon %d"' % (
+            i, i, i, categories[i % 4], str(i * 0.5).replace('.', ','), i % 2 == 0, i))
+    return ('\r\n'.join(lines) + '\r\n').encode('utf-8')
+
+
+def best_of(repeat, parses, run):
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        for _ in range(parses):
+            run()
+        times.append(time.perf_counter() - start)
+    return min(times) / parses
+
+
+def main():
+    parses = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print('%-40s %12s %12s %12s' % ('body', 'given ms', 'uncached ms', 'cached ms'))
+    for parser_class in (CSVParser, CSVStreamingParser):
+        for count, ambiguous in [(10, False), (1000, False), (100000, False),
+                                 (10, True), (1000, True)]:
+            body = generate_body(count, ambiguous)
+            parser = parser_class()
+            repeat_parses = max(parses * 10 // count, 1)
+
+            def parse(parser_context):
+                data = parser.parse(BytesIO(body), parser_context=parser_context)
+                for row in data:
+                    pass
+
+            def parse_uncached():
+                dialect_cache.clear()
+                parse({'sniff_dialect': True})
+
+            given = best_of(5, repeat_parses, lambda: parse({'delimiter': ';'}))
+            uncached = best_of(5, repeat_parses, parse_uncached)
+            cached = best_of(5, repeat_parses, lambda: parse({'sniff_dialect': True}))
+            name = '%s, %d rows%s' % (parser_class.__name__, count, ', ambiguous' if ambiguous else '')
+            print('%-40s %12.3f %12.3f %12.3f' % (name, given * 1e3, uncached * 1e3, cached * 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Throughput of CSVStreamingRenderer for different chunk sizes.
+
+Each chunk is written to an unbuffered file (the null device), to account for
+the per-chunk cost of handing data to a server socket.
+
+Run from the repository root:
+
+    $ python benchmarks/streaming_chunks.py [rows]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'testsettings')
+
+import django
+django.setup()
+
+from rest_framework_csv.renderers import CSVStreamingRenderer
+
+
+HEADER = ['id', 'name', 'email', 'owner.id', 'owner.name', 'score', 'active']
+
+
+def generate_rows(count):
+    for i in range(count):
+        yield {'id': i, 'name': 'Item %d' % i, 'email': 'user%d@example.com' % i,
+               'owner': {'id': i % 100, 'name': 'Owner %d' % (i % 100)},
+               'score': i * 0.5, 'active': i % 2 == 0}
+
+
+def run(count, renderer_context):
+    renderer = CSVStreamingRenderer()
+    renderer.header = HEADER
+    chunks = size = 0
+    with open(os.devnull, 'wb', buffering=0) as sink:
+        start = time.perf_counter()
+        for chunk in renderer.render(generate_rows(count), renderer_context=renderer_context):
+            sink.write(chunk)
+            chunks += 1
+            size += len(chunk)
+        return time.perf_counter() - start, chunks, size
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    configurations = [
+        ('per row', {}),
+        ('chunk_size=10', {'chunk_size': 10}),
+        ('chunk_size=100', {'chunk_size': 100}),
+        ('chunk_size=1000', {'chunk_size': 1000}),
+        ('chunk_size=10000', {'chunk_size': 10000}),
+        ('chunk_bytes=16K', {'chunk_bytes': 16 * 1024}),
+        ('chunk_bytes=64K', {'chunk_bytes': 64 * 1024}),
+        ('chunk_bytes=256K', {'chunk_bytes': 256 * 1024}),
+    ]
+
+    print('%d rows' % count)
+    print('%-18s %10s %10s %10s %10s' % ('configuration', 'seconds', 'rows/s', 'MB/s', 'chunks'))
+    for name, renderer_context in configurations:
+        elapsed, chunks, size = run(count, renderer_context)
+        print('%-18s %10.3f %10.0f %10.1f %10d' % (
+            name, elapsed, count / elapsed, size / elapsed / 1e6, chunks))
+
+
+if __name__ == '__main__':
+    main()
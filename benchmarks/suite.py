@@ -0,0 +1,351 @@
+"""
+Benchmarks for the renderers and parser, reporting rows per second and peak
+memory for each case.
+
+Run from the repository root:
+
+    $ python benchmarks/suite.py [--quick] [--filter TEXT] [--json FILE]
+
+To compare two git revisions (the second defaults to the working tree), and
+exit with an error if any case got slower by more than --threshold percent:
+
+    $ python benchmarks/suite.py --compare master [HEAD]
+
+The cases only use APIs that every release has had, so the same suite can be
+run against older revisions.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURE = os.path.join('rest_framework_csv', 'testfixtures', 'nonewlines.csv')
+
+BENCHMARKS = []
+
+
+def benchmark(name, rows):
+    """
+    Register a benchmark case. The decorated function sets up the case for a
+    given number of rows, and returns a function that runs it once.
+    """
+    def register(setup):
+        BENCHMARKS.append((name, rows, setup))
+        return setup
+    return register
+
+
+# Data
+
+def flat_items(count):
+    return [{'id': i, 'name': 'Item %d' % i, 'email': 'user%d@example.com' % i,
+             'score': i * 0.5, 'active': i % 2 == 0}
+            for i in range(count)]
+
+
+def nested_items(count):
+    return [{'id': i, 'name': 'Item %d' % i,
+             'owner': {'id': i % 100, 'name': 'Owner %d' % (i % 100)},
+             'tags': ['a', 'b', 'c'], 'score': i * 0.5}
+            for i in range(count)]
+
+
+def deep_item(depth):
+    item = {'value': 1, 'values': [1, 2]}
+    for level in range(depth):
+        item = {'level%d' % level: item, 'id': level}
+    return item
+
+
+def wide_item(width):
+    return dict(('column_%d' % column, column) for column in range(width))
+
+
+def csv_body(count, columns):
+    lines = [','.join('column_%d' % column for column in range(columns))]
+    for i in range(count):
+        lines.append(','.join('"%d, %d"' % (i, column) if column % 7 == 0 else str(i + column)
+                              for column in range(columns)))
+    return ('\r\n'.join(lines) + '\r\n').encode('utf-8')
+
+
+NESTED_HEADER = ['id', 'name', 'owner.id', 'owner.name', 'tags.0', 'tags.1', 'tags.2', 'score']
+
+
+# Cases
+
+@benchmark('render', 20000)
+def render(rows):
+    from rest_framework_csv.renderers import CSVRenderer
+    data = nested_items(rows)
+    return lambda: CSVRenderer().render(data)
+
+
+@benchmark('render flat', 20000)
+def render_flat(rows):
+    from rest_framework_csv.renderers import CSVRenderer
+    data = flat_items(rows)
+    return lambda: CSVRenderer().render(data)
+
+
+@benchmark('render with header', 20000)
+def render_with_header(rows):
+    from rest_framework_csv.renderers import CSVRenderer
+    data = nested_items(rows)
+    return lambda: CSVRenderer().render(data, renderer_context={'header': NESTED_HEADER})
+
+
+@benchmark('render small', 10000)
+def render_small(rows):
+    from rest_framework_csv.renderers import CSVRenderer
+    data = nested_items(10)
+    return lambda: [CSVRenderer().render(data, renderer_context={'header': NESTED_HEADER})
+                    for _ in range(rows // 10)]
+
+
+@benchmark('tablize', 20000)
+def tablize(rows):
+    from rest_framework_csv.renderers import CSVRenderer
+    data = nested_items(rows)
+    return lambda: list(CSVRenderer().tablize(data))
+
+
+@benchmark('tablize with header', 20000)
+def tablize_with_header(rows):
+    from rest_framework_csv.renderers import CSVRenderer
+    data = nested_items(rows)
+    return lambda: list(CSVRenderer().tablize(data, header=NESTED_HEADER))
+
+
+@benchmark('flatten_item deep', 5000)
+def flatten_item_deep(rows):
+    from rest_framework_csv.renderers import CSVRenderer
+    renderer = CSVRenderer()
+    data = [deep_item(20)] * rows
+    return lambda: [renderer.flatten_item(item) for item in data]
+
+
+@benchmark('flatten_item wide', 2000)
+def flatten_item_wide(rows):
+    from rest_framework_csv.renderers import CSVRenderer
+    renderer = CSVRenderer()
+    data = [wide_item(200)] * rows
+    return lambda: [renderer.flatten_item(item) for item in data]
+
+
+@benchmark('streaming generator', 20000)
+def streaming_generator(rows):
+    from rest_framework_csv.renderers import CSVStreamingRenderer
+    renderer = CSVStreamingRenderer()
+    renderer.header = NESTED_HEADER
+    return lambda: sum(len(chunk) for chunk in renderer.render(
+        item for item in nested_items(rows)))
+
+
+@benchmark('paginated', 20000)
+def paginated(rows):
+    from rest_framework_csv.renderers import PaginatedCSVRenderer
+    data = {'count': rows, 'next': None, 'previous': None, 'results': nested_items(rows)}
+    return lambda: PaginatedCSVRenderer().render(data)
+
+
+@benchmark('parse small', 10000)
+def parse_small(rows):
+    from rest_framework_csv.parsers import CSVParser
+    body = csv_body(10, 5)
+    return lambda: [CSVParser().parse(BytesIO(body)) for _ in range(rows // 10)]
+
+
+@benchmark('parse wide', 2000)
+def parse_wide(rows):
+    from rest_framework_csv.parsers import CSVParser
+    body = csv_body(rows, 200)
+    return lambda: CSVParser().parse(BytesIO(body))
+
+
+@benchmark('parse huge', 200000)
+def parse_huge(rows):
+    from rest_framework_csv.parsers import CSVParser
+    body = csv_body(rows, 10)
+    return lambda: CSVParser().parse(BytesIO(body))
+
+
+@benchmark('parse nonewlines.csv', 10000)
+def parse_nonewlines(rows):
+    from rest_framework_csv.parsers import CSVParser
+    with open(os.path.join(REPO_ROOT, FIXTURE), 'rb') as fixture:
+        body = fixture.read()
+    return lambda: [CSVParser().parse(BytesIO(body)) for _ in range(rows // 2)]
+
+
+# Running
+
+def measure(run, repeat):
+    """
+    Return the best time of *repeat* runs, and the peak memory of one more run
+    (traced separately, since tracing slows everything down).
+    """
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(times), peak
+
+
+def run_suite(source, scale, repeat, name_filter):
+    sys.path.insert(0, source)
+    import django
+    from django.conf import settings
+    settings.configure(INSTALLED_APPS=['rest_framework'], USE_TZ=True)
+    django.setup()
+
+    results = {}
+    for name, rows, setup in BENCHMARKS:
+        if name_filter and name_filter not in name:
+            continue
+        rows = max(int(rows * scale), 10)
+        seconds, peak = measure(setup(rows), repeat)
+        results[name] = {'rows': rows, 'seconds': seconds,
+                         'rows_per_second': rows / seconds, 'peak_bytes': peak}
+        print('%-22s %8d rows %12.0f rows/s %10.1f MB' % (
+            name, rows, rows / seconds, peak / 1e6), file=sys.stderr)
+    return results
+
+
+def export_revision(revision, directory):
+    """
+    Write the files of a git *revision* into *directory*.
+    """
+    archive = subprocess.run(['git', 'archive', revision], cwd=REPO_ROOT,
+                             stdout=subprocess.PIPE, check=True).stdout
+    with tarfile.open(fileobj=BytesIO(archive)) as tar:
+        if hasattr(tarfile, 'data_filter'):
+            tar.extractall(directory, filter='data')
+        else:
+            tar.extractall(directory)
+
+
+def run_source(source, options):
+    """
+    Run the suite in a separate process against the rest_framework_csv in
+    *source*, and return the results.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, 'results.json')
+        command = [sys.executable, os.path.abspath(__file__), '--source', source,
+                   '--json', output, '--repeat', str(options.repeat)]
+        if options.quick:
+            command.append('--quick')
+        if options.filter:
+            command.extend(['--filter', options.filter])
+        subprocess.run(command, check=True)
+
+        with open(output) as results_file:
+            return json.load(results_file)['results']
+
+
+def best_results(runs):
+    """
+    Combine the results of several runs, keeping the best of each case.
+    """
+    results = {}
+    for run in runs:
+        for name, result in run.items():
+            best = results.setdefault(name, dict(result))
+            best['seconds'] = min(best['seconds'], result['seconds'])
+            best['rows_per_second'] = max(best['rows_per_second'], result['rows_per_second'])
+            best['peak_bytes'] = min(best['peak_bytes'], result['peak_bytes'])
+    return results
+
+
+def compare(options):
+    """
+    Run the suite against two revisions, alternating between them for a
+    number of rounds so that changes in the machine's load affect both alike.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        sources = []
+        for revision in (options.compare + [None])[:2]:
+            if revision is None:
+                sources.append(REPO_ROOT)
+            else:
+                source = os.path.join(directory, 'source-%d' % len(sources))
+                export_revision(revision, source)
+                sources.append(source)
+
+        base_runs, head_runs = [], []
+        for round_number in range(options.rounds):
+            print('Round %d of %d' % (round_number + 1, options.rounds), file=sys.stderr)
+            base_runs.append(run_source(sources[0], options))
+            head_runs.append(run_source(sources[1], options))
+    base = best_results(base_runs)
+    head = best_results(head_runs)
+
+    print('%-22s %12s %12s %8s %10s %10s' % (
+        'case', 'base rows/s', 'head rows/s', 'change', 'base MB', 'head MB'))
+    regressions = []
+    for name, _, _ in BENCHMARKS:
+        if name not in base or name not in head:
+            continue
+        change = head[name]['rows_per_second'] / base[name]['rows_per_second'] - 1
+        if change * 100 < -options.threshold:
+            regressions.append(name)
+        print('%-22s %12.0f %12.0f %+7.1f%% %10.1f %10.1f%s' % (
+            name, base[name]['rows_per_second'], head[name]['rows_per_second'],
+            change * 100, base[name]['peak_bytes'] / 1e6, head[name]['peak_bytes'] / 1e6,
+            '  slower' if name in regressions else ''))
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--quick', action='store_true',
+                        help='run each case with a tenth of the rows')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='number of timed runs of each case (default: 3)')
+    parser.add_argument('--filter', help='only run cases whose names contain this')
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--source', default=REPO_ROOT,
+                        help='directory to import rest_framework_csv from')
+    parser.add_argument('--compare', nargs='+', metavar='REVISION',
+                        help='compare two git revisions (the second defaults '
+                             'to the working tree)')
+    parser.add_argument('--rounds', type=int, default=3,
+                        help='times to run each revision when comparing (default: 3)')
+    parser.add_argument('--threshold', type=float, default=10,
+                        help='percent slowdown that counts as a regression (default: 10)')
+    options = parser.parse_args()
+
+    if options.compare:
+        if len(options.compare) > 2:
+            parser.error('--compare takes one or two revisions')
+        return compare(options)
+
+    results = run_suite(options.source, 0.1 if options.quick else 1,
+                        options.repeat, options.filter)
+    if options.json:
+        with open(options.json, 'w') as results_file:
+            json.dump({'python': platform.python_version(), 'results': results},
+                      results_file, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+Parse and serializer validation time of CSVParser with and without column
+types, and the time to convert each column type on its own.
+
+Run from the repository root:
+
+    $ python benchmarks/typed_parse.py [rows]
+"""
+import gc
+import os
+import sys
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'testsettings')
+
+import django
+django.setup()
+
+from rest_framework import serializers
+
+from rest_framework_csv.parsers import CSVParser
+
+
+class ReadingSerializer(serializers.Serializer):
+    name = serializers.CharField()
+    sensor = serializers.IntegerField()
+    value = serializers.DecimalField(max_digits=8, decimal_places=2)
+    ratio = serializers.FloatField()
+    active = serializers.BooleanField()
+    day = serializers.DateField()
+    taken = serializers.DateTimeField()
+
+
+class ReadingView(object):
+    def get_serializer_class(self):
+        return ReadingSerializer
+
+    def get_serializer(self, *args, **kwargs):
+        return ReadingSerializer(*args, **kwargs)
+
+
+def csv_body(count):
+    lines = ['name,sensor,value,ratio,active,day,taken']
+    for i in range(count):
+        lines.append('Reading %d,%d,%d.%02d,%f,%s,2024-%02d-%02d,2024-01-%02dT%02d:%02d:00' % (
+            i, i % 500, i % 1000, i % 100, i / 7, 'true' if i % 2 else 'false',
+            i % 12 + 1, i % 28 + 1, i % 28 + 1, i % 24, i % 60))
+    return ('\r\n'.join(lines) + '\r\n').encode('utf-8')
+
+
+def best_of(repeat, run):
+    times = []
+    for _ in range(repeat):
+        result = None
+        gc.collect()
+        start = time.perf_counter()
+        result = run()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    body = csv_body(count)
+
+    print('%d rows' % count)
+    print('%-12s %10s %10s' % ('column types', 'parse', 'validate'))
+    for column_types in (None, 'serializer'):
+        context = {'column_types': column_types, 'view': ReadingView()}
+        data = None
+        parse_time, data = best_of(3, lambda: CSVParser().parse(BytesIO(body), parser_context=context))
+
+        def validate():
+            serializer = ReadingSerializer(data=data, many=True)
+            assert serializer.is_valid(), serializer.errors[:1]
+        validate_time, _ = best_of(3, validate)
+        print('%-12s %9.3fs %9.3fs' % (column_types or 'none', parse_time, validate_time))
+
+    data = None
+    print()
+    print('%-12s %10s' % ('column type', 'parse'))
+    strings_time, _ = best_of(5, lambda: CSVParser().parse(BytesIO(body)))
+    for name, column_type in (('sensor', 'int'), ('value', 'decimal'), ('ratio', 'float'),
+                              ('active', 'bool'), ('day', 'date'), ('taken', 'datetime')):
+        context = {'column_types': {name: column_type}}
+        parse_time, _ = best_of(5, lambda: CSVParser().parse(BytesIO(body), parser_context=context))
+        print('%-12s %+9.3fs' % (column_type, parse_time - strings_time))
+
+
+if __name__ == '__main__':
+    main()
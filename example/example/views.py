@@ -1,15 +1,14 @@
-from django.core.urlresolvers import reverse
-from rest_framework import viewsets, status
-from rest_framework.decorators import list_route
-from rest_framework.response import Response
+from rest_framework import viewsets
+from rest_framework.decorators import action
 from rest_framework.settings import api_settings
+from rest_framework_csv.mixins import CSVBulkCreateMixin
 from rest_framework_csv.parsers import CSVParser
 from rest_framework_csv.renderers import CSVRenderer
 from example.serializers import TalkSerializer
 from example.models import Talk
 
 
-class TalkViewSet(viewsets.ModelViewSet):
+class TalkViewSet(CSVBulkCreateMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows talks to be viewed or edited.
     """
@@ -25,7 +24,7 @@ class TalkViewSet(viewsets.ModelViewSet):
             if 'fields' in self.request.GET else None)
         return context
 
-    @list_route(methods=['POST'])
+    @action(detail=False, methods=['post'])
     def bulk_upload(self, request, *args, **kwargs):
         """
         Try out this view with the following curl command:
@@ -37,7 +36,4 @@ class TalkViewSet(viewsets.ModelViewSet):
             -H "Content-type: text/csv" \
             -H "Accept: text/csv"
         """
-        serializer = self.get_serializer(data=request.data, many=True)
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
-        return Response(serializer.data, status=status.HTTP_303_SEE_OTHER, headers={'Location': reverse('talk-list')})
+        return super(TalkViewSet, self).bulk_upload(request, *args, **kwargs)
@@ -0,0 +1,107 @@
+"""
+Reading columnar data (pandas DataFrames, pyarrow Tables, dictionaries of
+NumPy arrays, and parsed OrderedColumns) a slice of rows at a time, without
+converting it into a dictionary for each row first.
+
+pandas, pyarrow and NumPy are not imported; their objects are recognized by
+the modules that their types come from.
+"""
+from collections.abc import Mapping
+
+from rest_framework_csv.orderedrows import OrderedColumns
+
+
+def _package(value):
+    return type(value).__module__.partition('.')[0]
+
+
+def get_columns(data):
+    """
+    Return a dictionary of column names to columns, in order, if *data* is
+    columnar; otherwise None. A plain dictionary only counts as columnar
+    when its values are all one-dimensional NumPy arrays, since a dictionary
+    of lists is otherwise rendered as a single row.
+    """
+    if isinstance(data, list):
+        return None
+    if isinstance(data, OrderedColumns):
+        return data
+
+    package = _package(data)
+    if package == 'pandas' and hasattr(data, 'columns') and hasattr(data, 'iloc'):
+        return {name: data.iloc[:, position] for position, name in enumerate(data.columns)}
+    if package == 'pyarrow' and hasattr(data, 'column_names'):
+        return {name: data.column(position) for position, name in enumerate(data.column_names)}
+    if (isinstance(data, Mapping) and data and
+            all(_package(column) == 'numpy' and getattr(column, 'ndim', None) == 1
+                for column in data.values())):
+        return data
+    return None
+
+
+def column_slicer(column):
+    """
+    Return a function that takes a start and stop row, and returns the values
+    of *column* in those rows as a list of Python objects. Missing values
+    (NaN, NaT, None, or nulls) become None, so that they are written as empty
+    cells.
+    """
+    package = _package(column)
+    if package == 'pandas':
+        return lambda start, stop: _series_values(column.iloc[start:stop])
+    if package == 'pyarrow':
+        return lambda start, stop: column.slice(start, stop - start).to_pylist()
+    if package == 'numpy':
+        return lambda start, stop: _array_values(column[start:stop])
+    return lambda start, stop: column[start:stop]
+
+
+def _series_values(series):
+    missing = series.isna()
+    if missing.any():
+        series = series.astype(object).where(~missing, None)
+    return series.tolist()
+
+
+def _array_values(array):
+    kind = array.dtype.kind
+    if kind in 'Mm':
+        # tolist() would turn nanosecond datetimes into integers.
+        missing = array != array
+        values = array.astype(str).astype(object)
+        values[missing] = None
+        return values.tolist()
+    if kind in 'fc':
+        missing = array != array
+        if missing.any():
+            array = array.astype(object)
+            array[missing] = None
+    return array.tolist()
+
+
+def columnar_rows(columns, header, batch_size=10000):
+    """
+    Iterate over the rows of the *header* columns of a dictionary of
+    *columns* (see `get_columns`) as tuples, converting `batch_size` rows of
+    each column at a time. Columns in the header that aren't in the data are
+    left empty. Raises a ValueError straight away if the columns don't all
+    have the same length, rather than leaving out the values of the longer
+    columns.
+    """
+    lengths = set(map(len, columns.values()))
+    if len(lengths) > 1:
+        raise ValueError('The columns have different lengths: %s.' % ', '.join(
+            '%s (%d)' % (name, len(column)) for name, column in columns.items()))
+    length = lengths.pop() if lengths else 0
+    slicers = [column_slicer(columns[name]) if name in columns else None
+               for name in header]
+    return iter_columnar_rows(slicers, length, batch_size)
+
+
+def iter_columnar_rows(slicers, length, batch_size):
+    for start in range(0, length, batch_size):
+        stop = min(start + batch_size, length)
+        values = [slicer(start, stop) if slicer is not None else [None] * (stop - start)
+                  for slicer in slicers]
+        for row in zip(*values):
+            yield row
@@ -0,0 +1,85 @@
+"""
+Compressing rendered CSV on the fly, with gzip or deflate content codings.
+"""
+import zlib
+
+# zlib window bits for each content coding. HTTP's "deflate" is the zlib
+# format, not raw deflate.
+WBITS = {
+    'gzip': 16 + zlib.MAX_WBITS,
+    'deflate': zlib.MAX_WBITS,
+}
+
+
+def parse_accept_encoding(accept_encoding):
+    """
+    Return a dictionary of the content codings in an Accept-Encoding header,
+    mapped to their q-values.
+    """
+    codings = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        if coding == 'x-gzip':
+            coding = 'gzip'
+
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        codings[coding] = quality
+    return codings
+
+
+def negotiate_compression(accept_encoding, offered=('gzip', 'deflate')):
+    """
+    Return the first of the *offered* content codings that the Accept-Encoding
+    header allows, or None if the content should not be compressed.
+    """
+    codings = parse_accept_encoding(accept_encoding or '')
+    for coding in offered:
+        if codings.get(coding, codings.get('*', 0)) > 0:
+            return coding
+    return None
+
+
+def compress_chunks(chunks, coding, level=6, flush=True):
+    """
+    Compress an iterable of byte strings into a single gzip or deflate
+    stream. With *flush*, each chunk is flushed (with Z_SYNC_FLUSH) so that
+    the client can decompress everything sent so far; otherwise compressed
+    data is yielded as zlib produces it.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, WBITS[coding])
+    for chunk in chunks:
+        data = compress_chunk(compressor, chunk, flush)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+async def acompress_chunks(chunks, coding, level=6, flush=True):
+    """
+    Like `compress_chunks`, for an async iterable of byte strings.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, WBITS[coding])
+    async for chunk in chunks:
+        data = compress_chunk(compressor, chunk, flush)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def compress_chunk(compressor, chunk, flush):
+    if not chunk:
+        return b''
+    data = compressor.compress(chunk)
+    if flush:
+        data += compressor.flush(zlib.Z_SYNC_FLUSH)
+    return data
@@ -0,0 +1,221 @@
+"""
+Converting parsed CSV columns from strings into typed values.
+"""
+from decimal import Decimal, InvalidOperation
+from operator import itemgetter
+
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+_serializer_column_types = {}
+
+
+def to_int(value):
+    # Like IntegerField, allow e.g. '1.0' as an int, but not '1.2'.
+    return int(serializers.IntegerField.re_decimal.sub('', value))
+
+
+def to_bool(value):
+    if value in getattr(serializers.BooleanField, 'NULL_VALUES', ()):
+        return None
+    if value in serializers.BooleanField.TRUE_VALUES:
+        return True
+    if value in serializers.BooleanField.FALSE_VALUES:
+        return False
+    raise ValueError('%r is not a valid boolean.' % (value,))
+
+
+def to_decimal(value):
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise ValueError('%r is not a valid decimal.' % (value,))
+
+
+def to_date(value):
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError('%r is not a valid date.' % (value,))
+    return parsed
+
+
+def to_datetime(value):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError('%r is not a valid datetime.' % (value,))
+    return parsed
+
+
+# The named column types, each mapped to a pair of converters: a builtin
+# that is tried on the whole column at once (or None), and a converter that
+# handles every value the type accepts.
+COLUMN_TYPES = {
+    'int': (int, to_int),
+    'float': (float, float),
+    'decimal': (None, to_decimal),
+    'bool': (None, to_bool),
+    'date': (None, to_date),
+    'datetime': (None, to_datetime),
+}
+
+
+def get_converter(column_type):
+    """
+    Return the pair of converters for a column type, which is either one of
+    the names in `COLUMN_TYPES` or a function that converts a string.
+    """
+    if callable(column_type):
+        return (None, column_type)
+    try:
+        return COLUMN_TYPES[column_type]
+    except KeyError:
+        raise ValueError('Unknown column type: %r' % (column_type,))
+
+
+def convert_column(values, converters):
+    """
+    Convert a sequence of strings with a pair of converters. Returns a list of
+    the converted values, and a dictionary of the values that could not be
+    converted mapped to their exceptions; those values are left as strings.
+    Empty strings become None.
+
+    Each distinct value is only converted once, so columns with repeated
+    values (flags, categories, dates) cost little more than a lookup per
+    cell.
+    """
+    fast, convert = converters
+    if fast is not None and '' not in values:
+        try:
+            return list(map(fast, values)), {}
+        except (TypeError, ValueError, ArithmeticError):
+            pass
+
+    converted = {'': None}
+    errors = {}
+    for value in set(values):
+        if value in converted:
+            continue
+        try:
+            converted[value] = convert(value)
+        except Exception as exc:
+            converted[value] = value
+            errors[value] = exc
+    return list(map(converted.__getitem__, values)), errors
+
+
+def convert_columns(rows, converters):
+    """
+    Convert the columns of a list of rows in place, where *converters* maps
+    the keys of the columns (positions in lists of strings, or names in
+    dictionaries) to pairs of converters.
+
+    Returns a list of (row index, column key, value, exception) tuples for the
+    values that could not be converted, in row order.
+    """
+    errors = []
+    for key, column_converters in converters.items():
+        try:
+            values = list(map(itemgetter(key), rows))
+            indexes = range(len(rows))
+        except (IndexError, KeyError):
+            # Some rows are too short to have the column.
+            indexes, values = [], []
+            for index, row in enumerate(rows):
+                try:
+                    values.append(row[key])
+                except (IndexError, KeyError):
+                    continue
+                indexes.append(index)
+
+        converted, bad_values = convert_column(values, column_converters)
+        for index, value in zip(indexes, converted):
+            rows[index][key] = value
+        if bad_values:
+            errors.extend((index, key, value, bad_values[value])
+                          for index, value in zip(indexes, values) if value in bad_values)
+    # The sort is stable, so each row's errors stay in column order.
+    errors.sort(key=itemgetter(0))
+    return errors
+
+
+def convert_rows(rows, converters, report_error, max_cached_values=65536):
+    """
+    Lazily convert an iterable of (key, list of strings) pairs, where
+    *converters* maps column positions to pairs of converters. Values that
+    could not be converted are left as strings, and passed to
+    `report_error(key, column position, value, exception)`.
+
+    The converted values of each column are cached (up to *max_cached_values*
+    distinct values per column).
+    """
+    caches = {position: {'': None} for position in converters}
+    for key, values in rows:
+        for position, (_, convert) in converters.items():
+            if position >= len(values):
+                continue
+            value = values[position]
+            cache = caches[position]
+            try:
+                values[position] = cache[value]
+                continue
+            except KeyError:
+                pass
+            try:
+                converted = convert(value)
+            except Exception as exc:
+                report_error(key, position, value, exc)
+                continue
+            if len(cache) < max_cached_values:
+                cache[value] = converted
+            values[position] = converted
+        yield key, values
+
+
+def serializer_column_types(serializer):
+    """
+    Return a dictionary of column types for the writable fields of a
+    serializer whose values can be converted before validation: integer,
+    float, decimal, boolean, and ISO 8601 date and datetime fields.
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+
+    column_types = {}
+    for name, field in serializer.fields.items():
+        if field.read_only:
+            continue
+        if isinstance(field, serializers.BooleanField):
+            column_types[name] = 'bool'
+        elif isinstance(field, serializers.IntegerField):
+            column_types[name] = 'int'
+        elif isinstance(field, serializers.FloatField):
+            column_types[name] = 'float'
+        elif isinstance(field, serializers.DecimalField) and not field.localize:
+            column_types[name] = 'decimal'
+        elif isinstance(field, serializers.DateTimeField):
+            input_formats = getattr(field, 'input_formats', api_settings.DATETIME_INPUT_FORMATS)
+            if ISO_8601 in input_formats:
+                column_types[name] = 'datetime'
+        elif isinstance(field, serializers.DateField):
+            input_formats = getattr(field, 'input_formats', api_settings.DATE_INPUT_FORMATS)
+            if ISO_8601 in input_formats:
+                column_types[name] = 'date'
+    return column_types
+
+
+def get_serializer_column_types(view):
+    """
+    Return the column types for the view's serializer (see
+    `serializer_column_types`), cached for each serializer class. Returns
+    None if the view has no serializer.
+    """
+    if not hasattr(view, 'get_serializer'):
+        return None
+
+    serializer_class = view.get_serializer_class()
+    column_types = _serializer_column_types.get(serializer_class)
+    if column_types is None:
+        column_types = serializer_column_types(view.get_serializer())
+        _serializer_column_types[serializer_class] = column_types
+    return column_types
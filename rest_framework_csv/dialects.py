@@ -0,0 +1,90 @@
+"""
+Detecting the delimiter of CSV data from a sample of its first bytes, and
+remembering the delimiter detected for each client (or any other key), so
+that later uploads from the same client don't need to be sniffed again.
+"""
+import csv
+from collections import OrderedDict
+from threading import Lock
+
+
+class DialectCache(object):
+    """
+    A thread-safe mapping of keys to delimiters that holds on to the
+    `maxsize` most recently used keys.
+    """
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.delimiters = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key):
+        with self.lock:
+            delimiter = self.delimiters.get(key)
+            if delimiter is not None:
+                self.delimiters.move_to_end(key)
+            return delimiter
+
+    def set(self, key, delimiter):
+        with self.lock:
+            self.delimiters[key] = delimiter
+            self.delimiters.move_to_end(key)
+            while len(self.delimiters) > self.maxsize:
+                self.delimiters.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.delimiters.clear()
+
+    def __len__(self):
+        return len(self.delimiters)
+
+
+dialect_cache = DialectCache()
+
+
+def sample_lines(sample, encoding):
+    # Decode a sample of the body, ignoring a character cut in two at its end,
+    # and drop its last line, which may be incomplete.
+    text = sample.decode(encoding, errors='ignore')
+    lines = text.rstrip('\r\n')
+    end = lines.rfind('\n')
+    return lines[:end] if end > 0 else lines
+
+
+def sniff_delimiter(sample, encoding, delimiters=',;\t|', key=None, cache=dialect_cache,
+                    default=','):
+    """
+    Return the delimiter of the CSV data that *sample* (bytes) is the start
+    of, out of the possible *delimiters*. The delimiter has to be in the
+    first line (the header), so only the possible delimiters in it are
+    considered; if there are more than one, csv.Sniffer picks one of them.
+    If there are none, the data has a single column, and the *default* is
+    returned.
+
+    With a *key* (e.g. a user or an API key), the delimiter is remembered in
+    the *cache*, and used for the key's later samples without sniffing them,
+    as long as it is in their first line.
+    """
+    text = sample_lines(sample, encoding)
+    header = text.split('\n', 1)[0]
+    if key is not None:
+        delimiter = cache.get(key)
+        if delimiter is not None and delimiter in header:
+            return delimiter
+
+    candidates = ''.join(d for d in delimiters if d in header)
+    if not candidates:
+        return default
+    if len(candidates) == 1:
+        delimiter = candidates
+    else:
+        try:
+            delimiter = csv.Sniffer().sniff(text, candidates).delimiter
+        except csv.Error:
+            # Too little data to sniff, e.g. just a header
+            delimiter = max(candidates, key=header.count)
+
+    if key is not None:
+        cache.set(key, delimiter)
+    return delimiter
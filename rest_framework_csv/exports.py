@@ -0,0 +1,124 @@
+"""
+Serving rendered exports from files, with ETags and HTTP Range requests, so
+that interrupted downloads can be resumed.
+"""
+import re
+import time
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_range(range_header, size):
+    """
+    Return the (start, stop) offsets of the bytes that a Range header asks
+    for, in content of *size* bytes. Returns None if the whole content should
+    be sent: when there is no Range header, or when it isn't a single valid
+    byte range (servers may ignore those). Raises ValueError if the range
+    can't be satisfied.
+    """
+    match = RANGE_RE.match(range_header.replace(' ', '')) if range_header else None
+    if match is None:
+        return None
+
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # A suffix range, for the last bytes of the content
+        suffix = int(last)
+        if not suffix or not size:
+            raise ValueError('Range not satisfiable: %r' % (range_header,))
+        return max(size - suffix, 0), size
+
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError('Range not satisfiable: %r' % (range_header,))
+    return start, (min(int(last) + 1, size) if last else size)
+
+
+def read_range(file, start, stop, block_size=64 * 1024):
+    """
+    Read the bytes from *start* to *stop* of a file, *block_size* bytes at a
+    time, and close it.
+    """
+    try:
+        file.seek(start)
+        remaining = stop - start
+        while remaining > 0:
+            block = file.read(min(block_size, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+    finally:
+        file.close()
+
+
+def range_response(request, file, size, content_type, etag=None, last_modified=None,
+                   block_size=64 * 1024):
+    """
+    Return a response that sends the content of an open binary *file* of
+    *size* bytes. Conditional requests (If-None-Match, If-Modified-Since) are
+    answered from the *etag* and *last_modified* timestamp, and a Range
+    request gets a 206 response with just the requested bytes, unless its
+    If-Range doesn't match. The file is closed once it has been sent.
+    """
+    if last_modified is not None:
+        last_modified = int(last_modified)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+    if response is None:
+        byte_range = None
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if if_range is None or if_range in (etag, last_modified and http_date(last_modified)):
+            try:
+                byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = 'bytes */%d' % size
+
+    if response is not None:
+        file.close()
+    elif byte_range is None:
+        response = StreamingHttpResponse(read_range(file, 0, size, block_size),
+                                         content_type=content_type)
+        response['Content-Length'] = str(size)
+    else:
+        start, stop = byte_range
+        response = StreamingHttpResponse(read_range(file, start, stop, block_size),
+                                         status=206, content_type=content_type)
+        response['Content-Length'] = str(stop - start)
+        response['Content-Range'] = 'bytes %d-%d/%d' % (start, stop - 1, size)
+
+    response['Accept-Ranges'] = 'bytes'
+    if etag is not None:
+        response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def delete_expired_exports(storage, location, max_age):
+    """
+    Delete the files in *location* of a Django *storage* that were last
+    modified more than *max_age* seconds ago, e.g. the exports of
+    `CSVCachedExportMixin` once they expire. Returns the number of files
+    deleted.
+    """
+    if not storage.exists(location):
+        return 0
+
+    _, filenames = storage.listdir(location)
+    deleted = 0
+    for filename in filenames:
+        name = '%s/%s' % (location, filename)
+        if time.time() - storage.get_modified_time(name).timestamp() > max_age:
+            storage.delete(name)
+            deleted += 1
+    return deleted
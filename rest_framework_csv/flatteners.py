@@ -0,0 +1,194 @@
+"""
+Shape-compiled flattening for the CSV renderers.
+
+Serializer output usually has the same nested shape on every row. Rather than
+recursing through each item (building intermediate dictionaries and joining
+column names as it goes), an ``ItemFlattener`` generates a small function for
+each shape it sees. The function checks that an item still has that shape and
+pulls every leaf value out directly. Items that do not match a known shape are
+handed to the renderer's generic ``flatten_item``.
+
+The compiled functions are shared by every flattener with the same level
+separator and header (see ``shared_shapes``), so a shape is compiled once, not
+once per render. Only the most recently matched shapes are kept.
+"""
+
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import count
+from threading import Lock
+
+from rest_framework_csv.orderedrows import CompactRow
+
+_mappings = (dict, CompactRow)
+_containers = (list, dict, CompactRow)
+
+
+class CompiledShapes(object):
+    """
+    The functions that flatteners have compiled for the shapes they have seen,
+    shared between flatteners. Only the `max_size` most recently matched
+    functions are kept. Safe to use from several threads.
+    """
+    def __init__(self, max_size=8):
+        self.max_size = max_size
+        self.functions = OrderedDict()
+        self.order = ()  # The functions, the most recently matched first
+        self.lock = Lock()
+
+    def snapshot(self):
+        """Return the functions, the most recently matched first."""
+        return list(self.order)
+
+    def matched(self, flatten):
+        """Record that *flatten* matched an item, adding it if it's new."""
+        if self.order and self.order[0] is flatten:
+            return
+        with self.lock:
+            self.functions[flatten] = None
+            self.functions.move_to_end(flatten)
+            while len(self.functions) > self.max_size:
+                self.functions.popitem(last=False)
+            self.order = tuple(reversed(self.functions))
+
+
+@lru_cache(maxsize=256)
+def shared_shapes(level_sep, header, keys=None):
+    """
+    Return the CompiledShapes shared by flatteners with the given level
+    separator and header (a tuple, or None). Without a header, the *keys* of
+    the first item tell different kinds of data apart, so that they don't
+    compete for the same shapes. The least recently used are dropped once
+    there are more than 256 configurations.
+    """
+    return CompiledShapes()
+
+
+class ItemFlattener(object):
+    """
+    Flattens items exactly like ``CSVRenderer.flatten_item``, using compiled
+    per-shape accessors where it can.
+
+    If a *header* is given, each item is flattened straight into a row (a list
+    of values in header order) instead of a dictionary. Pass the *shapes* to
+    share compiled functions with other flatteners (see `shared_shapes`).
+
+    Each flattener compiles at most `max_shapes` shapes of its own, so data
+    with ever-changing shapes falls back to ``flatten_item`` rather than
+    compiling a function for every item.
+    """
+    max_shapes = 8
+
+    def __init__(self, level_sep, fallback, header=None, shapes=None):
+        self.level_sep = level_sep
+        self.fallback = fallback
+        self.header = list(header) if header is not None else None
+        self.compiled = shapes if shapes is not None else CompiledShapes()
+        self.shapes = self.compiled.snapshot()
+        self.matched = set()
+        self.current = None  # The function that matched the last item
+        self.misses = 0
+        self.compile_count = 0
+
+    def __call__(self, item):
+        current = self.current
+        if current is not None:
+            flat_item = current(item)
+            if flat_item is not None:
+                return flat_item
+
+        for flatten in self.shapes:
+            if flatten is current:
+                continue
+            flat_item = flatten(item)
+            if flat_item is not None:
+                self.match(flatten)
+                return flat_item
+
+        # Compile a shape the second time we miss, so that a single item
+        # doesn't pay for code generation.
+        self.misses += 1
+        if self.misses > 1 and self.compile_count < self.max_shapes:
+            flatten = self.compile(item)
+            self.compile_count += 1
+            self.shapes.insert(0, flatten)
+            self.match(flatten)
+            return flatten(item)
+
+        flat_item = self.fallback(item)
+        if self.header is None:
+            return flat_item
+        return [flat_item.get(key, None) for key in self.header]
+
+    def match(self, flatten):
+        self.current = flatten
+        if flatten not in self.matched:
+            # Only the first match in each flattener is recorded, so that
+            # items of alternating shapes don't take the lock every time.
+            self.matched.add(flatten)
+            self.compiled.matched(flatten)
+
+    def compile(self, item):
+        """
+        Generate a function that flattens items shaped like *item*, returning
+        None for any item that has a different shape.
+        """
+        namespace = {'_mappings': _mappings, '_containers': _containers}
+        body = []
+        leaves = self.emit(item, 'item', body, namespace, count())
+
+        if self.header is None:
+            result = '{%s}' % ', '.join(
+                '%r: %s' % (name, var) for name, var in leaves)
+        else:
+            columns = dict(leaves)
+            result = '[%s]' % ', '.join(
+                columns.get(key, 'None') for key in self.header)
+
+        source = 'def flatten(item):\n%s    return %s\n' % (
+            ''.join('    %s\n' % line for line in body), result)
+        exec(compile(source, '<flatten>', 'exec'), namespace)
+        return namespace['flatten']
+
+    def emit(self, node, var, body, namespace, var_ids):
+        """
+        Append the statements that validate and unpack *node* (held in the
+        variable named *var*) to *body*. Returns a list of (column, variable)
+        pairs for the leaves under *node*, in the order that ``flatten_item``
+        would produce them.
+        """
+        if isinstance(node, list):
+            body.append('if not isinstance(%s, list) or len(%s) != %d: return None'
+                        % (var, var, len(node)))
+            children = [(str(index), str(index), child)
+                        for index, child in enumerate(node)]
+        elif isinstance(node, _mappings):
+            keys = tuple(node)
+            keys_name = self.constant(namespace, keys)
+            body.append('if not isinstance(%s, _mappings) or tuple(%s) != %s: return None'
+                        % (var, var, keys_name))
+            children = [(str(key), self.literal(namespace, key), child)
+                        for key, child in node.items()]
+        else:
+            body.append('if isinstance(%s, _containers): return None' % var)
+            return [('', var)]
+
+        leaves = []
+        for prefix, key, child in children:
+            child_var = 'v%d' % next(var_ids)
+            body.append('%s = %s[%s]' % (child_var, var, key))
+            for header, leaf_var in self.emit(child, child_var, body, namespace, var_ids):
+                # Mirror CSVRenderer.nest_flat_item
+                name = self.level_sep.join([prefix, header]) if header else prefix
+                leaves.append((name, leaf_var))
+        return leaves
+
+    def constant(self, namespace, value):
+        name = '_c%d' % len(namespace)
+        namespace[name] = value
+        return name
+
+    def literal(self, namespace, key):
+        if type(key) in (str, int):
+            return repr(key)
+        return self.constant(namespace, key)
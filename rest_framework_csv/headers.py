@@ -0,0 +1,122 @@
+"""
+Ways of building a CSV header from flattened data without holding every
+flattened item in memory.
+"""
+import pickle
+from itertools import chain, islice
+from tempfile import SpooledTemporaryFile
+
+from rest_framework import relations, serializers
+
+
+def collect_header(flat_data):
+    """
+    Return the sorted set of keys across all of the flattened items.
+    """
+    header_fields = set()
+    for item in flat_data:
+        header_fields.update(list(item.keys()))
+    return sorted(header_fields)
+
+
+def sample_header(flat_data, sample_size):
+    """
+    Build a header from the first *sample_size* flattened items. Returns the
+    header along with an iterator over all of the flattened items. Columns
+    that only show up after the sample are left out of the table.
+    """
+    flat_data = iter(flat_data)
+    sample = list(islice(flat_data, sample_size))
+    return collect_header(sample), chain(sample, flat_data)
+
+
+def spool_header(flat_data, max_size=1024 * 1024):
+    """
+    Build a header from all of the flattened items, spooling the items to a
+    temporary file as they are read. Returns the header along with an iterator
+    that replays the items from the file.
+
+    Items are stored as a shape number and a tuple of values, so each distinct
+    set of keys is kept in memory only once. The file stays in memory until it
+    grows past *max_size* bytes.
+    """
+    spool = SpooledTemporaryFile(max_size=max_size)
+    try:
+        shapes = {}
+        count = 0
+        for item in flat_data:
+            keys = tuple(item)
+            shape = shapes.setdefault(keys, len(shapes))
+            pickle.dump((shape, tuple(item.values())), spool, pickle.HIGHEST_PROTOCOL)
+            count += 1
+    except BaseException:
+        spool.close()
+        raise
+
+    header_fields = set()
+    for keys in shapes:
+        header_fields.update(keys)
+    return sorted(header_fields), replay_spool(spool, count, list(shapes))
+
+
+def replay_spool(spool, count, shapes):
+    try:
+        spool.seek(0)
+        for _ in range(count):
+            shape, values = pickle.load(spool)
+            yield dict(zip(shapes[shape], values))
+    finally:
+        spool.close()
+
+
+# Fields whose values can be of any structure (a dictionary, a list, or a
+# single value), so that their columns can't be known from the serializer
+UNSTRUCTURED_FIELDS = (serializers.JSONField, serializers.DictField,
+                       serializers.SerializerMethodField, serializers.ReadOnlyField,
+                       serializers.ModelField)
+
+
+class UnknownColumns(Exception):
+    pass
+
+
+def serializer_header(serializer, level_sep='.', fanout=None):
+    """
+    Build a header from the fields that *serializer* outputs. Nested
+    serializers contribute one column for each of their fields. List fields
+    (including nested serializers and related fields with many=True)
+    contribute columns for their first *fanout* items, so longer lists are
+    cut short; without a *fanout*, their columns are unknown. Returns None if
+    the structure of some field isn't known up front, like that of a JSON
+    field or a list field, so that the header has to be found from the data
+    instead.
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    try:
+        return list(field_columns(serializer, level_sep, fanout))
+    except UnknownColumns:
+        return None
+
+
+def field_columns(field, level_sep, fanout):
+    if isinstance(field, UNSTRUCTURED_FIELDS) or type(field) is serializers.Field:
+        raise UnknownColumns(field)
+    elif (isinstance(field, (serializers.ListSerializer, serializers.ListField,
+                             relations.ManyRelatedField)) and fanout is None):
+        raise UnknownColumns(field)
+    elif isinstance(field, (serializers.ListSerializer, serializers.ListField)):
+        children = [(str(index), field.child) for index in range(fanout)]
+    elif isinstance(field, relations.ManyRelatedField):
+        children = [(str(index), field.child_relation) for index in range(fanout)]
+    elif isinstance(field, serializers.Serializer):
+        children = [(name, child) for name, child in field.fields.items()
+                    if not child.write_only]
+    else:
+        yield ''
+        return
+
+    for prefix, child in children:
+        for header in field_columns(child, level_sep, fanout):
+            # Mirror CSVRenderer.nest_flat_item
+            yield level_sep.join([prefix, header]) if header else prefix
@@ -0,0 +1,145 @@
+"""
+Measuring renders and parses, for finding where the time goes in slow
+exports and uploads.
+"""
+from time import perf_counter
+
+
+class Metrics(object):
+    """
+    Measurements of a single render or parse.
+
+    - `operation`: 'render', 'stream', or 'parse'.
+    - `sender`: the renderer or parser, and `context`: its renderer or parser
+      context (e.g. to tag metrics with the view).
+    - `rows` and `columns`: the size of the table, not counting the header.
+    - `bytes`: the size of the output (or of the parsed body).
+    - `peak_buffer`: the most bytes held at once: the whole output or body,
+      or the largest chunk of streamed output.
+    - `timings`: seconds spent in each phase, and in 'total'. See the
+      renderers and parsers for their phases.
+    - `time_to_first_byte`: for streamed output, seconds until the first
+      chunk was ready.
+    - `complete`: False if streamed output was closed before the end.
+    """
+    def __init__(self, operation, sender, context):
+        self.operation = operation
+        self.sender = sender
+        self.context = context
+        self.rows = 0
+        self.columns = 0
+        self.bytes = 0
+        self.peak_buffer = 0
+        self.timings = {}
+        self.time_to_first_byte = None
+        self.complete = True
+        self.started = perf_counter()
+
+    def add_time(self, phase, seconds):
+        self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+
+    def finish(self, residual_phase):
+        """
+        Record the total time, attributing any time that wasn't measured
+        directly to the *residual_phase*.
+        """
+        total = perf_counter() - self.started
+        self.add_time(residual_phase, max(total - sum(self.timings.values()), 0.0))
+        self.timings['total'] = total
+
+    def __repr__(self):
+        return '<Metrics %s: %d rows, %d columns, %d bytes in %.3fs>' % (
+            self.operation, self.rows, self.columns, self.bytes,
+            self.timings.get('total', 0.0))
+
+
+def start_metrics(sender, signal, operation, context):
+    """
+    Return a Metrics for the *sender*, or None if nothing would use it: the
+    sender's `collect_metrics` is off (in the *context* or on the sender) and
+    nothing is connected to the *signal*.
+    """
+    if context.get('collect_metrics', sender.collect_metrics):
+        return Metrics(operation, sender, context)
+    # Checking the receivers list first skips has_listeners' locking in the
+    # usual case, where nothing is connected at all.
+    if signal.receivers and signal.has_listeners(type(sender)):
+        return Metrics(operation, sender, context)
+    return None
+
+
+def timed_rows(table, metrics, header_row=True):
+    """
+    Yield the rows of a table, counting them and adding the time taken to
+    produce them to the *metrics*: the header row's under 'header' (which
+    includes any header inference), and the other rows' under 'flatten'.
+    Pass `header_row=False` for a table without a header row.
+    """
+    clock = perf_counter
+    timings = metrics.timings
+    table = iter(table)
+
+    if header_row:
+        start = clock()
+        header_row = next(table, None)
+        metrics.add_time('header', clock() - start)
+        if header_row is None:
+            return
+        metrics.columns = len(header_row)
+        yield header_row
+
+    metrics.add_time('flatten', 0.0)
+    start = clock()
+    for row in table:
+        now = clock()
+        timings['flatten'] += now - start
+        metrics.rows += 1
+        yield row
+        start = clock()
+    timings['flatten'] += clock() - start
+
+
+def timed_chunks(chunks, metrics, report):
+    """
+    Yield the chunks of streamed output, measuring their size, the time to
+    the first chunk, and the time spent waiting for the consumer ('send').
+    Calls *report* with the metrics once the chunks are exhausted or closed.
+    """
+    clock = perf_counter
+    try:
+        for chunk in chunks:
+            if metrics.time_to_first_byte is None and chunk:
+                metrics.time_to_first_byte = clock() - metrics.started
+            metrics.bytes += len(chunk)
+            metrics.peak_buffer = max(metrics.peak_buffer, len(chunk))
+            start = clock()
+            yield chunk
+            metrics.add_time('send', clock() - start)
+    except GeneratorExit:
+        metrics.complete = False
+        raise
+    finally:
+        metrics.finish('write')
+        report(metrics)
+
+
+async def atimed_chunks(chunks, metrics, report):
+    """
+    Like `timed_chunks`, for an async iterable of chunks.
+    """
+    clock = perf_counter
+    try:
+        async for chunk in chunks:
+            if metrics.time_to_first_byte is None and chunk:
+                metrics.time_to_first_byte = clock() - metrics.started
+            metrics.bytes += len(chunk)
+            metrics.peak_buffer = max(metrics.peak_buffer, len(chunk))
+            start = clock()
+            yield chunk
+            metrics.add_time('send', clock() - start)
+    except GeneratorExit:
+        metrics.complete = False
+        raise
+    finally:
+        metrics.finish('write')
+        report(metrics)
@@ -1,3 +1,8 @@
+import codecs
+import mmap
+from itertools import chain
+
+
 class Echo(object):
     """An object that implements just the write method of the file-like
     interface.
@@ -5,3 +10,125 @@ class Echo(object):
     def write(self, value):
         """Write the value by returning it, instead of storing in a buffer."""
         return value
+
+
+class ChunkBuffer(object):
+    """A write-only buffer that collects the written strings in a list, so
+    that they can be joined once per chunk.
+    """
+    def __init__(self):
+        self.parts = []
+        self.write = self.parts.append
+
+    def getvalue(self):
+        return ''.join(self.parts)
+
+    def clear(self):
+        del self.parts[:]
+
+
+# The characters that str.splitlines treats as line boundaries
+LINE_BREAKS = '\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029'
+
+
+class LineDecoder(object):
+    """Incrementally decodes bytes and splits the text into lines, the same
+    way as str.splitlines would split the whole decoded text. This means that
+    bare carriage returns (\\r) also act as newlines.
+    """
+    def __init__(self, encoding):
+        self.decoder = codecs.getincrementaldecoder(encoding)()
+        self.pending = ''
+
+    def feed(self, data, final=False):
+        """Decode the bytes in *data*, and return a list of the lines that
+        are complete. Pass final=True to get the remaining lines.
+        """
+        text = self.pending + self.decoder.decode(data, final)
+        lines = text.splitlines()
+        self.pending = ''
+
+        if lines and not final:
+            if text[-1] not in LINE_BREAKS:
+                # The last line may continue in the next chunk
+                self.pending = lines.pop()
+            elif text[-1] == '\r':
+                # The next chunk may start with the rest of a \r\n
+                self.pending = lines.pop() + '\r'
+        return lines
+
+
+def iter_chunks(stream, chunk_size):
+    """Read a byte stream *chunk_size* bytes at a time."""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def peek_chunks(chunks, size):
+    """Read at least *size* bytes (or all of them) from an iterator over
+    chunks of bytes. Returns those bytes, and an iterator over all of the
+    chunks, including the ones already read.
+    """
+    chunks = iter(chunks)
+    peeked = []
+    peeked_size = 0
+    for chunk in chunks:
+        peeked.append(chunk)
+        peeked_size += len(chunk)
+        if peeked_size >= size:
+            break
+    return b''.join(peeked), chain(peeked, chunks)
+
+
+class PrefixedStream(object):
+    """A byte stream that reads *prefix*, bytes that were already read from
+    *stream*, before the rest of *stream*.
+    """
+    def __init__(self, prefix, stream):
+        self.prefix = prefix
+        self.stream = stream
+
+    def read(self, size=-1):
+        if not self.prefix:
+            return self.stream.read(size)
+        if size is None or size < 0:
+            data = self.prefix + self.stream.read()
+            self.prefix = b''
+            return data
+        data, self.prefix = self.prefix[:size], self.prefix[size:]
+        return data
+
+
+def iter_slices(buffer, chunk_size, offset=0):
+    """Slice a bytes-like *buffer*, like a memory map, *chunk_size* bytes at a
+    time, from *offset* on.
+    """
+    for start in range(offset, len(buffer), chunk_size):
+        yield buffer[start:start + chunk_size]
+
+
+def map_file(file):
+    """Memory-map the whole of a file object for reading. Returns None if the
+    file isn't backed by a file on disk, or if it is empty.
+    """
+    try:
+        fileno = file.fileno()
+    except (AttributeError, OSError):
+        return None
+    try:
+        return mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+
+def iter_lines(chunks, encoding):
+    """Decode an iterable of byte *chunks* and iterate over the lines."""
+    decoder = LineDecoder(encoding)
+    for chunk in chunks:
+        for line in decoder.feed(chunk):
+            yield line
+    for line in decoder.feed(b'', final=True):
+        yield line
@@ -0,0 +1,402 @@
+import hashlib
+import posixpath
+import time
+import uuid
+from itertools import islice
+from tempfile import SpooledTemporaryFile
+
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files import File
+from django.db import IntegrityError, connections, transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+from rest_framework.serializers import as_serializer_error
+from rest_framework.settings import api_settings
+
+from rest_framework_csv.exports import range_response
+from rest_framework_csv.querysets import keyset_batches
+from rest_framework_csv.renderers import CSVStreamingRenderer, get_executor
+
+from logging import getLogger
+log = getLogger(__name__)
+
+
+class CSVBulkCreateMixin(object):
+    """
+    Adds a `bulk_upload` action that creates model instances from the rows of
+    a CSV upload.
+
+    Rows are read, validated with the view's serializer, and saved in batches
+    of `bulk_batch_size`, each inside its own transaction. Use with
+    `CSVStreamingParser` to keep only one batch of rows in memory at a time.
+    Invalid rows are skipped and reported with the line that they start on in
+    the CSV, and batches that the database refuses (with an IntegrityError)
+    are reported with the lines that they span.
+    """
+    bulk_batch_size = 1000
+
+    @action(detail=False, methods=['post'])
+    def bulk_upload(self, request, *args, **kwargs):
+        """
+        Create instances from the rows in the request data. Responds with the
+        number of instances created and any errors, e.g.:
+
+            {"created": 2, "errors": [{"line": 3, "errors": {"speaker": [...]}}]}
+
+        Since each batch is saved on its own, some rows may have been created
+        even when there are errors, so the response is a 200 OK unless no rows
+        could be created at all (a 400 Bad Request) or there are no errors (a
+        201 Created).
+        """
+        created, errors = self.bulk_create_rows(request.data)
+        if not errors:
+            response_status = status.HTTP_201_CREATED
+        elif created:
+            response_status = status.HTTP_200_OK
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response({'created': created, 'errors': errors}, status=response_status)
+
+    def bulk_create_rows(self, rows):
+        """
+        Validate and save the given rows. Returns the number of instances
+        created, and a list of errors for the rows that were invalid and the
+        batches that couldn't be saved.
+        """
+        serializer = self.get_serializer(data=[], many=True).child
+        if hasattr(rows, 'numbered'):
+            numbered_rows = rows.numbered()
+        else:
+            numbered_rows = enumerate(rows, 2)
+
+        created = 0
+        errors = []
+        while True:
+            batch = list(islice(numbered_rows, self.bulk_batch_size))
+            if not batch:
+                break
+
+            validated_data = []
+            for line_number, row in batch:
+                try:
+                    validated_data.append(serializer.run_validation(row))
+                except ValidationError as exc:
+                    errors.append({'line': line_number, 'errors': as_serializer_error(exc)})
+
+            if validated_data:
+                try:
+                    with transaction.atomic():
+                        self.perform_bulk_create(serializer, validated_data)
+                except IntegrityError as exc:
+                    errors.append({'line': batch[0][0], 'end_line': batch[-1][0],
+                                   'errors': {api_settings.NON_FIELD_ERRORS_KEY: [str(exc)]}})
+                else:
+                    created += len(validated_data)
+
+        return created, errors
+
+    def perform_bulk_create(self, serializer, validated_data):
+        """
+        Save one batch of validated rows. By default, model instances are
+        created with a single `bulk_create` query; override this to handle
+        many-to-many fields or other related data.
+        """
+        ModelClass = serializer.Meta.model
+        ModelClass._default_manager.bulk_create(
+            [ModelClass(**attrs) for attrs in validated_data])
+
+
+class CSVStreamingExportMixin(object):
+    """
+    Streams the whole filtered queryset, rather than one page of it, when a
+    list is rendered with a `CSVStreamingRenderer` (e.g. `?format=csv`).
+
+    Pagination is skipped for the CSV format. Instead the queryset is read in
+    batches of `export_batch_size` objects using keyset pagination on its
+    ordering (such as the client's `OrderingFilter` ordering), with ties
+    broken by the `export_ordering` field (see `keyset_batches`), and each
+    batch is serialized and streamed, so there are no COUNT or OFFSET
+    queries. Unless the renderer has a header, it is built from the
+    serializer's fields (`export_header_inference`; set it to None to use the
+    renderer's `header_inference`), so the rows don't need to be held in
+    memory. If the serializer has fields whose columns it can't tell, like
+    list or JSON fields, the header is found from the rows instead, which are
+    spooled to a temporary file meanwhile. Other formats are listed as usual.
+
+    With `export_values`, the serializer is skipped altogether: the renderer
+    fetches the header's columns with `values_list` (see
+    `CSVRenderer.queryset_rows`), and the cells hold database values rather
+    than the serializer's representation of them. If some of the columns
+    don't name model fields (e.g. 'owner.name'), the export goes through the
+    serializer after all.
+    """
+    export_batch_size = 1000
+    export_ordering = 'pk'  # A unique, non-null field, to break ties
+    export_header_inference = 'serializer'
+    export_values = False
+
+    def list(self, request, *args, **kwargs):
+        if not isinstance(request.accepted_renderer, CSVStreamingRenderer):
+            return super(CSVStreamingExportMixin, self).list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.get_streaming_response(self.get_export_data(queryset))
+
+    def get_export_data(self, queryset):
+        """
+        Return the data to render for the export: the queryset itself with
+        `export_values`, if the renderer can look up all of the header's
+        columns on its model, and the serialized rows otherwise. This is
+        decided before anything is streamed, so that a column that isn't a
+        field can't fail the response halfway through.
+        """
+        if self.export_values:
+            renderer = self.request.accepted_renderer
+            renderer_context = self.get_export_renderer_context()
+            header = renderer_context.get('header', renderer.header)
+            if not header and renderer_context.get('header_inference', renderer.header_inference) == 'serializer':
+                header = renderer.get_serializer_header(renderer_context)
+            if header and renderer.queryset_lookups(queryset, header) is not None:
+                return queryset
+        return self.export_rows(queryset)
+
+    def export_rows(self, queryset):
+        """
+        Serialize the queryset one batch at a time, yielding each item.
+        """
+        batches = keyset_batches(queryset, self.export_batch_size, self.export_ordering)
+        return (item for batch in batches for item in self.get_serializer(batch, many=True).data)
+
+    def get_streaming_response(self, rows):
+        """
+        Render the rows with the accepted renderer into a
+        StreamingHttpResponse.
+        """
+        renderer = self.request.accepted_renderer
+        response = StreamingHttpResponse(content_type=self.get_export_content_type())
+
+        renderer_context = self.get_export_renderer_context()
+        renderer_context['response'] = response
+        response.streaming_content = renderer.render(
+            rows, self.request.accepted_media_type, renderer_context)
+        return response
+
+    def get_export_renderer_context(self):
+        """
+        Return the renderer context for rendering the export.
+        """
+        renderer_context = self.get_renderer_context()
+        if self.export_header_inference:
+            renderer_context['header_inference'] = self.export_header_inference
+        return renderer_context
+
+    def get_export_content_type(self):
+        renderer = self.request.accepted_renderer
+        if renderer.charset:
+            return '%s; charset=%s' % (renderer.media_type, renderer.charset)
+        return renderer.media_type
+
+
+class CSVCachedExportMixin(CSVStreamingExportMixin):
+    """
+    Like `CSVStreamingExportMixin`, but renders each CSV export once into a
+    file in `export_storage`, and serves it from there to repeat requests for
+    `export_cache_ttl` seconds. The file is sent with an ETag and supports
+    Range requests, so a client can resume an interrupted download without
+    the queryset being read and rendered again.
+
+    `export_storage` must be set, to a storage whose files are not publicly
+    served (unlike MEDIA_ROOT usually is), since the exports may hold the
+    users' private data. Each file is given a random name.
+
+    Exports are keyed on the request's path and query parameters, the
+    accepted renderer, and the user (see `get_export_key`), and indexed in the
+    `export_cache` Django cache. Use a cache shared between the server's
+    processes, or each process renders its own copy. Expired files are left
+    in the storage; delete them periodically with `delete_expired_exports`.
+    """
+    export_storage = None  # A Django storage that isn't publicly served
+    export_location = 'csv-exports'
+    export_cache = 'default'
+    export_cache_ttl = 3600
+    export_spool_size = 8 * 1024 * 1024  # Bytes rendered in memory before using a temporary file
+
+    def list(self, request, *args, **kwargs):
+        if not isinstance(request.accepted_renderer, CSVStreamingRenderer):
+            return super(CSVCachedExportMixin, self).list(request, *args, **kwargs)
+
+        return self.get_export_response(self.get_export())
+
+    def get_export(self):
+        """
+        Return the index entry (a dictionary of the file's 'name', 'size',
+        'etag', and 'created' timestamp) of the export for the request,
+        rendering the export first unless there is a fresh one.
+        """
+        cache = caches[self.export_cache]
+        key = self.get_export_key()
+        export = cache.get(key)
+        if export is None or not self.get_export_storage().exists(export['name']):
+            export = self.render_export(key)
+            cache.set(key, export, self.export_cache_ttl)
+        return export
+
+    def get_export_response(self, export):
+        """
+        Return a response that sends the file of an export's index entry.
+        """
+        storage = self.get_export_storage()
+        return range_response(self.request, storage.open(export['name'], 'rb'), export['size'],
+                              export['content_type'], etag=export['etag'],
+                              last_modified=export['created'])
+
+    def get_export_key(self):
+        """
+        Return the cache key of the export for the request. Override this to
+        share exports between users, or to leave out query parameters that
+        don't change the export.
+        """
+        request = self.request
+        renderer = request.accepted_renderer
+        user = getattr(request, 'user', None)
+        parts = [request.path, sorted(request.query_params.lists()),
+                 request.accepted_media_type, type(renderer).__module__, type(renderer).__name__,
+                 user.pk if user is not None and user.is_authenticated else None]
+        return 'rest_framework_csv.export.%s' % hashlib.sha256(repr(parts).encode('utf-8')).hexdigest()
+
+    def get_export_storage(self):
+        if self.export_storage is None:
+            raise ImproperlyConfigured(
+                '%s.export_storage must be set to a storage whose files are not '
+                'publicly served.' % type(self).__name__)
+        return self.export_storage
+
+    def render_export(self, key):
+        """
+        Render the export into a spooled temporary file, and save it in the
+        storage. Returns its index entry (see `get_export`).
+        """
+        renderer = self.request.accepted_renderer
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = self.get_export_data(queryset)
+
+        # The file is shared by requests with different Accept-Encoding
+        # headers, so it isn't compressed for any one of them.
+        renderer_context = self.get_export_renderer_context()
+        renderer_context['compression'] = None
+
+        with SpooledTemporaryFile(max_size=self.export_spool_size) as spool:
+            for chunk in renderer.render(rows, self.request.accepted_media_type, renderer_context):
+                spool.write(chunk)
+            size = spool.tell()
+            spool.seek(0)
+            # The name can't be worked out from the request, so the file
+            # can't be fetched from the storage without going through the view.
+            filename = '%s.%s' % (uuid.uuid4().hex, renderer.format)
+            name = self.get_export_storage().save(
+                posixpath.join(self.export_location, filename), File(spool))
+
+        created = time.time()
+        etag = '"%s"' % hashlib.sha256(('%s:%s:%d' % (name, created, size)).encode('utf-8')).hexdigest()[:32]
+        return {'name': name, 'size': size, 'etag': etag, 'created': created,
+                'content_type': self.get_export_content_type()}
+
+
+class CSVBackgroundExportMixin(CSVCachedExportMixin):
+    """
+    Like `CSVCachedExportMixin`, but exports of at least
+    `export_async_threshold` rows are rendered in the background, so that the
+    request doesn't time out. Such a request is answered with 202 Accepted and
+    the URL of an export job (in the Location header), which responds with
+    202 until the file is ready, and then with the file itself. Requests for
+    an export that is already being rendered get the same job.
+
+    Jobs are submitted to `export_executor`: 'thread' for a shared pool of
+    `export_workers` threads, or any object with a
+    `concurrent.futures.Executor`-like `submit` method. Override
+    `enqueue_export` to use a task queue instead. The view, its request and
+    the renderer are used by the job, so they can't be sent to other
+    processes. The job URL is the `export_job` action, so the view set must be
+    routed with a router.
+    """
+    export_async_threshold = 100000
+    export_executor = 'thread'
+    export_workers = 2
+
+    def list(self, request, *args, **kwargs):
+        if not isinstance(request.accepted_renderer, CSVStreamingRenderer):
+            return super(CSVBackgroundExportMixin, self).list(request, *args, **kwargs)
+
+        cache = caches[self.export_cache]
+        key = self.get_export_key()
+        export = cache.get(key)
+        if export is not None and self.get_export_storage().exists(export['name']):
+            return self.get_export_response(export)
+        if self.filter_queryset(self.get_queryset()).count() < self.export_async_threshold:
+            return super(CSVBackgroundExportMixin, self).list(request, *args, **kwargs)
+
+        job_id = uuid.uuid4().hex
+        if cache.add(key + '.job', job_id, self.export_cache_ttl):
+            cache.set(self.get_export_job_key(job_id), {'status': 'pending'}, self.export_cache_ttl)
+            self.enqueue_export(job_id, key)
+        else:
+            job_id = cache.get(key + '.job', job_id)
+
+        # Job statuses are JSON whatever the format, since the job still
+        # needs the request's accepted renderer.
+        url = self.reverse_action('export-job', kwargs={'job_id': job_id})
+        response = JsonResponse({'status': 'pending', 'url': url}, status=status.HTTP_202_ACCEPTED)
+        response['Location'] = url
+        return response
+
+    @action(detail=False, url_path=r'export-jobs/(?P<job_id>[0-9a-f]{32})', url_name='export-job')
+    def export_job(self, request, job_id, *args, **kwargs):
+        """
+        Respond with the export once the job has rendered it, and otherwise
+        with the job's status.
+        """
+        job = caches[self.export_cache].get(self.get_export_job_key(job_id))
+        if job is None:
+            raise NotFound()
+        if job['status'] == 'done':
+            return self.get_export_response(job['export'])
+        if job['status'] == 'failed':
+            return JsonResponse({'status': 'failed'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return JsonResponse({'status': job['status']}, status=status.HTTP_202_ACCEPTED)
+
+    def get_export_job_key(self, job_id):
+        return 'rest_framework_csv.export_job.%s' % job_id
+
+    def enqueue_export(self, job_id, key):
+        """
+        Submit the job that renders the export with the given key.
+        """
+        get_executor(self.export_executor, self.export_workers).submit(
+            self.run_export_job, job_id, key)
+
+    def run_export_job(self, job_id, key):
+        """
+        Render the export, and record the job's outcome.
+        """
+        cache = caches[self.export_cache]
+        job_key = self.get_export_job_key(job_id)
+        cache.set(job_key, {'status': 'running'}, self.export_cache_ttl)
+        try:
+            export = self.render_export(key)
+        except Exception:
+            log.exception('CSV export job %s failed', job_id)
+            cache.set(job_key, {'status': 'failed'}, self.export_cache_ttl)
+        else:
+            cache.set(key, export, self.export_cache_ttl)
+            cache.set(job_key, {'status': 'done', 'export': export}, self.export_cache_ttl)
+        finally:
+            cache.delete(key + '.job')
+            # Close the connections that a worker thread opened, but not one
+            # in a transaction, e.g. when the job ran in the request's thread.
+            for connection in connections.all():
+                if not connection.in_atomic_block:
+                    connection.close()
@@ -1,6 +1,195 @@
+from collections.abc import ItemsView, KeysView, Mapping, ValuesView
+from itertools import islice, repeat
+
+
 class OrderedRows(list):
     """
     Maintains original header/field ordering.
     """
+    line_numbers = ()  # Set when some rows take up more than one line
+    conversion_errors = ()  # Set when the parser converts column types
+
     def __init__(self, header):
         self.header = [c.strip() for c in header] if (header is not None) else None
+
+    def numbered(self):
+        """
+        Iterate over (line number, row) pairs, where the line number is the
+        line of the original CSV that the row starts on. If the line numbers
+        weren't recorded, rows are assumed to take up one line each.
+        """
+        if len(self.line_numbers) == len(self):
+            return zip(self.line_numbers, self)
+        return enumerate(self, 2)
+
+
+class OrderedColumns(dict):
+    """
+    Maps column names to lists of values, one for each row, while maintaining
+    original header/field ordering.
+    """
+    conversion_errors = ()  # Set when the parser converts column types
+
+    def __init__(self, header, columns=(), row_count=0):
+        self.header = [c.strip() for c in header]
+        super(OrderedColumns, self).__init__(zip(self.header, columns))
+        self.row_count = row_count
+
+    @property
+    def shape(self):
+        # The number of rows and columns, like a DataFrame's shape.
+        return (self.row_count, len(self))
+
+
+class StreamingOrderedRows(object):
+    """
+    Lazily builds rows from an iterator over (line number, list of values)
+    pairs, while maintaining original header/field ordering. The rows can
+    only be iterated over once.
+    """
+    def __init__(self, header, rows, compact=False, max_shared_values=65536):
+        self.header = [c.strip() for c in header] if (header is not None) else None
+        self.rows = iter(rows)
+        self.make_row = row_factory(self.header, compact, max_shared_values)
+        self.line_num = None
+        self.conversion_errors = []
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        self.line_num, values = next(self.rows)
+        return self.make_row(values)
+
+    def numbered(self):
+        """
+        Iterate over (line number, row) pairs, where the line number is the
+        line of the original CSV that the row starts on.
+        """
+        for row in self:
+            yield self.line_num, row
+
+
+class RereadableOrderedRows(StreamingOrderedRows):
+    """
+    Like StreamingOrderedRows, but the rows are read again from the start each
+    time they are iterated over, from a function that returns a new iterator
+    over (line number, list of values) pairs. Each pass over the rows must
+    finish before the next one starts.
+
+    If there is a *close* function, it is called by `close` (or at the end of
+    a `with` block), to release what the rows are read from.
+    """
+    def __init__(self, header, read_rows, compact=False, max_shared_values=65536, close=None):
+        super(RereadableOrderedRows, self).__init__(header, (), compact, max_shared_values)
+        self.read_rows = read_rows
+        self.closer = close
+
+    def __iter__(self):
+        self.rows = iter(self.read_rows())
+        return self
+
+    def close(self):
+        if self.closer is not None:
+            self.closer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class CompactRow(object):
+    """
+    A read-only mapping from column names to the values in a row. Rows from
+    the same table share one index of column positions, so each row only
+    stores a tuple of its cells.
+    """
+    # CompactRow is registered as a Mapping below rather than inheriting from
+    # it, so that isinstance checks against it stay fast while rendering.
+    __slots__ = ('index', 'cells')
+
+    def __init__(self, index, cells):
+        self.index = index
+        self.cells = cells
+
+    def __getitem__(self, key):
+        try:
+            return self.cells[self.index[key]]
+        except IndexError:
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        position = self.index.get(key)
+        if position is None or position >= len(self.cells):
+            return default
+        return self.cells[position]
+
+    def __contains__(self, key):
+        position = self.index.get(key)
+        return position is not None and position < len(self.cells)
+
+    def __iter__(self):
+        # Like dict(zip(header, cells)), leave out columns past the end of a
+        # short row.
+        return islice(self.index, len(self.cells))
+
+    def __len__(self):
+        return min(len(self.index), len(self.cells))
+
+    def keys(self):
+        return KeysView(self)
+
+    def items(self):
+        return ItemsView(self)
+
+    def values(self):
+        return ValuesView(self)
+
+    def __eq__(self, other):
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        return dict(self.items()) == dict(other.items())
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, dict(self.items()))
+
+
+Mapping.register(CompactRow)
+
+
+def row_factory(header, compact=False, max_shared_values=65536):
+    """
+    Return a function that makes a row mapping from a list of values.
+
+    Compact rows are only used when the column names are unique. Compact rows
+    also share equal cell values (up to *max_shared_values* distinct values),
+    since repeated values like flags and categories would otherwise each be a
+    separate string.
+    """
+    if compact and len(set(header)) == len(header):
+        index = {key: position for position, key in enumerate(header)}
+        shared_values = {}
+
+        def make_row(values):
+            if len(shared_values) < max_shared_values:
+                share = shared_values.setdefault
+            else:
+                share = shared_values.get
+            return CompactRow(index, tuple(map(share, values, values)))
+        return make_row
+    return lambda values: dict(zip(header, values))
+
+
+def make_rows(header, rows, compact=False, max_shared_values=65536):
+    """
+    Return an iterator of row mappings made from an iterable of lists of
+    values (see `row_factory`).
+    """
+    if compact:
+        return map(row_factory(header, compact, max_shared_values), rows)
+    # Build dictionary rows without calling back into Python for each row.
+    return map(dict, map(zip, repeat(header), rows))
@@ -1,11 +1,35 @@
+import base64
+import binascii
 import csv
 import codecs
 import io
+from array import array
+from contextlib import contextmanager
+from itertools import chain, islice, repeat
+from tempfile import NamedTemporaryFile
+from time import perf_counter
 
 from django.conf import settings
-from rest_framework.parsers import BaseParser
+from django.core.exceptions import RequestDataTooBig, TooManyFieldsSent, TooManyFilesSent
+from django.core.files.uploadhandler import SkipFile, StopFutureHandlers, StopUpload
+from django.http import QueryDict
+from django.http.multipartparser import (
+    FIELD, FIELD_TYPES, FILE, ChunkIter, LazyStream, MultiPartParser, MultiPartParserError,
+    Parser, exhaust)
+from django.utils.datastructures import MultiValueDict
+from django.utils.encoding import force_str
+from rest_framework.parsers import BaseParser, DataAndFiles
 from rest_framework.exceptions import ParseError
-from rest_framework_csv.orderedrows import OrderedRows
+from rest_framework_csv.converters import (
+    convert_column, convert_columns, convert_rows, get_converter, get_serializer_column_types)
+from rest_framework_csv.orderedrows import (
+    OrderedColumns, OrderedRows, RereadableOrderedRows, StreamingOrderedRows, make_rows)
+from rest_framework_csv.dialects import sniff_delimiter
+from rest_framework_csv.misc import (
+    PrefixedStream, iter_chunks, iter_lines, iter_slices, map_file, peek_chunks)
+from rest_framework_csv.metrics import start_metrics
+from rest_framework_csv.renderers import get_executor
+from rest_framework_csv.signals import csv_parsed
 
 
 def universal_newlines(stream):
@@ -18,29 +42,905 @@ def universal_newlines(stream):
     for line in stream.splitlines():
         yield line
 
+
+def number_rows(rows):
+    # Pair each row from a csv.reader with the line number that the row
+    # starts on.
+    line_num = rows.line_num
+    for row in rows:
+        yield line_num + 1, row
+        line_num = rows.line_num
+
+
+def wrap_parse_errors(rows):
+    # Errors that happen while rows are being lazily read should look the same
+    # as errors that happen up front.
+    try:
+        for row in rows:
+            yield row
+    except Exception as exc:
+        raise ParseError('CSV parse error - %s' % str(exc))
+
+
+def fit_row(row, width):
+    # Pad short rows with empty values and cut long ones, so that every
+    # column has a value for each row.
+    if len(row) < width:
+        return row + [''] * (width - len(row))
+    return row[:width]
+
+
+def conversion_error(line, column, value, exc):
+    return {'line': line, 'column': column, 'value': value, 'error': str(exc)}
+
+
+def read_at_most(stream, size):
+    # Read up to *size* bytes, even from streams that return less at a time.
+    parts = []
+    while size > 0:
+        part = stream.read(size)
+        if not part:
+            break
+        parts.append(part)
+        size -= len(part)
+    return b''.join(parts)
+
+
+def splittable(encoding, delimiter):
+    """
+    Whether CSV in the encoding can be split at newline bytes, because the
+    bytes of quotes, delimiters and newlines can't be part of other
+    characters (as in UTF-8 and single-byte encodings, but not UTF-16).
+    """
+    if codecs.lookup(encoding).name.startswith(('iso2022', 'hz')):
+        return False
+    special = delimiter + '"\r\n'
+    try:
+        return special.encode('ascii').decode(encoding) == special
+    except UnicodeError:
+        return False
+
+
+def record_boundaries(blocks, chunk_size):
+    """
+    Yield byte offsets of the CSV in an iterable of byte *blocks* that split
+    it into chunks of about *chunk_size* bytes: the first offset after a
+    newline, *chunk_size* bytes on from the last one, that is preceded by an
+    even number of quotes (so that it isn't inside a quoted value).
+    """
+    offset = 0
+    target = chunk_size
+    in_quotes = False
+    for block in blocks:
+        counted = 0  # Quotes in the block are counted up to here
+        while True:
+            start = max(target - offset, counted)
+            newline = block.find(b'\n', start) if start < len(block) else -1
+            if newline == -1:
+                in_quotes ^= block.count(b'"', counted) & 1
+                target = max(target, offset + len(block))
+                break
+            in_quotes ^= block.count(b'"', counted, newline) & 1
+            counted = newline + 1
+            target = offset + counted
+            if not in_quotes:
+                yield target
+                target += chunk_size
+        offset += len(block)
+
+
+# Appended to the lines of a chunk as two values: it is only read as a row
+# of its own, with two values, if the chunk doesn't end inside a quoted value.
+CHUNK_END = '\uffff'
+
+
+def read_chunk(path, start, stop, encoding, delimiter, header, row_type=dict, last=False):
+    """
+    Parse the CSV between two byte offsets of a file, for parsing in parallel.
+    Returns the rows (dictionaries of the *header* columns, or lists or
+    tuples of values, by *row_type*), the number of lines, and the line
+    numbers of the rows counted from the start of the chunk if some rows take
+    up more than one line (otherwise None).
+
+    Returns None if the chunk ends inside a quoted value, which means that it
+    doesn't end between two records, unless it is the *last* chunk.
+    """
+    with open(path, 'rb') as spool:
+        spool.seek(start)
+        strdata = spool.read(stop - start).decode(encoding)
+
+    lines = universal_newlines(strdata)
+    rows = csv.reader(lines if last else chain(lines, [CHUNK_END + delimiter + CHUNK_END]),
+                      dialect=csv.excel, delimiter=delimiter)
+    # Hold the values as tuples of strings, which the garbage collector stops
+    # tracking (and which are cheaper to unpickle), rather than lists.
+    values = list(rows) if row_type is list else list(map(tuple, rows))
+    line_count = rows.line_num
+    if not last:
+        if not values or list(values.pop()) != [CHUNK_END, CHUNK_END]:
+            return None
+        line_count -= 1
+
+    line_numbers = None
+    if line_count != len(values):
+        rows = csv.reader(universal_newlines(strdata), dialect=csv.excel, delimiter=delimiter)
+        line_numbers = [line_number for line_number, _ in number_rows(rows)]
+    if row_type is dict:
+        values = list(make_rows(header, values))
+    return values, line_count, line_numbers
+
+
 class CSVParser(BaseParser):
     """
     Parses CSV serialized data.
 
     The parser assumes the first line contains the column names.
+
+    With `compact_rows` set (on the parser or in the `parser_context`), each
+    row is a read-only CompactRow mapping instead of a dictionary, which uses
+    much less memory for wide data.
+
+    With `column_types` set, the values in the named columns are converted
+    from strings before they are returned (see `get_column_converters`).
+
+    With `parallel_workers` set, bodies of at least `parallel_threshold`
+    bytes are parsed in parallel (see `parse_parallel`).
+
+    With `sniff_dialect` set, and no `delimiter` in the `parser_context`, the
+    delimiter is detected from the first `sniff_sample_size` bytes of the
+    body (see `sniff_delimiter`).
     """
 
     media_type = 'text/csv'
+    compact_rows = False
+    column_types = None  # A dictionary of column names to types, or 'serializer'
+    collect_metrics = False  # Also on whenever csv_parsed has receivers
+    parallel_workers = None  # Parse large bodies in parallel with this many workers
+    parallel_executor = 'process'  # 'process', 'thread', or an Executor
+    parallel_threshold = 32 * 1024 * 1024  # Minimum body size in bytes to parse in parallel
+    parallel_chunk_size = 8 * 1024 * 1024
+    sniff_dialect = False  # Detect the delimiter from the start of the body
+    sniff_sample_size = 4 * 1024
+    sniff_delimiters = ',;\t|'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        delimiter = parser_context.get('delimiter', ',')
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        compact_rows = parser_context.get('compact_rows', self.compact_rows)
+        column_converters = self.get_column_converters(parser_context)
+        metrics = start_metrics(self, csv_parsed, 'parse', parser_context)
+
+        try:
+            if self.sniffs_dialect(parser_context):
+                sample = read_at_most(stream, self.sniff_sample_size)
+                delimiter = self.sniff_delimiter(sample, encoding, parser_context)
+                stream = PrefixedStream(sample, stream)
+
+            data = None
+            if self.parallel_workers and splittable(encoding, delimiter):
+                body = read_at_most(stream, self.parallel_threshold)
+                if len(body) == self.parallel_threshold:
+                    with self.spool_body(body, stream) as (spool, boundaries):
+                        size = spool.tell()
+                        if metrics is not None:
+                            metrics.add_time('read', perf_counter() - metrics.started)
+                        data = self.parse_parallel(spool.name, size, boundaries, delimiter,
+                                                   encoding, compact_rows, column_converters)
+                        if data is None:
+                            # A boundary turned out to be inside a record
+                            spool.seek(0)
+                            body = spool.read()
+            else:
+                body = stream.read()
+
+            if data is None:
+                size = peak_buffer = len(body)
+                if metrics is not None and 'read' not in metrics.timings:
+                    metrics.add_time('read', perf_counter() - metrics.started)
+                data = self.parse_serial(body, delimiter, encoding, compact_rows, column_converters)
+            else:
+                peak_buffer = len(body)
+        except Exception as exc:
+            raise ParseError('CSV parse error - %s' % str(exc))
+
+        if metrics is not None:
+            metrics.rows, metrics.columns = len(data), len(data.header)
+            metrics.bytes, metrics.peak_buffer = size, peak_buffer
+            metrics.finish('parse')
+            self.report_metrics(metrics)
+        return data
+
+    def sniffs_dialect(self, parser_context):
+        return ('delimiter' not in parser_context and
+                parser_context.get('sniff_dialect', self.sniff_dialect))
+
+    def sniff_delimiter(self, sample, encoding, parser_context):
+        """
+        Detect the delimiter (one of `sniff_delimiters`) from *sample*, the
+        first bytes of the body. The delimiter is cached by the key that
+        `get_dialect_key` returns, in `dialects.dialect_cache`.
+        """
+        key = self.get_dialect_key(sample, parser_context)
+        return sniff_delimiter(sample[:self.sniff_sample_size], encoding,
+                               self.sniff_delimiters, key)
+
+    def get_dialect_key(self, sample, parser_context):
+        """
+        Return the key to cache the delimiter sniffed from *sample* by, or
+        None to sniff every body. By default, this is the first line of the
+        body, so that bodies with the same header aren't sniffed again.
+        Override it to cache the delimiter by client instead, e.g.:
+
+            return ('user', parser_context['request'].user.pk)
+        """
+        header, newline, _ = sample.partition(b'\n')
+        return header.rstrip(b'\r') if newline else None
+
+    def parse_serial(self, body, delimiter, encoding, compact_rows, column_converters):
+        strdata = body.decode(encoding)
+        lines = universal_newlines(strdata)
+        rows = csv.reader(lines, dialect=csv.excel, delimiter=delimiter)
+        data = OrderedRows(next(rows))
+        converters = self.get_positions(data.header, column_converters)
+        errors = self.add_rows(data, rows, compact_rows, converters)
+
+        if rows.line_num != len(data) + 1:
+            # Some rows span several lines, so find the line that each
+            # one starts on. Otherwise, OrderedRows.numbered can count
+            # the lines itself.
+            rows = csv.reader(universal_newlines(strdata), dialect=csv.excel, delimiter=delimiter)
+            next(rows)
+            data.line_numbers = array('L', (line_number for line_number, _ in number_rows(rows)))
+
+        self.add_conversion_errors(data, errors)
+        return data
+
+    def add_rows(self, data, rows, compact_rows, converters):
+        # Make rows from the lists of values in *rows*, add them to *data*,
+        # and convert the typed columns. Returns the conversion errors, as
+        # (row index, column name, value, exception) tuples.
+        if converters and compact_rows:
+            # Compact rows are read-only, so convert the lists of values
+            # first. Equal converted values (like 1 and True, or
+            # Decimal('1.0') and Decimal('1.00')) must not be shared.
+            values = list(rows)
+            errors = [(index, data.header[position], value, exc)
+                      for index, position, value, exc in convert_columns(values, converters)]
+            data.extend(make_rows(data.header, values, compact_rows, max_shared_values=0))
+            return errors
+
+        data.extend(make_rows(data.header, rows, compact_rows))
+        if not converters:
+            return []
+        return convert_columns(data, {data.header[position]: converter
+                                      for position, converter in converters.items()})
+
+    def add_conversion_errors(self, data, errors):
+        if errors:
+            line_numbers = data.line_numbers or range(2, len(data) + 2)
+            data.conversion_errors = [
+                conversion_error(line_numbers[index], column, value, exc)
+                for index, column, value, exc in errors]
+
+    @contextmanager
+    def spool_body(self, body, stream):
+        """
+        Write the start of the body, and the rest of the stream, into a
+        temporary file, finding the boundaries for parsing the body in chunks
+        of about `parallel_chunk_size` bytes (see `record_boundaries`) as it
+        is written. Yields the file and the boundaries, and closes the file
+        (which deletes it) afterwards.
+        """
+        def blocks():
+            for block in chain([body], iter_chunks(stream, 1024 * 1024)):
+                spool.write(block)
+                yield block
+
+        with NamedTemporaryFile(dir=settings.FILE_UPLOAD_TEMP_DIR) as spool:
+            boundaries = list(record_boundaries(blocks(), self.parallel_chunk_size))
+            spool.flush()
+            yield spool, boundaries
+
+    def parse_parallel(self, path, size, boundaries, delimiter, encoding, compact_rows,
+                       column_converters):
+        """
+        Parse a spooled body in chunks between the given byte offsets, in a
+        pool of `parallel_workers` processes (or threads), and join the rows
+        in order. Returns None if a chunk doesn't end between two records, as
+        can happen with quotes inside unquoted values, so that the body has to
+        be parsed serially.
+        """
+        # The header comes first, so that the chunks can make rows with it.
+        with open(path, 'rb') as spool:
+            header_end = next(record_boundaries(iter_chunks(spool, 64 * 1024), 1), size)
+        header_chunk = read_chunk(path, 0, header_end, encoding, delimiter, None, list,
+                                  last=header_end == size)
+        if header_chunk is None or len(header_chunk[0]) != 1:
+            return None
+        header_values, header_lines, _ = header_chunk
+        data = OrderedRows(header_values[0])
+        if header_end == size:
+            return data
+
+        converters = self.get_positions(data.header, column_converters)
+        if not compact_rows:
+            row_type = dict
+        elif converters:
+            row_type = list  # Converted in place before making the rows
+        else:
+            row_type = tuple
+
+        starts = [header_end] + [offset for offset in boundaries if header_end < offset < size]
+        stops = starts[1:] + [size]
+        executor = get_executor(self.parallel_executor, self.parallel_workers)
+        chunks = list(executor.map(
+            read_chunk, repeat(path), starts, stops, repeat(encoding), repeat(delimiter),
+            repeat(data.header), repeat(row_type), [stop == size for stop in stops]))
+        if None in chunks:
+            return None
+
+        if header_lines != 1 or any(chunk_line_numbers for _, _, chunk_line_numbers in chunks):
+            data.line_numbers = array('L')
+            first_line = header_lines + 1
+            for rows, line_count, chunk_line_numbers in chunks:
+                if chunk_line_numbers is None:
+                    data.line_numbers.extend(range(first_line, first_line + len(rows)))
+                else:
+                    data.line_numbers.extend(first_line - 1 + line_number
+                                             for line_number in chunk_line_numbers)
+                first_line += line_count
+
+        if row_type is dict:
+            for rows, _, _ in chunks:
+                data.extend(rows)
+            del chunks
+            errors = []
+            if converters:
+                errors = convert_columns(data, {data.header[position]: converter
+                                                for position, converter in converters.items()})
+        else:
+            errors = self.add_rows(data, chain.from_iterable(rows for rows, _, _ in chunks),
+                                   compact_rows, converters)
+
+        self.add_conversion_errors(data, errors)
+        return data
+
+    def get_column_converters(self, parser_context):
+        """
+        Return a dictionary of column names to the converters for their
+        types, from the `column_types` of the parser or the `parser_context`.
+
+        A column type is one of 'int', 'float', 'decimal', 'bool', 'date' or
+        'datetime', or a function that converts a string. With column_types
+        set to 'serializer', the types are taken from the numeric, boolean,
+        date and datetime fields of the view's serializer.
+
+        Empty values become None. Values that can't be converted are left as
+        strings (for the serializer to reject), and described in the
+        `conversion_errors` of the parsed rows.
+        """
+        column_types = parser_context.get('column_types', self.column_types)
+        if column_types == 'serializer':
+            column_types = get_serializer_column_types(parser_context.get('view'))
+        if not column_types:
+            return None
+        return {column: get_converter(column_type)
+                for column, column_type in column_types.items()}
+
+    def get_positions(self, header, column_converters):
+        # Map the positions of the typed columns to their converters.
+        if not column_converters:
+            return None
+        return {position: column_converters[column]
+                for position, column in enumerate(header) if column in column_converters}
+
+    def report_metrics(self, metrics):
+        """
+        Report the metrics of a parse (see `collect_metrics`). Sends the
+        `csv_parsed` signal; override this to forward the metrics elsewhere.
+
+        The timings are broken down into 'read' (reading the request body)
+        and 'parse' (decoding and parsing it). `CSVStreamingParser` does not
+        collect metrics.
+        """
+        csv_parsed.send(sender=self.__class__, metrics=metrics)
+
+
+class CSVStreamingParser(CSVParser):
+    """
+    Parses CSV serialized data lazily, reading and decoding the stream
+    `chunk_size` bytes at a time.
+
+    Returns a StreamingOrderedRows, which can be iterated over once. Only the
+    first line (the column names) is read up front. With `column_types`, the
+    conversion errors are collected as the rows are read.
+    """
+    chunk_size = 64 * 1024
 
     def parse(self, stream, media_type=None, parser_context=None):
+        return self.parse_chunks(iter_chunks(stream, self.chunk_size), parser_context)
+
+    def parse_chunks(self, chunks, parser_context=None):
+        """
+        Parse CSV from an iterator over chunks of bytes.
+        """
         parser_context = parser_context or {}
         delimiter = parser_context.get('delimiter', ',')
         encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        compact_rows = parser_context.get('compact_rows', self.compact_rows)
+        column_converters = self.get_column_converters(parser_context)
 
         try:
-            strdata = stream.read().decode(encoding)
-            lines = universal_newlines(strdata)
+            if self.sniffs_dialect(parser_context):
+                sample, chunks = peek_chunks(chunks, self.sniff_sample_size)
+                delimiter = self.sniff_delimiter(sample, encoding, parser_context)
+            lines = iter_lines(chunks, encoding)
             rows = csv.reader(lines, dialect=csv.excel, delimiter=delimiter)
-            data = OrderedRows(next(rows))
-            for row in rows:
-                row_data = dict(zip(data.header, row))
-                data.append(row_data)
+            header = next(rows)
+            converters = self.get_positions([c.strip() for c in header], column_converters)
+            if not converters:
+                return StreamingOrderedRows(header, wrap_parse_errors(number_rows(rows)), compact_rows)
+
+            def report_error(line, position, value, exc):
+                data.conversion_errors.append(
+                    conversion_error(line, data.header[position], value, exc))
+
+            rows = convert_rows(number_rows(rows), converters, report_error)
+            data = StreamingOrderedRows(header, wrap_parse_errors(rows), compact_rows,
+                                        max_shared_values=0)
+            return data
+        except Exception as exc:
+            raise ParseError('CSV parse error - %s' % str(exc))
+
+
+class CSVMappedParser(CSVStreamingParser):
+    """
+    Parses CSV from a stream that is backed by a file on disk, like a
+    TemporaryUploadedFile, by memory-mapping the file instead of reading it
+    into memory. Pass the file to `parse`, e.g. `request.FILES['file']`.
+
+    Returns a RereadableOrderedRows, which decodes and parses the mapped file
+    `chunk_size` bytes at a time each time it is iterated over, so that the
+    rows can be read more than once (e.g. to validate them, and then to save
+    them) without holding them in memory. Close it, or use it in a `with`
+    block, to unmap the file. With `column_types`, the conversion errors are
+    collected again on each pass.
+
+    Like the other parsers, it parses from the stream's current position, so
+    a file that has already been partly read (e.g. past a preamble) is
+    parsed from there on each pass. Streams that can't be mapped are read
+    again from that position on each pass if they are seekable (like an
+    InMemoryUploadedFile), and are otherwise parsed like `CSVStreamingParser`
+    does, for one pass.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        mapping = map_file(stream)
+        if mapping is not None:
+            start = stream.tell()
+
+            def read_chunks():
+                return iter_slices(mapping, self.chunk_size, start)
+        elif hasattr(stream, 'seekable') and stream.seekable():
+            start = stream.tell()
+
+            def read_chunks():
+                stream.seek(start)
+                return iter_chunks(stream, self.chunk_size)
+        else:
+            return super(CSVMappedParser, self).parse(stream, media_type, parser_context)
+
+        parser_context = parser_context or {}
+        delimiter = parser_context.get('delimiter', ',')
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        compact_rows = parser_context.get('compact_rows', self.compact_rows)
+        column_converters = self.get_column_converters(parser_context)
+
+        def read_rows():
+            rows = csv.reader(iter_lines(read_chunks(), encoding), dialect=csv.excel,
+                              delimiter=delimiter)
+            next(rows, None)  # The header
+            if not converters:
+                return wrap_parse_errors(number_rows(rows))
+
+            def report_error(line, position, value, exc):
+                data.conversion_errors.append(
+                    conversion_error(line, data.header[position], value, exc))
+
+            data.conversion_errors = []
+            return wrap_parse_errors(convert_rows(number_rows(rows), converters, report_error))
+
+        try:
+            if self.sniffs_dialect(parser_context):
+                sample, _ = peek_chunks(read_chunks(), self.sniff_sample_size)
+                delimiter = self.sniff_delimiter(sample, encoding, parser_context)
+            rows = csv.reader(iter_lines(read_chunks(), encoding), dialect=csv.excel,
+                              delimiter=delimiter)
+            header = next(rows)
+            converters = self.get_positions([c.strip() for c in header], column_converters)
+            data = RereadableOrderedRows(header, read_rows, compact_rows,
+                                         max_shared_values=0 if converters else 65536,
+                                         close=mapping.close if mapping is not None else None)
             return data
+        except Exception as exc:
+            if mapping is not None:
+                mapping.close()
+            raise ParseError('CSV parse error - %s' % str(exc))
+
+
+class FormReader(MultiPartParser):
+    """
+    Django's MultiPartParser, but reading the parts of the form one at a
+    time, so that reading can stop at a file part and go on after it. As when
+    Django parses a form, files are passed to the request's upload handlers,
+    file names are sanitized, base64 transfer encoding is decoded, and the
+    DATA_UPLOAD_MAX_NUMBER_FIELDS, DATA_UPLOAD_MAX_NUMBER_FILES and
+    DATA_UPLOAD_MAX_MEMORY_SIZE limits apply.
+
+    The form's fields and files are collected in `data` and `files`, and
+    files are completed and closed through the upload handlers' public API.
+    What it relies on of MultiPartParser's internals (the attributes that its
+    __init__ sets, and the Parser that splits the body into parts) is pinned
+    by the tests, which tox runs against every supported Django version.
+    """
+    def __init__(self, META, input_data, upload_handlers, encoding=None, chunk_size=None):
+        super(FormReader, self).__init__(META, input_data, upload_handlers, encoding)
+        if chunk_size:
+            self._chunk_size = min(self._chunk_size, chunk_size)
+        self.data = QueryDict(mutable=True, encoding=self._encoding)
+        self.files = MultiValueDict()
+        self.parts = None
+        self.field_count = 0
+        self.file_count = 0
+        self.field_bytes = 0
+
+    def start(self):
+        """
+        Start reading the form. Returns the (data, files) of the form if an
+        upload handler parsed all of it instead.
+        """
+        if self._content_length == 0:
+            return self.data, self.files
+        for handler in self._upload_handlers:
+            result = handler.handle_raw_input(self._input_data, self._meta, self._content_length,
+                                              self._boundary, self._encoding)
+            if result is not None:
+                return result
+        self.parts = iter(Parser(LazyStream(ChunkIter(self._input_data, self._chunk_size)),
+                                 self._boundary))
+        return None
+
+    def read(self, until=None):
+        """
+        Read the parts of the form until its end, or until a file part that
+        *until(field_name)* is true for, and return the (field name, content
+        type parameters, chunks) of that part.
+        """
+        if self.parts is None:
+            return None
+        try:
+            for item_type, meta_data, field_stream in self.parts:
+                if item_type in FIELD_TYPES:
+                    self.count_field()
+                try:
+                    disposition = meta_data['content-disposition'][1]
+                    field_name = force_str(disposition['name'].strip(), self._encoding,
+                                           errors='replace')
+                except (KeyError, IndexError, AttributeError):
+                    exhaust(field_stream)
+                    continue
+
+                transfer_encoding = meta_data.get('content-transfer-encoding')
+                if transfer_encoding is not None:
+                    transfer_encoding = transfer_encoding[0].strip()
+
+                if item_type == FIELD:
+                    self.read_field(field_name, field_stream, transfer_encoding)
+                elif item_type == FILE:
+                    self.count_file()
+                    file_name = disposition.get('filename')
+                    if file_name:
+                        file_name = self.sanitize_file_name(
+                            force_str(file_name, self._encoding, errors='replace'))
+                    if not file_name:
+                        exhaust(field_stream)
+                        continue
+                    content_type, content_type_extra = meta_data.get('content-type', ('', {}))
+                    chunks = self.decode_chunks(field_stream, transfer_encoding)
+                    if until is not None and until(field_name):
+                        return field_name, content_type_extra, chunks
+                    self.read_file(field_name, file_name, content_type.strip(), content_type_extra,
+                                   chunks, field_stream)
+                else:
+                    exhaust(field_stream)
+        except StopUpload as exc:
+            self.close_files()
+            if not exc.connection_reset:
+                exhaust(self._input_data)
+        else:
+            exhaust(self._input_data)
+
+        self.parts = None
+        self.data._mutable = False
+        any(handler.upload_complete() for handler in self._upload_handlers)
+        return None
+
+    def count_field(self):
+        self.field_count += 1
+        # 2 accounts for the empty raw parts before and after the last boundary
+        if (settings.DATA_UPLOAD_MAX_NUMBER_FIELDS is not None and
+                self.field_count > settings.DATA_UPLOAD_MAX_NUMBER_FIELDS + 2):
+            raise TooManyFieldsSent(
+                'The number of GET/POST parameters exceeded settings.DATA_UPLOAD_MAX_NUMBER_FIELDS.')
+
+    def count_file(self):
+        self.file_count += 1
+        if (settings.DATA_UPLOAD_MAX_NUMBER_FILES is not None and
+                self.file_count > settings.DATA_UPLOAD_MAX_NUMBER_FILES):
+            raise TooManyFilesSent(
+                'The number of files exceeded settings.DATA_UPLOAD_MAX_NUMBER_FILES.')
+
+    def read_field(self, field_name, field_stream, transfer_encoding):
+        read_size = None
+        if settings.DATA_UPLOAD_MAX_MEMORY_SIZE is not None:
+            read_size = settings.DATA_UPLOAD_MAX_MEMORY_SIZE - self.field_bytes
+        value = field_stream.read(size=read_size)
+        self.field_bytes += len(value) + len(field_name) + 2
+        if transfer_encoding == 'base64':
+            try:
+                value = base64.b64decode(value)
+            except binascii.Error:
+                pass
+        if (settings.DATA_UPLOAD_MAX_MEMORY_SIZE is not None and
+                self.field_bytes > settings.DATA_UPLOAD_MAX_MEMORY_SIZE):
+            raise RequestDataTooBig('Request body exceeded settings.DATA_UPLOAD_MAX_MEMORY_SIZE.')
+
+        # The data is handed to the request before the fields after the CSV
+        # file are read, and is immutable from then on, like request.POST.
+        mutable, self.data._mutable = self.data._mutable, True
+        self.data.appendlist(field_name, force_str(value, self._encoding, errors='replace'))
+        self.data._mutable = mutable
+
+    def decode_chunks(self, field_stream, transfer_encoding):
+        """
+        Iterate over the content of a file part, decoding base64 transfer
+        encoding a multiple of 4 characters at a time.
+        """
+        if transfer_encoding != 'base64':
+            yield from field_stream
+            return
+        for chunk in field_stream:
+            parts = [b''.join(chunk.split())]
+            length = len(parts[0])
+            while length % 4:
+                more = field_stream.read(self._chunk_size)
+                if not more:
+                    break
+                parts.append(b''.join(more.split()))
+                length += len(parts[-1])
+            try:
+                yield base64.b64decode(b''.join(parts))
+            except Exception as exc:
+                raise MultiPartParserError('Could not decode base64 data.') from exc
+
+    def read_file(self, field_name, file_name, content_type, content_type_extra, chunks,
+                  field_stream):
+        counters = [0] * len(self._upload_handlers)
+        try:
+            for handler in self._upload_handlers:
+                try:
+                    handler.new_file(field_name, file_name, content_type, None,
+                                     content_type_extra.get('charset'), content_type_extra)
+                except StopFutureHandlers:
+                    break
+
+            for chunk in chunks:
+                for i, handler in enumerate(self._upload_handlers):
+                    chunk_length = len(chunk)
+                    chunk = handler.receive_data_chunk(chunk, counters[i])
+                    counters[i] += chunk_length
+                    if chunk is None:
+                        break
+        except SkipFile:
+            self.close_files()
+            exhaust(field_stream)
+            return
+
+        for i, handler in enumerate(self._upload_handlers):
+            file_obj = handler.file_complete(counters[i])
+            if file_obj:
+                self.files.appendlist(field_name, file_obj)
+                break
+
+    def close_files(self):
+        # Like Django, assume that upload handlers keep their file as `file`.
+        for handler in self._upload_handlers:
+            if hasattr(handler, 'file'):
+                handler.file.close()
+
+
+class CSVMultiPartParser(CSVStreamingParser):
+    """
+    Parses multipart/form-data, as sent by browser forms, with a CSV file in
+    it. The CSV file's part of the request body is parsed into rows as it is
+    read, instead of being saved to memory or disk first.
+
+    Returns a DataAndFiles, like DRF's MultiPartParser. The CSV file (the
+    `file_field` file, or the first file of the form by default) is a
+    StreamingOrderedRows in `request.FILES` and `request.data`, which reads
+    the request body as it is iterated over. The form fields and other files
+    before it are read as usual. The parts after it can only be read once
+    its rows have been, and their fields are then added to `request.POST`,
+    so put the CSV file at the end of the form.
+    """
+    media_type = 'multipart/form-data'
+    file_field = None
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        request = parser_context['request']
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        file_field = parser_context.get('file_field', self.file_field)
+        meta = request.META.copy()
+        meta['CONTENT_TYPE'] = media_type
+
+        try:
+            reader = FormReader(meta, stream, request.upload_handlers, encoding, self.chunk_size)
+            result = reader.start()
+            if result is not None:
+                return DataAndFiles(*result)
+            csv_part = reader.read(lambda name: file_field is None or name == file_field)
+        except MultiPartParserError as exc:
+            raise ParseError('Multipart form parse error - %s' % str(exc))
+        if csv_part is None:
+            return DataAndFiles(reader.data, reader.files)
+
+        field_name, content_type_extra, chunks = csv_part
+        if content_type_extra.get('charset'):
+            parser_context = dict(parser_context, encoding=content_type_extra['charset'])
+        rows = self.parse_chunks(chunks, parser_context)
+        rows.rows = chain(rows.rows, self.read_remaining_parts(reader))
+        reader.files.appendlist(field_name, rows)
+        reader.data._mutable = False
+        return DataAndFiles(reader.data, reader.files)
+
+    def read_remaining_parts(self, reader):
+        # Read the parts of the form after the CSV file, once its rows have
+        # been read. Yields no rows.
+        try:
+            reader.read()
+        except MultiPartParserError as exc:
+            raise ParseError('Multipart form parse error - %s' % str(exc))
+        yield from ()
+
+
+class CSVColumnarParser(CSVParser):
+    """
+    Parses CSV serialized data into columns, instead of a dictionary for each
+    row.
+
+    By default, returns an OrderedColumns dictionary of column names to lists
+    of values. The body is decoded `chunk_size` bytes at a time, and
+    `batch_size` rows at a time are transposed into the columns. Blank
+    lines are skipped, and short rows are padded with empty values. With
+    `column_types`, whole columns are converted (see
+    `CSVParser.get_column_converters`).
+
+    Set `columnar_format` to 'pandas' for a pandas DataFrame, or to 'arrow'
+    for a pyarrow Table, read by their own CSV readers. These infer the
+    column types themselves; `reader_options` are passed on to
+    `pandas.read_csv` or `pyarrow.csv.read_csv`.
+    """
+    columnar_format = 'columns'  # 'columns', 'pandas', or 'arrow'
+    reader_options = None
+    batch_size = 500  # Few row lists alive at once means cheap garbage collections
+    chunk_size = 64 * 1024
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        delimiter = parser_context.get('delimiter', ',')
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        columnar_format = parser_context.get('columnar_format', self.columnar_format)
+        reader_options = parser_context.get('reader_options', self.reader_options) or {}
+        if columnar_format == 'pandas':
+            read = self.read_pandas
+        elif columnar_format == 'arrow':
+            read = self.read_arrow
+        elif columnar_format == 'columns':
+            read = self.read_columns
+            reader_options = {'column_converters': self.get_column_converters(parser_context)}
+        else:
+            raise ValueError('Unknown columnar format: %r' % (columnar_format,))
+        metrics = start_metrics(self, csv_parsed, 'parse', parser_context)
+
+        try:
+            body = stream.read()
+            if metrics is not None:
+                metrics.add_time('read', perf_counter() - metrics.started)
+            if self.sniffs_dialect(parser_context):
+                delimiter = self.sniff_delimiter(body[:self.sniff_sample_size], encoding,
+                                                 parser_context)
+            data = read(body, delimiter, encoding, **reader_options)
+        except ImportError:
+            raise  # pandas or pyarrow isn't installed
         except Exception as exc:
             raise ParseError('CSV parse error - %s' % str(exc))
 
+        if metrics is not None:
+            metrics.rows, metrics.columns = data.shape
+            metrics.bytes = metrics.peak_buffer = len(body)
+            metrics.finish('parse')
+            self.report_metrics(metrics)
+        return data
+
+    def read_columns(self, body, delimiter, encoding, column_converters=None):
+        # Decode the body a chunk at a time, rather than holding all of its
+        # text and lines at once.
+        def read_lines():
+            return iter_lines(iter_chunks(io.BytesIO(body), self.chunk_size), encoding)
+
+        rows = csv.reader(read_lines(), dialect=csv.excel, delimiter=delimiter)
+        header = [c.strip() for c in next(rows)]
+        width = len(header)
+        batches = [[] for _ in header]
+        row_count = 0
+
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                break
+            if set(map(len, batch)) != {width}:
+                batch = [fit_row(row, width) for row in batch if row]
+            for column_batches, values in zip(batches, zip(*batch)):
+                column_batches.append(values)
+            row_count += len(batch)
+
+        # Keep each column as tuples of values until all of the rows are
+        # read. The garbage collector stops tracking tuples of strings, but
+        # would traverse every value of a growing list each time it ran.
+        columns = []
+        for column_batches in batches:
+            columns.append(list(chain.from_iterable(column_batches)))
+            del column_batches[:]
+
+        converters = self.get_positions(header, column_converters)
+        if not converters:
+            return OrderedColumns(header, columns, row_count)
+
+        errors = []
+        for position, converter in converters.items():
+            values = columns[position]
+            columns[position], bad_values = convert_column(values, converter)
+            if bad_values:
+                errors.extend((index, header[position], value, bad_values[value])
+                              for index, value in enumerate(values) if value in bad_values)
+        data = OrderedColumns(header, columns, row_count)
+
+        if errors:
+            errors.sort(key=lambda error: error[0])
+            line_numbers = range(2, row_count + 2)
+            if rows.line_num != row_count + 1:
+                # Some rows span several lines, or there are blank lines.
+                rows = csv.reader(read_lines(), dialect=csv.excel, delimiter=delimiter)
+                next(rows)
+                line_numbers = [line_number for line_number, row in number_rows(rows) if row]
+            data.conversion_errors = [
+                conversion_error(line_numbers[index], column, value, exc)
+                for index, column, value, exc in errors]
+        return data
+
+    def read_pandas(self, body, delimiter, encoding, **options):
+        import pandas
+
+        options = dict({'sep': delimiter, 'encoding': encoding}, **options)
+        frame = pandas.read_csv(io.BytesIO(body), **options)
+        return frame.rename(columns=lambda name: name.strip() if isinstance(name, str) else name)
+
+    def read_arrow(self, body, delimiter, encoding, **options):
+        from pyarrow import csv as arrow_csv
+
+        options = dict({'read_options': arrow_csv.ReadOptions(encoding=encoding),
+                        'parse_options': arrow_csv.ParseOptions(delimiter=delimiter)},
+                       **options)
+        return arrow_csv.read_csv(io.BytesIO(body), **options)
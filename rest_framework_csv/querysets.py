@@ -0,0 +1,162 @@
+"""
+Reading whole querysets in batches, for exports that are too large to load
+at once, and looking up the columns of a CSV header on a model.
+"""
+import operator
+from functools import reduce
+from itertools import islice
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+from django.db.models import F, OrderBy, Q
+from django.db.models.constants import LOOKUP_SEP
+
+
+def keyset_batches(queryset, batch_size=1000, ordering='pk'):
+    """
+    Iterate over the objects in *queryset* in lists of at most *batch_size*
+    objects, in the queryset's own ordering (e.g. from an `OrderingFilter`)
+    followed by the *ordering* field, which breaks ties (prefix it with '-'
+    for descending order). The *ordering* field must be unique and not null,
+    like the primary key.
+
+    Each batch is fetched by filtering on the last values of the sort keys in
+    the previous batch (keyset pagination), rather than with an OFFSET, so
+    every query costs about the same however deep into the queryset it is.
+    NULLs stay where the ordering puts them (see `keyset_keys`). A queryset
+    ordered by something other than fields and annotations, like
+    `Lower('name')` or '?', is read with a single `iterator()` instead.
+    """
+    keys = keyset_keys(queryset, ordering)
+    if keys is None:
+        return iter_batches(queryset.iterator(chunk_size=batch_size), batch_size)
+
+    queryset = queryset.annotate(**dict(
+        (alias, F(field)) for alias, field, descending, nulls_last in keys
+    )).order_by(*[
+        getattr(F(field), 'desc' if descending else 'asc')(
+            nulls_last=True if nulls_last else None, nulls_first=True if not nulls_last else None)
+        for alias, field, descending, nulls_last in keys
+    ])
+    return iter_keyset_batches(queryset, batch_size, keys)
+
+
+def iter_batches(objects, batch_size):
+    while True:
+        batch = list(islice(objects, batch_size))
+        if not batch:
+            break
+        yield batch
+
+
+def iter_keyset_batches(queryset, batch_size, keys):
+    batch_queryset = queryset
+    while True:
+        batch = list(batch_queryset[:batch_size])
+        if batch:
+            yield batch
+        if len(batch) < batch_size:
+            break
+
+        batch_queryset = queryset.filter(keyset_after(keys, batch[-1]))
+
+
+def keyset_keys(queryset, ordering='pk'):
+    """
+    Return the sort keys of *queryset* followed by the unique *ordering*
+    field, as (alias, field, descending, nulls_last) tuples, or None if the
+    queryset is ordered by expressions that can't be keys. The alias names an
+    annotation that holds the key's value on each object.
+
+    NULLs are placed as an `OrderBy` places them explicitly, and otherwise
+    where the database puts them, i.e. last in ascending order if NULLs sort
+    as the largest values (as on PostgreSQL), and first otherwise.
+    """
+    if queryset.query.order_by:
+        orderings = list(queryset.query.order_by)
+    elif queryset.query.default_ordering:
+        orderings = list(queryset.model._meta.ordering)
+    else:
+        orderings = []
+    orderings.append(ordering)
+
+    pk = queryset.model._meta.pk
+    unique = set(['pk', pk.name, pk.attname, ordering.lstrip('-')])
+    nulls_largest = connections[queryset.db].features.nulls_order_largest
+    keys = []
+    for order in orderings:
+        if isinstance(order, OrderBy) and isinstance(order.expression, F):
+            field, descending = order.expression.name, order.descending
+            if order.nulls_last or order.nulls_first:
+                nulls_last = bool(order.nulls_last)
+            else:
+                nulls_last = nulls_largest != descending
+        elif isinstance(order, F):
+            field, descending = order.name, False
+            nulls_last = nulls_largest
+        elif isinstance(order, str) and order != '?':
+            field, descending = order.lstrip('-'), order.startswith('-')
+            nulls_last = nulls_largest != descending
+        else:
+            return None
+
+        keys.append(('_keyset_%d' % len(keys), field, descending, nulls_last))
+        if field in unique:
+            break
+    return keys
+
+
+def keyset_after(keys, obj):
+    """
+    Return a filter for the objects that come after *obj* in the order of
+    the *keys*.
+    """
+    conditions = []
+    equal = Q()
+    for alias, field, descending, nulls_last in keys[:-1]:
+        value = getattr(obj, alias)
+        if value is None:
+            if not nulls_last:
+                conditions.append(equal & Q(**{field + '__isnull': False}))
+            equal &= Q(**{field + '__isnull': True})
+        else:
+            after = Q(**{'%s__%s' % (field, 'lt' if descending else 'gt'): value})
+            if nulls_last:
+                after |= Q(**{field + '__isnull': True})
+            conditions.append(equal & after)
+            equal &= Q(**{field: value})
+
+    # The last key is unique and not null.
+    alias, field, descending, nulls_last = keys[-1]
+    conditions.append(equal & Q(**{'%s__%s' % (field, 'lt' if descending else 'gt'): getattr(obj, alias)}))
+    return reduce(operator.or_, conditions)
+
+
+def column_lookup(model, column, level_sep='.'):
+    """
+    Translate a *column* of a flattened header (e.g. 'venue.name') into a
+    lookup on *model*'s fields (e.g. 'venue__name'), following foreign keys
+    and one-to-one fields. Returns None if the column doesn't name a single
+    field, e.g. a many-to-many field or something that only the serializer
+    knows about.
+
+    Field names may contain the *level_sep* (like 'first_name' with a '_'
+    separator), so the longest field name that matches is tried first.
+    """
+    parts = column.split(level_sep)
+    for end in range(len(parts), 0, -1):
+        name = level_sep.join(parts[:end])
+        try:
+            field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        if not field.concrete or field.many_to_many:
+            continue
+
+        if end == len(parts):
+            return name
+        if field.many_to_one or field.one_to_one:
+            lookup = column_lookup(field.related_model, level_sep.join(parts[end:]), level_sep)
+            if lookup is not None:
+                return LOOKUP_SEP.join((field.name, lookup))
+    return None
@@ -1,16 +1,104 @@
 from __future__ import unicode_literals
 import codecs
 import csv
+import multiprocessing
 from django.conf import settings
+from django.db.models import QuerySet
+from django.utils.cache import patch_vary_headers
 from rest_framework.renderers import *
-from io import StringIO
-from rest_framework_csv.orderedrows import OrderedRows
-from rest_framework_csv.misc import Echo
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO, StringIO, TextIOWrapper
+from itertools import islice, repeat
+from threading import Lock
+from time import perf_counter
+from rest_framework_csv.orderedrows import OrderedColumns, OrderedRows
+from rest_framework_csv.columnar import columnar_rows, get_columns
+from rest_framework_csv.misc import ChunkBuffer, Echo
+from rest_framework_csv.compression import WBITS, acompress_chunks, compress_chunks, negotiate_compression
+from rest_framework_csv.metrics import atimed_chunks, start_metrics, timed_chunks, timed_rows
+from rest_framework_csv.signals import csv_rendered
+from rest_framework_csv.flatteners import ItemFlattener, _mappings, shared_shapes
+from rest_framework_csv.headers import collect_header, sample_header, spool_header, serializer_header
+from rest_framework_csv.querysets import column_lookup
 from types import GeneratorType
 
 from logging import getLogger
 log = getLogger(__name__)
 
+# Headers built from serializer fields, keyed by serializer class, level
+# separator, and fanout.
+_serializer_headers = {}
+
+# Whether each renderer class flattens items with the default methods
+_compilable_classes = {}
+
+# Pools for rendering in parallel, keyed by executor type and worker count
+_executors = {}
+_executors_lock = Lock()
+
+
+def get_data_header(data):
+    """
+    Return the header that *data* carries with it, like OrderedRows and
+    OrderedColumns do, or None. Other columnar data isn't asked, since a
+    DataFrame with a column named 'header' has that column as an attribute.
+    """
+    if isinstance(data, (OrderedRows, OrderedColumns)):
+        return data.header
+    if get_columns(data) is not None:
+        return None
+    return getattr(data, 'header', None)
+
+
+def setup_worker():
+    # Spawned workers start in a new interpreter, so the project's apps have
+    # to be loaded before tasks that refer to them can be unpickled.
+    import django
+    django.setup()
+
+
+def get_executor(executor, workers):
+    """
+    Return an *executor* instance as is, or else the shared pool of
+    *workers* processes ('process') or threads ('thread'). Process pools
+    spawn their workers rather than forking them, since forking a process
+    that has other threads (as the threads of a WSGI or ASGI server) can
+    deadlock it. Spawned workers set up Django from DJANGO_SETTINGS_MODULE.
+    """
+    if isinstance(executor, Executor):
+        return executor
+
+    with _executors_lock:
+        key = (executor, workers)
+        if key not in _executors:
+            if executor == 'process':
+                _executors[key] = ProcessPoolExecutor(
+                    max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                    initializer=setup_worker)
+            elif executor == 'thread':
+                _executors[key] = ThreadPoolExecutor(max_workers=workers)
+            else:
+                raise ValueError('Unknown executor type: %r' % (executor,))
+        return _executors[key]
+
+
+def render_rows(renderer, data, header, writer_opts, encoding, first=False):
+    """
+    Render a slice of the data into encoded CSV rows. Without a header, *data*
+    is taken to be rows that are already tablized. Unless this is the *first*
+    slice, any byte order mark that the encoding would start with is left
+    out.
+    """
+    table = renderer.flatten_rows(data, header) if header else data
+    csv_buffer = StringIO()
+    csv_writer = csv.writer(csv_buffer, **writer_opts)
+    csv_writer.writerows(table)
+
+    encoder = codecs.getincrementalencoder(encoding)()
+    if not first:
+        encoder.setstate(0)
+    return encoder.encode(csv_buffer.getvalue(), True)
+
 
 class CSVRenderer(BaseRenderer):
     """
@@ -23,6 +111,17 @@ class CSVRenderer(BaseRenderer):
     header = None
     labels = None  # {'<field>':'<label>'}
     writer_opts = None
+    header_inference = 'all'  # 'all', 'sample', 'spool', or 'serializer'
+    header_sample_size = 1000
+    serializer_fanout = None  # Columns for each list field with 'serializer'
+    compile_flattener = True
+    parallel_workers = None  # Render in parallel with this many workers
+    parallel_executor = 'process'  # 'process', 'thread', or an Executor
+    parallel_threshold = 50000  # Minimum number of items to render in parallel
+    parallel_chunk_size = 10000
+    queryset_chunk_size = 2000  # Rows fetched at a time when rendering a QuerySet
+    columnar_batch_size = 10000  # Rows converted at a time from columnar data
+    collect_metrics = False  # Also on whenever csv_rendered has receivers
 
     def render(self, data, media_type=None, renderer_context={}, writer_opts=None):
         """
@@ -31,7 +130,10 @@ class CSVRenderer(BaseRenderer):
         if data is None:
             return ''
 
-        if not isinstance(data, list):
+        metrics = start_metrics(self, csv_rendered, 'render', renderer_context)
+
+        columnar = get_columns(data) is not None
+        if not isinstance(data, (list, QuerySet)) and not columnar:
             data = [data]
 
         if writer_opts is not None:
@@ -43,16 +145,80 @@ class CSVRenderer(BaseRenderer):
         header = renderer_context.get('header', self.header)
         labels = renderer_context.get('labels', self.labels)
         encoding = renderer_context.get('encoding', settings.DEFAULT_CHARSET)
+        header_inference = renderer_context.get('header_inference', self.header_inference)
 
-        table = self.tablize(data, header=header, labels=labels)
-        csv_buffer = StringIO()
-        csv_writer = csv.writer(csv_buffer, **writer_opts)
-        for row in table:
-            csv_writer.writerow(row)
+        header = header or get_data_header(data)
+        if not header and header_inference == 'serializer' and not columnar:
+            header = self.get_serializer_header(renderer_context)
 
-        return csv_buffer.getvalue().encode(encoding)
+        if (self.parallel_workers and header and isinstance(data, list) and
+                len(data) >= self.parallel_threshold):
+            rendered = self.render_parallel(data, header, labels, writer_opts, encoding)
+            if metrics is not None:
+                metrics.rows, metrics.columns = len(data), len(header)
+        else:
+            table = self.tablize(data, header=header, labels=labels,
+                                 header_inference=header_inference)
+            if metrics is not None:
+                table = timed_rows(table, metrics)
+            # Encode the rows as they are written, so that the output is
+            # never held as text and as bytes at once.
+            csv_buffer = TextIOWrapper(BytesIO(), encoding=encoding, newline='')
+            csv_writer = csv.writer(csv_buffer, **writer_opts)
+            for row in table:
+                csv_writer.writerow(row)
+
+            # Nothing is written for an empty table, but encodings with a byte
+            # order mark still start with one.
+            rendered = csv_buffer.detach().getvalue() or ''.encode(encoding)
+
+        if metrics is not None:
+            metrics.bytes = metrics.peak_buffer = len(rendered)
+            metrics.finish('write')
+            self.report_metrics(metrics)
+        return rendered
+
+    def report_metrics(self, metrics):
+        """
+        Report the metrics of a render (see `collect_metrics`). Sends the
+        `csv_rendered` signal; override this to forward the metrics
+        elsewhere, e.g. to statsd.
+
+        The timings are broken down into 'header' (producing the header row,
+        including any header inference), 'flatten' (producing the other
+        rows), 'write' (formatting and encoding the CSV, and compressing it),
+        and for the streaming renderers, 'send' (waiting for the response to
+        consume each chunk).
+        `CSVAsyncStreamingRenderer` also records 'fetch' (waiting for items).
+        """
+        csv_rendered.send(sender=self.__class__, metrics=metrics)
 
-    def tablize(self, data, header=None, labels=None):
+    def render_parallel(self, data, header, labels, writer_opts, encoding):
+        """
+        Render the data in slices of `parallel_chunk_size` items, flattening
+        and formatting the slices in a pool of `parallel_workers` processes
+        (or threads), and join the encoded slices in order.
+        """
+        executor = get_executor(self.parallel_executor, self.parallel_workers)
+        chunk_size = self.parallel_chunk_size
+        chunks = [data[start:start + chunk_size]
+                  for start in range(0, len(data), chunk_size)]
+
+        header_row = next(self.tablize([], header=header, labels=labels))
+        parts = [render_rows(self, [header_row], None, writer_opts, encoding, first=True)]
+        parts.extend(executor.map(
+            render_rows, repeat(self), chunks, repeat(header),
+            repeat(writer_opts), repeat(encoding)))
+        return b''.join(parts)
+
+    def __getstate__(self):
+        # Renderers are sent to worker processes when rendering in parallel;
+        # an executor set on the instance stays behind.
+        state = self.__dict__.copy()
+        state.pop('parallel_executor', None)
+        return state
+
+    def tablize(self, data, header=None, labels=None, header_inference=None):
         """
         Convert a list of data into a table.
 
@@ -61,29 +227,64 @@ class CSVRenderer(BaseRenderer):
         each row in the data in order to construct a complete header. Thus, if
         you have a lot of data and want to stream it, you should probably
         provide a header to the renderer (using the `header` attribute, or via
-        the `renderer_context`).
+        the `renderer_context`), or choose a `header_inference` mode that does
+        not keep every row in memory (see `infer_header`).
+
+        A QuerySet (with a header) is tablized from the database values of the
+        header's columns, without serializing or flattening the objects (see
+        `queryset_rows`).
+
+        Columnar data (a pandas DataFrame, a pyarrow Table, a dictionary of
+        NumPy arrays, or OrderedColumns) is tablized a slice of
+        `columnar_batch_size` rows at a time, converting each column as a
+        whole (see `columnar_rows`). Its values are written as they are,
+        without flattening. The header defaults to the data's columns.
         """
         # Try to pull the header off of the data, if it's not passed in as an
         # argument.
-        if not header and hasattr(data, 'header'):
-            header = data.header
-
-        if data:
-            # First, flatten the data (i.e., convert it to a list of
-            # dictionaries that are each exactly one level deep).  The key for
-            # each item designates the name of the column that the item will
-            # fall into.
-            data = self.flatten_data(data)
-
-            # Get the set of all unique headers, and sort them (unless already provided).
-            if not header:
-                # We don't have to materialize the data generator unless we
-                # have to build a header.
-                data = tuple(data)
-                header_fields = set()
-                for item in data:
-                    header_fields.update(list(item.keys()))
-                header = sorted(header_fields)
+        if not header:
+            header = get_data_header(data)
+
+        columns = get_columns(data)
+        if columns is not None:
+            header = header or list(columns)
+            rows = columnar_rows(columns, header, self.columnar_batch_size)
+            if labels:
+                yield [labels.get(x, x) for x in header]
+            else:
+                yield header
+
+            for row in rows:
+                yield row
+
+        elif isinstance(data, QuerySet):
+            # Fetch the columns straight from the database, skipping the
+            # serializer and the flattening.
+            rows = self.queryset_rows(data, header)
+            if labels:
+                yield [labels.get(x, x) for x in header]
+            else:
+                yield header
+
+            for row in rows:
+                yield row
+
+        elif data:
+            if header:
+                # With a known header, each item can be flattened straight
+                # into a row.
+                rows = self.flatten_rows(data, header)
+            else:
+                # First, flatten the data (i.e., convert it to a list of
+                # dictionaries that are each exactly one level deep).  The key
+                # for each item designates the name of the column that the item
+                # will fall into.  Then get the set of all unique headers, and
+                # sort them.
+                header, data = self.infer_header(data, header_inference)
+
+                # Create a row for each dictionary, filling in columns for
+                # which the item has no data with None values.
+                rows = ([item.get(key, None) for key in header] for item in data)
 
             # Return your "table", with the headers as the first row.
             if labels:
@@ -91,10 +292,7 @@ class CSVRenderer(BaseRenderer):
             else:
                 yield header
 
-            # Create a row for each dictionary, filling in columns for which the
-            # item has no data with None values.
-            for item in data:
-                row = [item.get(key, None) for key in header]
+            for row in rows:
                 yield row
 
         elif header:
@@ -108,20 +306,148 @@ class CSVRenderer(BaseRenderer):
             # Generator will yield nothing if there's no data and no header
             pass
 
+    def queryset_rows(self, queryset, header):
+        """
+        Fetch the *header* columns of *queryset* as tuples of database values,
+        `queryset_chunk_size` rows at a time. Each column is looked up on the
+        queryset's model (see `queryset_lookups`).
+        """
+        if not header:
+            raise ValueError('A header is needed to render a queryset.')
+        lookups = self.queryset_lookups(queryset, header)
+        if lookups is None:
+            raise ValueError('The header has columns that are not fields of %s.' %
+                             queryset.model.__name__)
+        return queryset.values_list(*lookups).iterator(chunk_size=self.queryset_chunk_size)
+
+    def queryset_lookups(self, queryset, header):
+        """
+        Return the lookups of the *header* columns on the model of *queryset*
+        (e.g. 'venue__name' for 'venue.name'), or None if some of the columns
+        aren't model fields.
+        """
+        lookups = []
+        for column in header:
+            lookup = column_lookup(queryset.model, column, self.level_sep)
+            if lookup is None:
+                return None
+            lookups.append(lookup)
+        return lookups
+
+    def infer_header(self, data, header_inference=None):
+        """
+        Flatten the data and build a sorted header from the flattened items'
+        keys. Returns the header and an iterable of the flattened items.
+
+        The `header_inference` mode (the renderer's `header_inference` by
+        default) determines how much of the data is used for the header:
+
+        - 'all' looks at every item, keeping all of the flattened items in
+          memory.
+        - 'sample' looks at only the first `header_sample_size` items.
+          Columns that only appear in later items are left out.
+        - 'spool' looks at every item, spooling the flattened items to a
+          temporary file rather than keeping them in memory.
+
+        The 'serializer' mode is handled by `render` (see
+        `get_serializer_header`); if there is no serializer header, every item
+        is looked at, as with 'all' for lists and as with 'spool' for other
+        iterables, like the querysets and generators of streaming exports.
+        """
+        header_inference = header_inference or self.header_inference
+        if header_inference == 'serializer':
+            header_inference = 'all' if isinstance(data, (list, tuple)) else 'spool'
+        flat_data = self.flatten_data(data)
+
+        if header_inference == 'all':
+            flat_data = tuple(flat_data)
+            return collect_header(flat_data), flat_data
+        elif header_inference == 'sample':
+            return sample_header(flat_data, self.header_sample_size)
+        elif header_inference == 'spool':
+            return spool_header(flat_data)
+        else:
+            raise ValueError('Unknown header inference mode: %r' % (header_inference,))
+
+    def get_serializer_header(self, renderer_context):
+        """
+        Build a header from the fields of the view's serializer, so that the
+        data can be tablized in a single pass. The header is cached for each
+        serializer class. Returns None if the view has no serializer, or if
+        the columns of some of its fields (like JSON fields) can't be known
+        from the serializer, so that the header is found from the data.
+        """
+        view = renderer_context.get('view')
+        if not hasattr(view, 'get_serializer'):
+            return None
+
+        serializer_class = view.get_serializer_class()
+        key = (serializer_class, self.level_sep, self.serializer_fanout)
+        try:
+            return _serializer_headers[key]
+        except KeyError:
+            header = serializer_header(view.get_serializer(), self.level_sep,
+                                       self.serializer_fanout)
+            _serializer_headers[key] = header
+            return header
+
     def flatten_data(self, data):
         """
         Convert the given data collection to a list of dictionaries that are
         each exactly one level deep. The key for each value in the dictionaries
         designates the name of the column that the value will fall into.
         """
+        if not self.can_compile_flattener():
+            for item in data:
+                yield self.flatten_item(item)
+            return
+
+        flatten_item = None
         for item in data:
-            flat_item = self.flatten_item(item)
-            yield flat_item
+            if flatten_item is None:
+                keys = tuple(item) if isinstance(item, _mappings) else None
+                flatten_item = ItemFlattener(self.level_sep, self.flatten_item,
+                                             shapes=shared_shapes(self.level_sep, None, keys))
+            yield flatten_item(item)
+
+    def flatten_rows(self, data, header):
+        """
+        Convert the given data collection to rows of values, one for each
+        column in the header. Columns for which an item has no data are filled
+        in with None values.
+        """
+        if self.can_compile_flattener():
+            shapes = shared_shapes(self.level_sep, tuple(header))
+            flatten_row = ItemFlattener(self.level_sep, self.flatten_item, header, shapes)
+            for item in data:
+                yield flatten_row(item)
+        else:
+            for item in self.flatten_data(data):
+                yield [item.get(key, None) for key in header]
+
+    def can_compile_flattener(self):
+        """
+        Whether items can be flattened with an ItemFlattener. Subclasses that
+        customize how items are flattened always use their own methods.
+
+        Since the flattening then only depends on the `level_sep` and the
+        header, the compiled shapes are shared by every such renderer.
+        """
+        if not self.compile_flattener:
+            return False
+        cls = type(self)
+        compilable = _compilable_classes.get(cls)
+        if compilable is None:
+            compilable = all(getattr(cls, name) is getattr(CSVRenderer, name)
+                             for name in ('flatten_data', 'flatten_item', 'flatten_list',
+                                          'flatten_dict', 'nest_flat_item'))
+            _compilable_classes[cls] = compilable
+        return compilable
 
     def flatten_item(self, item):
         if isinstance(item, list):
             flat_item = self.flatten_list(item)
-        elif isinstance(item, dict):
+        elif isinstance(item, _mappings):
             flat_item = self.flatten_dict(item)
         else:
             flat_item = {'': item}
@@ -188,12 +514,26 @@ class CSVRendererWithUnderscores(CSVRenderer):
 
 
 class CSVStreamingRenderer(CSVRenderer):
+    chunk_size = None  # Maximum rows per chunk
+    chunk_bytes = None  # Target characters per chunk
+    chunk_batch_size = 16
+    compression = None  # 'gzip', 'deflate', or 'auto' to follow Accept-Encoding
+    compression_level = 6
+
     def render(self, data, media_type=None, renderer_context={}):
         """
         Renders serialized *data* into CSV to be used with Django
         StreamingHttpResponse. We need to return a generator here, so Django
         can iterate over it, rendering and returning each line.
 
+        If a `chunk_size` or `chunk_bytes` is set (on the renderer or in the
+        `renderer_context`), rows are grouped into larger chunks instead of
+        being returned one line at a time (see `write_chunks`).
+
+        If `compression` is set, the output is compressed on the fly (see
+        `get_compression`). Compressed output is flushed at the end of each
+        chunk when chunking; otherwise it is yielded as zlib produces it.
+
         >>> renderer = CSVStreamingRenderer()
         >>> renderer.header = ['a', 'b']
         >>> data = [{'a': 1, 'b': 2}]
@@ -203,30 +543,258 @@ class CSVStreamingRenderer(CSVRenderer):
         >>> response['Content-Disposition'] = 'attachment; filename="f.csv"'
         >>> # return response
 
+        """
+        metrics = start_metrics(self, csv_rendered, 'stream', renderer_context)
+        compression = self.get_compression(renderer_context)
+        chunks = self.render_chunks(data, media_type, renderer_context, metrics)
+        if compression:
+            level = renderer_context.get('compression_level', self.compression_level)
+            flush = bool(renderer_context.get('chunk_size', self.chunk_size) or
+                         renderer_context.get('chunk_bytes', self.chunk_bytes))
+            chunks = compress_chunks(chunks, compression, level, flush)
+        if metrics is not None:
+            chunks = timed_chunks(chunks, metrics, self.report_metrics)
+        return chunks
+
+    def render_chunks(self, data, media_type=None, renderer_context={}, metrics=None):
+        """
+        Render serialized *data* into a generator of encoded, uncompressed CSV
+        chunks.
         """
         if data is None:
             yield ''
 
         self.labels = renderer_context.get('labels', self.labels)
 
-        if not isinstance(data, GeneratorType) and not isinstance(data, list):
+        columnar = get_columns(data) is not None
+        if not isinstance(data, (GeneratorType, list, QuerySet)) and not columnar:
             data = [data]
 
         writer_opts = renderer_context.get('writer_opts', self.writer_opts or {})
         header = renderer_context.get('header', self.header)
         labels = renderer_context.get('labels', self.labels)
         encoding = renderer_context.get('encoding', settings.DEFAULT_CHARSET)
+        header_inference = renderer_context.get('header_inference', self.header_inference)
         bom = renderer_context.get('bom', False)
+        chunk_size = renderer_context.get('chunk_size', self.chunk_size)
+        chunk_bytes = renderer_context.get('chunk_bytes', self.chunk_bytes)
+
+        header = header or get_data_header(data)
+        if not header and header_inference == 'serializer' and not columnar:
+            header = self.get_serializer_header(renderer_context)
 
         if bom and encoding == settings.DEFAULT_CHARSET:
             yield codecs.BOM_UTF8
 
-        table = self.tablize(data, header=header, labels=labels)
+        table = self.tablize(data, header=header, labels=labels,
+                             header_inference=header_inference)
+        if metrics is not None:
+            table = timed_rows(table, metrics)
+
+        if chunk_size or chunk_bytes:
+            encoder = codecs.getincrementalencoder(encoding)()
+            for chunk in self.write_chunks(table, writer_opts, chunk_size, chunk_bytes):
+                yield encoder.encode(chunk)
+            return
+
         csv_buffer = Echo()
         csv_writer = csv.writer(csv_buffer, **writer_opts)
         for row in table:
             yield csv_writer.writerow(row).encode(encoding)
 
+    def get_compression(self, renderer_context):
+        """
+        Return the content coding ('gzip' or 'deflate') to compress the
+        output with, or None. With 'auto' compression, the coding is
+        negotiated from the Accept-Encoding header of the request in the
+        `renderer_context`.
+
+        If there is a response in the `renderer_context`, its
+        Content-Encoding header is set to match (and Vary includes
+        Accept-Encoding when negotiating).
+        """
+        compression = renderer_context.get('compression', self.compression)
+        response = renderer_context.get('response')
+
+        if compression == 'auto':
+            request = renderer_context.get('request')
+            accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '') if request is not None else ''
+            compression = negotiate_compression(accept_encoding)
+            if response is not None:
+                patch_vary_headers(response, ['Accept-Encoding'])
+        elif compression and compression not in WBITS:
+            raise ValueError('Unknown compression: %r' % (compression,))
+
+        if compression and response is not None:
+            response['Content-Encoding'] = compression
+        return compression
+
+    def write_chunks(self, table, writer_opts, chunk_size=None, chunk_bytes=None):
+        """
+        Write the rows of *table* into a reusable buffer, yielding the
+        buffered CSV text whenever it holds *chunk_size* rows or at least
+        *chunk_bytes* characters (whichever comes first).
+        """
+        csv_buffer = ChunkBuffer()
+        csv_writer = csv.writer(csv_buffer, **writer_opts)
+        table = iter(table)
+        buffered_rows = buffered_chars = 0
+
+        while True:
+            # When aiming for a chunk length, write a few rows at a time so
+            # that chunks don't overshoot it by much.
+            batch_size = chunk_size - buffered_rows if chunk_size else self.chunk_batch_size
+            if chunk_bytes:
+                batch_size = min(batch_size, self.chunk_batch_size)
+
+            rows = list(islice(table, batch_size))
+            if not rows:
+                break
+            csv_writer.writerows(rows)
+            buffered_rows += len(rows)
+            if chunk_bytes:
+                buffered_chars += sum(map(len, csv_buffer.parts[-len(rows):]))
+
+            if ((chunk_size and buffered_rows >= chunk_size) or
+                    (chunk_bytes and buffered_chars >= chunk_bytes)):
+                yield csv_buffer.getvalue()
+                csv_buffer.clear()
+                buffered_rows = buffered_chars = 0
+
+        if buffered_rows:
+            yield csv_buffer.getvalue()
+
+
+class CSVAsyncStreamingRenderer(CSVStreamingRenderer):
+    """
+    Streaming renderer for ASGI deployments. Renders serialized data from an
+    async iterable (or a regular iterable) into an async generator of CSV
+    chunks, to be used with Django's StreamingHttpResponse.
+    """
+    batch_size = 1000  # Items pulled from the data at a time
+
+    def render(self, data, media_type=None, renderer_context={}):
+        """
+        Renders serialized *data* into CSV, an encoded chunk for each batch of
+        `batch_size` items (split further if a `chunk_size` or `chunk_bytes`
+        is set). Items are only pulled from *data* as chunks are consumed.
+        Returns an async generator.
+
+        Without a header, the header is inferred from the first
+        `header_sample_size` items, as with the 'sample' header inference
+        mode. If `compression` is set, each chunk is compressed and flushed.
+
+        >>> async def talks():
+        ...     async for talk in Talk.objects.aiterator():
+        ...         yield TalkSerializer(talk).data
+        >>> renderer = CSVAsyncStreamingRenderer()
+        >>> response = StreamingHttpResponse(renderer.render(talks()),
+                                             content_type='text/csv')
+
+        """
+        metrics = start_metrics(self, csv_rendered, 'stream', renderer_context)
+        compression = self.get_compression(renderer_context)
+        chunks = self.render_chunks(data, media_type, renderer_context, metrics)
+        if compression:
+            level = renderer_context.get('compression_level', self.compression_level)
+            chunks = acompress_chunks(chunks, compression, level)
+        if metrics is not None:
+            chunks = atimed_chunks(chunks, metrics, self.report_metrics)
+        return chunks
+
+    async def render_chunks(self, data, media_type=None, renderer_context={}, metrics=None):
+        """
+        Render serialized *data* into an async generator of encoded,
+        uncompressed CSV chunks. With *metrics*, the time spent waiting for
+        items is recorded under 'fetch'.
+        """
+        if data is None:
+            return
+
+        writer_opts = renderer_context.get('writer_opts', self.writer_opts or {})
+        header = renderer_context.get('header', self.header)
+        labels = renderer_context.get('labels', self.labels)
+        encoding = renderer_context.get('encoding', settings.DEFAULT_CHARSET)
+        header_inference = renderer_context.get('header_inference', self.header_inference)
+        bom = renderer_context.get('bom', False)
+        chunk_size = renderer_context.get('chunk_size', self.chunk_size)
+        chunk_bytes = renderer_context.get('chunk_bytes', self.chunk_bytes)
+
+        if not header:
+            header = get_data_header(data)
+        if not header and header_inference == 'serializer':
+            header = self.get_serializer_header(renderer_context)
+
+        if bom and encoding == settings.DEFAULT_CHARSET:
+            yield codecs.BOM_UTF8
+
+        items = self.aiter_data(data)
+        start = perf_counter()
+        batch = await self.take(items, self.batch_size if header else
+                                max(self.batch_size, self.header_sample_size))
+        if metrics is not None:
+            metrics.add_time('fetch', perf_counter() - start)
+
+        if not header:
+            # Flattening is idempotent, so the flattened sample can be
+            # tablized like the rest of the data.
+            start = perf_counter()
+            header, batch = self.infer_header(batch, 'all')
+            if metrics is not None:
+                metrics.add_time('header', perf_counter() - start)
+
+        encoder = codecs.getincrementalencoder(encoding)()
+        first = True
+        while batch or first:
+            table = self.tablize(batch, header=header, labels=labels)
+            if not first:
+                next(table)  # Skip the header row
+            if metrics is not None:
+                table = timed_rows(table, metrics, header_row=first)
+            for chunk in self.write_chunks(table, writer_opts, chunk_size, chunk_bytes):
+                yield encoder.encode(chunk)
+
+            first = False
+            start = perf_counter()
+            batch = await self.take(items, self.batch_size)
+            if metrics is not None:
+                metrics.add_time('fetch', perf_counter() - start)
+
+    async def aiter_data(self, data):
+        if hasattr(data, '__aiter__'):
+            async for item in data:
+                yield item
+        else:
+            if not isinstance(data, GeneratorType) and not isinstance(data, list):
+                data = [data]
+            for item in data:
+                yield item
+
+    async def take(self, items, count):
+        batch = []
+        while len(batch) < count:
+            try:
+                batch.append(await items.__anext__())
+            except StopAsyncIteration:
+                break
+        return batch
+
+
+class CSVGzipStreamingRenderer(CSVStreamingRenderer):
+    """
+    Streaming renderer for gzipped CSV files, for `.csv.gz` downloads. The
+    gzip stream is the content itself rather than a content coding, so no
+    Content-Encoding header is set. For `.csv.gz` URL suffixes, pass
+    'csv.gz' in the `allowed` formats of `format_suffix_patterns`, whose
+    default pattern doesn't match suffixes with a dot.
+    """
+    media_type = 'application/gzip'
+    format = 'csv.gz'
+    charset = None
+
+    def get_compression(self, renderer_context):
+        return 'gzip'
+
 
 class PaginatedCSVRenderer (CSVRenderer):
     """
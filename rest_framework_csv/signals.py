@@ -0,0 +1,8 @@
+from django.dispatch import Signal
+
+# Sent with the Metrics of a render when metrics are collected (for the
+# streaming renderers, once the output is exhausted or closed).
+csv_rendered = Signal()
+
+# Sent with the Metrics of a parse when metrics are collected.
+csv_parsed = Signal()
@@ -1,11 +1,74 @@
+import base64
 import csv
+import datetime
+import gzip
+import inspect
+import mmap
+import os
+import shutil
+import tempfile
+import zlib
+from concurrent.futures import Executor, Future
+from decimal import Decimal
+from unittest import mock, skipUnless
 from io import BytesIO
 from types import GeneratorType
 
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, TooManyFilesSent
+from django.core.files.uploadedfile import (
+    InMemoryUploadedFile, SimpleUploadedFile, TemporaryUploadedFile)
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadhandler import MemoryFileUploadHandler
+from django.db import IntegrityError, connection, models
+from django.db.models import F
+from django.db.models.functions import Lower
+from django.http import StreamingHttpResponse
+from django.http.multipartparser import MultiPartParser
+from django.test.utils import CaptureQueriesContext
+from django.test import TestCase, override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.urls import path
+from rest_framework import serializers, viewsets
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.routers import SimpleRouter
+from rest_framework.test import APIRequestFactory
+from rest_framework.urlpatterns import format_suffix_patterns
+from rest_framework.views import APIView
 
-from .renderers import CSVRenderer, CSVStreamingRenderer, PaginatedCSVRenderer
-from .parsers import CSVParser
+from .renderers import (CSVRenderer, CSVStreamingRenderer, CSVAsyncStreamingRenderer,
+                        CSVGzipStreamingRenderer, CSVRendererWithUnderscores,
+                        PaginatedCSVRenderer, get_executor)
+from .compression import negotiate_compression, parse_accept_encoding
+from .dialects import DialectCache, dialect_cache, sniff_delimiter
+from .flatteners import ItemFlattener, shared_shapes
+from .parsers import (CSVColumnarParser, CSVMappedParser, CSVMultiPartParser, CSVParser, CSVStreamingParser, FormReader,
+                      read_chunk, record_boundaries)
+from .orderedrows import CompactRow, OrderedColumns
+from .mixins import (CSVBackgroundExportMixin, CSVBulkCreateMixin, CSVCachedExportMixin,
+                     CSVStreamingExportMixin)
+from .exports import delete_expired_exports, parse_range
+from .querysets import column_lookup, keyset_batches
+from .signals import csv_rendered
+from rest_framework.exceptions import ParseError
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
 
 
 
@@ -84,6 +147,132 @@ class TestCSVRenderer (TestCase):
                                 [None, None, 3   , 4     , 5    ],
                                 [6   , None, None, None  , None ]])
 
+    def test_compiled_flattener_matches_generic_flattening(self):
+        renderer = CSVRenderer()
+        generic_renderer = CSVRenderer()
+        generic_renderer.compile_flattener = False
+
+        data = [{'a': 1, 'b': {'x': [2, 3], '': 4}},
+                {'a': 5, 'b': {'x': [6, 7], '': 8}},
+                {'a': 9, 'b': {'x': [10, 11], '': 12}},
+                {'a': 13, 'b': {'x': [14], 'y': {'': 15}}},
+                [16, {'c': 17}],
+                18]
+        self.assertEqual(list(renderer.flatten_data(data)),
+                         list(generic_renderer.flatten_data(data)))
+        self.assertEqual(list(renderer.tablize(data)),
+                         list(generic_renderer.tablize(data)))
+
+        header = ['a', 'b', 'b.x.0', 'b.x.1', 'b.y', 'c']
+        self.assertEqual(list(renderer.tablize(data, header=header)),
+                         list(generic_renderer.tablize(data, header=header)))
+
+    def test_compiled_flattener_falls_back_for_diverging_items(self):
+        renderer = CSVRenderer()
+
+        flat = renderer.tablize([{'a': 1, 'b': 2},
+                                 {'a': 3, 'b': 4},
+                                 {'a': 5, 'b': {'x': 6}},
+                                 {'a': 7, 'b': 8, 'c': 9},
+                                 {'b': 10, 'a': 11}])
+        flat = list(flat)
+        self.assertEqual(flat, [['a', 'b' , 'b.x', 'c' ],
+                                [1  , 2   , None , None],
+                                [3  , 4   , None , None],
+                                [5  , None, 6    , None],
+                                [7  , 8   , None , 9   ],
+                                [11 , 10  , None , None]])
+
+    def test_flattening_overrides_are_respected(self):
+        class UpperCaseRenderer(CSVRenderer):
+            def flatten_dict(self, d):
+                flat_dict = super(UpperCaseRenderer, self).flatten_dict(d)
+                return {key.upper(): val for key, val in flat_dict.items()}
+
+        renderer = UpperCaseRenderer()
+        self.assertFalse(renderer.can_compile_flattener())
+
+        flat = renderer.tablize([{'a': 1}, {'a': 2}, {'a': 3}])
+        flat = list(flat)
+        self.assertEqual(flat, [['A'], [1], [2], [3]])
+
+    def test_compiled_shapes_are_shared_between_renders(self):
+        shared_shapes.cache_clear()
+        data = [{'a': {'b': 1}, 'c': 2}, {'a': {'b': 3}, 'c': 4}]
+
+        with mock.patch.object(ItemFlattener, 'compile', autospec=True,
+                               side_effect=ItemFlattener.compile) as compile:
+            for _ in range(3):
+                self.assertEqual(CSVRenderer().render(data, renderer_context={'header': ['c', 'a.b']}),
+                                 b'c,a.b\r\n2,1\r\n4,3\r\n')
+            self.assertEqual(compile.call_count, 1)
+
+            CSVRenderer().render(data, renderer_context={'header': ['a.b']})
+            CSVRendererWithUnderscores().render(data, renderer_context={'header': ['a_b']})
+            self.assertEqual(compile.call_count, 3)
+
+            for _ in range(2):
+                self.assertEqual(CSVRenderer().render(data), b'a.b,c\r\n1,2\r\n3,4\r\n')
+            CSVRenderer().render([{'x': 1}, {'x': 2}])
+            self.assertEqual(compile.call_count, 5)
+
+    def test_new_shapes_compile_when_shared_shapes_are_full(self):
+        shared_shapes.cache_clear()
+        header = ['a.0', 'a.1', 'a.2']
+        for length in range(1, 11):
+            # Each render has its own shape
+            CSVRenderer().render([{'a': list(range(length))}] * 2, renderer_context={'header': header})
+        shapes = shared_shapes('.', tuple(header))
+        self.assertEqual(len(shapes.functions), ItemFlattener.max_shapes)
+
+        with mock.patch.object(ItemFlattener, 'compile', autospec=True,
+                               side_effect=ItemFlattener.compile) as compile:
+            dump = CSVRenderer().render([{'a': []}] * 3, renderer_context={'header': header})
+            self.assertEqual(dump, b'a.0,a.1,a.2\r\n,,\r\n,,\r\n,,\r\n')
+            self.assertEqual(compile.call_count, 1)
+            self.assertEqual(len(shapes.functions), ItemFlattener.max_shapes)
+
+            # The least recently matched shapes were dropped, the others kept
+            CSVRenderer().render([{'a': list(range(10))}] * 2, renderer_context={'header': header})
+            self.assertEqual(compile.call_count, 1)
+            CSVRenderer().render([{'a': [0]}] * 2, renderer_context={'header': header})
+            self.assertEqual(compile.call_count, 2)
+
+    def test_tablize_with_sampled_header(self):
+        renderer = CSVRenderer()
+        renderer.header_sample_size = 2
+
+        flat = renderer.tablize([{'a': 1},
+                                 {'b': {'x': 2}},
+                                 {'a': 3, 'c': 4}],
+                                header_inference='sample')
+        flat = list(flat)
+        self.assertEqual(flat, [['a' , 'b.x'],
+                                [1   , None ],
+                                [None, 2    ],
+                                [3   , None ]])
+
+    def test_tablize_with_spooled_header(self):
+        renderer = CSVRenderer()
+        data = [{'a': 1, 'b': [2, 3]},
+                {'b': 'hello\u2014goodbye', 'c': {'x': None}},
+                [4, 5],
+                6]
+
+        spooled = renderer.tablize(data, header_inference='spool')
+        self.assertEqual(list(spooled), list(renderer.tablize(data)))
+
+    def test_render_with_header_inference_set_via_renderer_context(self):
+        renderer = CSVRenderer()
+        renderer.header_sample_size = 1
+
+        data = [{'a': 1}, {'a': 2, 'b': 3}]
+        dump = renderer.render(data, renderer_context={'header_inference': 'sample'})
+        self.assertEqual(dump, b'a\r\n1\r\n2\r\n')
+
+        dump = renderer.render(data, renderer_context={'header_inference': 'spool'})
+        self.assertEqual(dump, b'a,b\r\n1,\r\n2,3\r\n')
+
     def test_render_a_list_with_unicode_elements(self):
         renderer = CSVRenderer()
 
@@ -154,6 +343,253 @@ class TestCSVRenderer (TestCase):
         self.assertIn(b"|test|", dump)
         self.assertIn(b"|hello|", dump)
 
+    def test_render_encodings(self):
+        renderer = CSVRenderer()
+        data = [{'a': 'hello\u2014goodbye', 'b': 'caf\xe9'}] * 3000
+        text = 'a,b\r\n' + 'hello\u2014goodbye,caf\xe9\r\n' * 3000
+
+        for encoding in ('utf-8', 'utf-16', 'utf-8-sig', 'utf-32', 'cp1252'):
+            renderer_context = {'encoding': encoding}
+            self.assertEqual(renderer.render(data, renderer_context=renderer_context),
+                             text.encode(encoding))
+            # Encodings with a byte order mark start with one even when empty
+            self.assertEqual(renderer.render([], renderer_context=renderer_context),
+                             ''.encode(encoding))
+
+        with self.assertRaises(UnicodeEncodeError):
+            renderer.render(data, renderer_context={'encoding': 'latin-1'})
+
+
+class AuthorSerializer(serializers.Serializer):
+    name = serializers.CharField()
+    password = serializers.CharField(write_only=True)
+
+
+class BookSerializer(serializers.Serializer):
+    title = serializers.CharField()
+    author = AuthorSerializer()
+    editors = AuthorSerializer(many=True)
+    tags = serializers.ListField(child=serializers.CharField())
+
+
+class BookWithExtraSerializer(BookSerializer):
+    extra = serializers.JSONField()
+
+
+class BookView(object):
+    serializer_class = BookSerializer
+    serializer_calls = 0
+
+    def get_serializer_class(self):
+        return self.serializer_class
+
+    def get_serializer(self, *args, **kwargs):
+        self.serializer_calls += 1
+        return self.serializer_class(*args, **kwargs)
+
+
+class TestSerializerHeader(TestCase):
+
+    def test_header_from_serializer_fields(self):
+        renderer = CSVRenderer()
+        renderer.serializer_fanout = 2
+
+        header = renderer.get_serializer_header({'view': BookView()})
+        self.assertEqual(header, ['title', 'author.name',
+                                  'editors.0.name', 'editors.1.name',
+                                  'tags.0', 'tags.1'])
+
+    def test_header_from_serializer_is_cached(self):
+        class UnderscoreRenderer(CSVRenderer):
+            level_sep = '_'
+            serializer_fanout = 1
+
+        view = BookView()
+        renderer = UnderscoreRenderer()
+        header = renderer.get_serializer_header({'view': view})
+        self.assertEqual(header, ['title', 'author_name', 'editors_0_name', 'tags_0'])
+        renderer.get_serializer_header({'view': view})
+        self.assertEqual(view.serializer_calls, 1)
+
+    def test_render_with_header_from_serializer(self):
+        renderer = CSVRenderer()
+        renderer.header_inference = 'serializer'
+        renderer.serializer_fanout = 1
+
+        data = [{'title': 'Dune', 'author': {'name': 'Frank'},
+                 'editors': [{'name': 'Ann'}, {'name': 'Bob'}],
+                 'tags': ['scifi']}]
+        dump = renderer.render(data, renderer_context={
+            'view': BookView(), 'labels': {'author.name': 'author'}})
+        self.assertEqual(dump, b'title,author,editors.0.name,tags.0\r\n'
+                               b'Dune,Frank,Ann,scifi\r\n')
+
+    def test_render_list_fields_with_header_from_data(self):
+        renderer = CSVRenderer()
+        renderer.header_inference = 'serializer'
+
+        self.assertIsNone(renderer.get_serializer_header({'view': BookView()}))
+        data = [{'title': 'Dune', 'author': {'name': 'Frank'},
+                 'editors': [{'name': 'Ann'}, {'name': 'Bob'}],
+                 'tags': ['scifi', 'classic']}]
+        dump = renderer.render(data, renderer_context={'view': BookView()})
+        self.assertEqual(dump, b'author.name,editors.0.name,editors.1.name,tags.0,tags.1,title\r\n'
+                               b'Frank,Ann,Bob,scifi,classic,Dune\r\n')
+
+    def test_render_unstructured_fields_with_header_from_data(self):
+        renderer = CSVRenderer()
+        renderer.header_inference = 'serializer'
+        view = BookView()
+        view.serializer_class = BookWithExtraSerializer
+
+        self.assertIsNone(renderer.get_serializer_header({'view': view}))
+        data = [{'title': 'Dune', 'author': {'name': 'Frank'}, 'editors': [], 'tags': [],
+                 'extra': {'pages': 412, 'format': 'paperback'}}]
+        dump = renderer.render(data, renderer_context={'view': view})
+        self.assertEqual(dump, b'author.name,extra.format,extra.pages,title\r\n'
+                               b'Frank,paperback,412,Dune\r\n')
+
+        renderer = CSVStreamingRenderer()
+        renderer.header_inference = 'serializer'
+        dump = b''.join(renderer.render((item for item in data), renderer_context={'view': view}))
+        self.assertEqual(dump, b'author.name,extra.format,extra.pages,title\r\n'
+                               b'Frank,paperback,412,Dune\r\n')
+
+    def test_render_with_serializer_inference_and_no_view(self):
+        renderer = CSVStreamingRenderer()
+        renderer.header_inference = 'serializer'
+
+        dump = b''.join(renderer.render([{'b': 1, 'a': 2}]))
+        self.assertEqual(dump, b'a,b\r\n2,1\r\n')
+
+
+class TestParallelRendering(TestCase):
+
+    def setUp(self):
+        self.data = [{'a': i, 'b': {'x': 'hello\u2014goodbye', 'y': [i, i + 1]}}
+                     for i in range(25)]
+        self.header = ['a', 'b.x', 'b.y.0', 'b.y.1', 'c']
+
+    def make_renderer(self, executor):
+        renderer = CSVRenderer()
+        renderer.parallel_workers = 2
+        renderer.parallel_executor = executor
+        renderer.parallel_threshold = 10
+        renderer.parallel_chunk_size = 4
+        return renderer
+
+    def test_render_in_thread_pool(self):
+        renderer = self.make_renderer('thread')
+        serial_renderer = CSVRenderer()
+
+        for encoding in ('utf-8', 'utf-16', 'utf-8-sig'):
+            renderer_context = {'header': self.header, 'labels': {'a': 'A'}, 'encoding': encoding}
+            with mock.patch.object(renderer, 'tablize', wraps=renderer.tablize) as tablize:
+                dump = renderer.render(self.data, renderer_context=renderer_context)
+            self.assertEqual(dump, serial_renderer.render(self.data, renderer_context=renderer_context))
+            tablize.assert_called_once_with([], header=self.header, labels={'a': 'A'})
+
+    def test_render_in_process_pool(self):
+        renderer = self.make_renderer(CSVRenderer.parallel_executor)
+        serial_renderer = CSVRenderer()
+        # Forking once other threads have started can deadlock (and is
+        # deprecated), so the workers are spawned.
+        executor = get_executor(renderer.parallel_executor, renderer.parallel_workers)
+        self.assertEqual(executor._mp_context.get_start_method(), 'spawn')
+
+        renderer_context = {'header': self.header}
+        self.assertEqual(renderer.render(self.data, renderer_context=renderer_context),
+                         serial_renderer.render(self.data, renderer_context=renderer_context))
+
+    def test_render_serially_below_threshold_or_without_header(self):
+        renderer = self.make_renderer('thread')
+
+        with mock.patch.object(renderer, 'render_parallel') as render_parallel:
+            renderer.render(self.data[:5], renderer_context={'header': self.header})
+            renderer.render(self.data)
+        render_parallel.assert_not_called()
+
+
+class TestColumnarRendering(TestCase):
+
+    def setUp(self):
+        self.columns = OrderedColumns(['b', 'a'], [['x', 'y', None], [1, 2.5, True]], 3)
+
+    def test_render_columns(self):
+        renderer = CSVRenderer()
+        renderer.columnar_batch_size = 2
+
+        self.assertEqual(renderer.render(self.columns), b'b,a\r\nx,1\r\ny,2.5\r\n,True\r\n')
+        self.assertEqual(renderer.render(self.columns, renderer_context={
+            'header': ['a', 'missing'], 'labels': {'a': 'A'}}), b'A,missing\r\n1,\r\n2.5,\r\nTrue,\r\n')
+
+    def test_render_matches_rows(self):
+        csv_file = b'v1,v2.id,v3\r\na,1,"2,3"\r\nb,,\r\n'
+        columns = CSVColumnarParser().parse(BytesIO(csv_file))
+
+        self.assertEqual(CSVRenderer().render(columns), csv_file)
+        self.assertEqual(CSVRenderer().render(columns, renderer_context={'header': ['v3', 'v1']}),
+                         CSVRenderer().render(CSVParser().parse(BytesIO(csv_file)),
+                                              renderer_context={'header': ['v3', 'v1']}))
+
+    def test_dictionary_of_lists_is_a_single_row(self):
+        renderer = CSVRenderer()
+        self.assertEqual(renderer.render({'a': [1, 2]}), b'a.0,a.1\r\n1,2\r\n')
+
+    def test_streaming_chunks(self):
+        renderer = CSVStreamingRenderer()
+        renderer.columnar_batch_size = 2
+
+        chunks = list(renderer.render(self.columns, renderer_context={'chunk_size': 2}))
+        self.assertEqual(chunks, [b'b,a\r\nx,1\r\n', b'y,2.5\r\n,True\r\n'])
+
+    @skipUnless(pandas, 'pandas is not installed')
+    def test_render_dataframe(self):
+        frame = pandas.DataFrame({
+            'id': [1, 2, 3],
+            'score': [0.5, float('nan'), 2.0],
+            'day': pandas.to_datetime(['2024-01-01', None, '2024-01-03']),
+            'name': ['a', None, 'c'],
+        })
+        renderer = CSVRenderer()
+        renderer.columnar_batch_size = 2
+
+        self.assertEqual(renderer.render(frame, renderer_context={'labels': {'id': 'ID'}}),
+                         b'ID,score,day,name\r\n1,0.5,2024-01-01 00:00:00,a\r\n'
+                         b'2,,,\r\n3,2.0,2024-01-03 00:00:00,c\r\n')
+        self.assertEqual(b''.join(CSVStreamingRenderer().render(frame, renderer_context={
+            'header': ['name', 'id'], 'chunk_size': 10})), b'name,id\r\na,1\r\n,2\r\nc,3\r\n')
+
+    @skipUnless(pandas, 'pandas is not installed')
+    def test_render_dataframe_with_a_header_column(self):
+        frame = pandas.DataFrame({'header': [1], 'x': [2]})
+        self.assertEqual(CSVRenderer().render(frame), b'header,x\r\n1,2\r\n')
+        self.assertEqual(b''.join(CSVStreamingRenderer().render(frame)), b'header,x\r\n1,2\r\n')
+
+    @skipUnless(numpy, 'NumPy is not installed')
+    def test_render_numpy_arrays(self):
+        data = {'id': numpy.arange(3), 'score': numpy.array([0.5, numpy.nan, 2.0]),
+                'at': numpy.array(['2024-01-01T10:00', 'NaT', '2024-01-03'], dtype='datetime64[ns]')}
+        self.assertEqual(CSVRenderer().render(data),
+                         b'id,score,at\r\n0,0.5,2024-01-01T10:00:00.000000000\r\n'
+                         b'1,,\r\n2,2.0,2024-01-03T00:00:00.000000000\r\n')
+
+    @skipUnless(numpy, 'NumPy is not installed')
+    def test_render_numpy_arrays_of_different_lengths(self):
+        data = {'a': numpy.arange(3), 'b': numpy.arange(2)}
+        with self.assertRaises(ValueError):
+            CSVRenderer().render(data)
+        with self.assertRaises(ValueError):
+            next(CSVStreamingRenderer().render(data))
+
+    @skipUnless(pyarrow, 'pyarrow is not installed')
+    def test_render_arrow_table(self):
+        table = pyarrow.table({'id': [1, 2, 3], 'name': ['a', None, 'c']})
+        renderer = CSVRenderer()
+        renderer.columnar_batch_size = 2
+
+        self.assertEqual(renderer.render(table), b'id,name\r\n1,a\r\n2,\r\n3,c\r\n')
+
 
 class TestCSVStreamingRenderer(TestCase):
 
@@ -191,6 +627,191 @@ class TestCSVStreamingRenderer(TestCase):
         self.assertEqual(list(renderer_generator_dump), list(renderer_list_dump))
 
 
+    def test_renderer_chunk_size(self):
+        renderer = CSVStreamingRenderer()
+        renderer.header = self.header
+        renderer.chunk_size = 2
+        data = [{'a': i, 'b': i * 2} for i in range(4)]
+
+        chunks = list(renderer.render(data))
+        self.assertEqual(chunks, [b'a,b\r\n0,0\r\n',
+                                  b'1,2\r\n2,4\r\n',
+                                  b'3,6\r\n'])
+
+    def test_renderer_chunk_bytes(self):
+        renderer = CSVStreamingRenderer()
+        renderer.header = self.header
+        renderer.chunk_batch_size = 1
+        data = [{'a': i, 'b': i * 2} for i in range(4)]
+
+        chunks = list(renderer.render(data, renderer_context={'chunk_bytes': 10}))
+        self.assertEqual(chunks, [b'a,b\r\n0,0\r\n',
+                                  b'1,2\r\n2,4\r\n',
+                                  b'3,6\r\n'])
+
+    def test_chunked_renderer_value(self):
+        renderer = CSVRenderer()
+        streaming_renderer = CSVStreamingRenderer()
+        data = [{'a': i, 'b': 'hello\u2014goodbye'} for i in range(100)]
+
+        for encoding in ('utf-8', 'utf-16'):
+            renderer_context = {'encoding': encoding, 'chunk_size': 7}
+            renderer_data = renderer.render(data, renderer_context=renderer_context)
+            streaming_renderer_data = b''.join(
+                streaming_renderer.render(data, renderer_context=renderer_context))
+            self.assertEqual(renderer_data, streaming_renderer_data)
+
+
+class TestCSVAsyncStreamingRenderer(TestCase):
+
+    async def collect(self, chunks):
+        return [chunk async for chunk in chunks]
+
+    def test_renderer_return_type(self):
+        renderer = CSVAsyncStreamingRenderer()
+        dump = renderer.render([{'a': 1, 'b': 2}])
+        self.assertTrue(inspect.isasyncgen(dump))
+
+    async def test_renderer_value(self):
+        renderer = CSVRenderer()
+        async_renderer = CSVAsyncStreamingRenderer()
+        async_renderer.batch_size = 2
+        data = [{'a': 1, 'b': {'x': 2}},
+                {'a': 3, 'c': 'hello\u2014goodbye'},
+                {'a': 4},
+                5]
+
+        renderer_data = renderer.render(data)
+        async_renderer_data = b''.join(await self.collect(async_renderer.render(data)))
+        self.assertEqual(renderer_data, async_renderer_data)
+
+        self.assertEqual(b''.join(await self.collect(async_renderer.render([]))), b'')
+
+    async def test_renderer_async_iterable_data(self):
+        async def _generator():
+            for i in range(5):
+                yield {'a': i, 'b': i * 2}
+
+        renderer = CSVAsyncStreamingRenderer()
+        renderer.header = ['a', 'b']
+        renderer.batch_size = 2
+
+        chunks = await self.collect(renderer.render(_generator()))
+        self.assertEqual(chunks, [b'a,b\r\n0,0\r\n1,2\r\n',
+                                  b'2,4\r\n3,6\r\n',
+                                  b'4,8\r\n'])
+
+    async def test_renderer_pulls_data_as_chunks_are_consumed(self):
+        pulled = []
+
+        async def _generator():
+            for i in range(4):
+                pulled.append(i)
+                yield {'a': i}
+
+        renderer = CSVAsyncStreamingRenderer()
+        renderer.header = ['a']
+        renderer.batch_size = 1
+
+        chunks = renderer.render(_generator())
+        self.assertEqual(await chunks.__anext__(), b'a\r\n0\r\n')
+        self.assertEqual(pulled, [0])
+        await chunks.aclose()
+
+
+class CSVExportView(APIView):
+    renderer_classes = [CSVStreamingRenderer, CSVGzipStreamingRenderer]
+
+    def get(self, request, format=None):
+        return Response([{'a': i, 'b': 'hello'} for i in range(100)])
+
+
+class TestCompression(TestCase):
+
+    def setUp(self):
+        self.data = [{'a': i, 'b': 'hello\u2014goodbye'} for i in range(100)]
+        self.expected = CSVRenderer().render(self.data)
+
+    def test_parse_accept_encoding(self):
+        self.assertEqual(parse_accept_encoding('gzip, deflate;q=0.5, X-GZIP;Q=0, br;q=x, ,*'),
+                         {'gzip': 0.0, 'deflate': 0.5, 'br': 0.0, '*': 1.0})
+
+    def test_negotiate_compression(self):
+        self.assertEqual(negotiate_compression('gzip, deflate'), 'gzip')
+        self.assertEqual(negotiate_compression('deflate, gzip;q=0'), 'deflate')
+        self.assertEqual(negotiate_compression('*'), 'gzip')
+        self.assertEqual(negotiate_compression('*, gzip;q=0'), 'deflate')
+        self.assertEqual(negotiate_compression('identity'), None)
+        self.assertEqual(negotiate_compression(''), None)
+        self.assertEqual(negotiate_compression(None), None)
+
+    def test_compressed_output(self):
+        renderer = CSVStreamingRenderer()
+
+        for compression, decompress in [('gzip', gzip.decompress), ('deflate', zlib.decompress)]:
+            for chunk_size in (None, 10):
+                renderer_context = {'compression': compression, 'chunk_size': chunk_size}
+                dump = b''.join(renderer.render(self.data, renderer_context=renderer_context))
+                self.assertEqual(decompress(dump), self.expected)
+
+    def test_compressed_chunks_are_flushed(self):
+        renderer = CSVStreamingRenderer()
+        renderer.compression = 'gzip'
+        renderer.chunk_size = 10
+
+        uncompressed = list(CSVStreamingRenderer().render(self.data, renderer_context={'chunk_size': 10}))
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        chunks = list(renderer.render(self.data))
+        for chunk, expected in zip(chunks, uncompressed):
+            self.assertEqual(decompressor.decompress(chunk), expected)
+        self.assertEqual(len(chunks), len(uncompressed) + 1)
+
+    def test_unknown_compression(self):
+        renderer = CSVStreamingRenderer()
+        with self.assertRaises(ValueError):
+            renderer.render(self.data, renderer_context={'compression': 'br'})
+
+    def test_negotiated_compression_headers(self):
+        view = CSVExportView.as_view()
+        factory = APIRequestFactory()
+
+        with mock.patch.object(CSVStreamingRenderer, 'compression', 'auto'):
+            response = view(factory.get('/', HTTP_ACCEPT_ENCODING='deflate, gzip;q=0')).render()
+            self.assertEqual(response['Content-Encoding'], 'deflate')
+            self.assertIn('Accept-Encoding', response['Vary'])
+            self.assertTrue(zlib.decompress(response.content).startswith(b'a,b\r\n0,hello\r\n'))
+
+            response = view(factory.get('/')).render()
+            self.assertFalse(response.has_header('Content-Encoding'))
+            self.assertIn('Accept-Encoding', response['Vary'])
+            self.assertTrue(response.content.startswith(b'a,b\r\n0,hello\r\n'))
+
+    def test_gzip_format(self):
+        view = CSVExportView.as_view()
+        response = view(APIRequestFactory().get('/', {'format': 'csv.gz'})).render()
+
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertTrue(gzip.decompress(response.content).startswith(b'a,b\r\n0,hello\r\n'))
+
+    @override_settings(ROOT_URLCONF=__name__)
+    def test_gzip_format_suffix(self):
+        response = self.client.get('/export.csv.gz')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertTrue(gzip.decompress(response.content).startswith(b'a,b\r\n'))
+
+        response = self.client.get('/export.csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+
+    async def test_async_compressed_output(self):
+        renderer = CSVAsyncStreamingRenderer()
+        renderer.batch_size = 10
+
+        chunks = renderer.render(self.data, renderer_context={'compression': 'gzip'})
+        dump = b''.join([chunk async for chunk in chunks])
+        self.assertEqual(gzip.decompress(dump), self.expected)
+
+
 class TestPaginatedCSVRenderer(TestCase):
 
     def setUp(self):
@@ -248,6 +869,143 @@ class TestCSVParser(TestCase):
             self.assertEqual(data, [{'Name': 'Kathryn Miller', 'ID': '67', 'Country': 'United States'},
                                     {'Name': 'Jen Mark',       'ID': '78', 'Country': 'Canada'}])
 
+    def test_parse_line_numbers(self):
+        parser = CSVParser()
+
+        data = parser.parse(BytesIO(b'v1,v2\r\na,1\r\nb,2\r\n'))
+        self.assertEqual([line for line, _ in data.numbered()], [2, 3])
+
+        data = parser.parse(BytesIO(b'v1,v2\r\na,"1\r\n2"\r\n\r\nb,"3\n\n4"\r\nc,5\r\n'))
+        self.assertEqual([line for line, _ in data.numbered()], [2, 4, 5, 8])
+        self.assertEqual([row.get('v1') for row in data], ['a', None, 'b', 'c'])
+
+    def test_parse_compact_rows(self):
+        parser = CSVParser()
+        csv_file = b'v1,v2,v3\r\na,1,2.3\r\nb,4\r\n'
+
+        data = parser.parse(BytesIO(csv_file), parser_context={'compact_rows': True})
+        self.assertIsInstance(data[0], CompactRow)
+        self.assertEqual(data, [{'v1': 'a', 'v2': '1', 'v3': '2.3'},
+                                {'v1': 'b', 'v2': '4'}])
+        self.assertEqual(data[1]['v2'], '4')
+        self.assertEqual(data[1].get('v3', 'missing'), 'missing')
+        self.assertNotIn('v3', data[1])
+        self.assertEqual(list(data[1].items()), [('v1', 'b'), ('v2', '4')])
+        with self.assertRaises(KeyError):
+            data[1]['v3']
+
+        renderer = CSVRenderer()
+        self.assertEqual(renderer.render(data), b'v1,v2,v3\r\na,1,2.3\r\nb,4,\r\n')
+
+    def test_parse_compact_rows_with_duplicate_columns(self):
+        parser = CSVParser()
+        parser.compact_rows = True
+        csv_file = b'v1,v1\r\na,b\r\n'
+
+        data = parser.parse(BytesIO(csv_file))
+        self.assertEqual(data, [{'v1': 'b'}])
+
+    def test_compact_rows_validate_with_serializer(self):
+        class RowSerializer(serializers.Serializer):
+            v1 = serializers.CharField()
+            v2 = serializers.IntegerField()
+
+        parser = CSVParser()
+        parser.compact_rows = True
+        csv_file = b'v1,v2\r\na,1\r\nb,2\r\n'
+
+        serializer = RowSerializer(data=parser.parse(BytesIO(csv_file)), many=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.validated_data, [{'v1': 'a', 'v2': 1}, {'v1': 'b', 'v2': 2}])
+
+    def test_parse_column_types(self):
+        parser = CSVParser()
+        parser.column_types = {'id': 'int', 'score': 'float', 'price': 'decimal',
+                               'active': 'bool', 'day': 'date', 'at': 'datetime',
+                               'name': str.upper}
+        csv_file = (b'id,name,score,price,active,day,at\r\n'
+                    b'1,a,0.5,1.50,true,2024-02-29,2024-02-29T10:30:00\r\n'
+                    b'2.0,b,,2,0,2024-03-01,2024-03-01 08:00:00+01:00\r\n')
+
+        data = parser.parse(BytesIO(csv_file))
+        self.assertEqual(data, [
+            {'id': 1, 'name': 'A', 'score': 0.5, 'price': Decimal('1.50'), 'active': True,
+             'day': datetime.date(2024, 2, 29), 'at': datetime.datetime(2024, 2, 29, 10, 30)},
+            {'id': 2, 'name': 'B', 'score': None, 'price': Decimal('2'), 'active': False,
+             'day': datetime.date(2024, 3, 1),
+             'at': datetime.datetime(2024, 3, 1, 8, tzinfo=datetime.timezone(datetime.timedelta(hours=1)))},
+        ])
+        self.assertEqual(str(data[0]['price']), '1.50')
+        self.assertEqual(data.conversion_errors, ())
+
+    def test_parse_column_type_errors(self):
+        parser = CSVParser()
+        csv_file = b'id,active\r\n1,yes\r\n"x\r\ny",maybe\r\n3,no\r\nx\r\n'
+
+        data = parser.parse(BytesIO(csv_file), parser_context={
+            'column_types': {'id': 'int', 'active': 'bool', 'missing': 'date'}})
+        self.assertEqual(data, [{'id': 1, 'active': True}, {'id': 'xy', 'active': 'maybe'},
+                                {'id': 3, 'active': False}, {'id': 'x'}])
+        self.assertEqual([(error['line'], error['column'], error['value'])
+                          for error in data.conversion_errors],
+                         [(3, 'id', 'xy'), (3, 'active', 'maybe'), (6, 'id', 'x')])
+        self.assertIn('maybe', data.conversion_errors[1]['error'])
+
+        csv_file = b'id,day\r\n1,2024-01-01\r\n2,2024-02-30\r\n3,not a date\r\n'
+        data = parser.parse(BytesIO(csv_file), parser_context={
+            'column_types': {'id': 'int', 'day': 'date'}})
+        self.assertEqual([(error['line'], error['value']) for error in data.conversion_errors],
+                         [(3, '2024-02-30'), (4, 'not a date')])
+
+    def test_parse_unknown_column_type(self):
+        parser = CSVParser()
+        parser.column_types = {'id': 'integer'}
+
+        with self.assertRaises(ValueError):
+            parser.parse(BytesIO(b'id\r\n1\r\n'))
+
+    def test_parse_compact_rows_with_column_types(self):
+        parser = CSVParser()
+        csv_file = b'n,flag,price\r\n1,1,1.0\r\n1,true,1.00\r\n'
+
+        data = parser.parse(BytesIO(csv_file), parser_context={
+            'compact_rows': True, 'column_types': {'n': 'int', 'flag': 'bool', 'price': 'decimal'}})
+        self.assertIsInstance(data[0], CompactRow)
+        self.assertIs(data[0]['flag'], True)
+        self.assertIs(type(data[1]['n']), int)
+        self.assertEqual([str(row['price']) for row in data], ['1.0', '1.00'])
+
+    def test_parse_column_types_from_serializer(self):
+        class RowSerializer(serializers.Serializer):
+            name = serializers.CharField()
+            count = serializers.IntegerField()
+            active = serializers.BooleanField()
+            day = serializers.DateField()
+            local_day = serializers.DateField(input_formats=['%d/%m/%Y'])
+            created = serializers.DateTimeField(read_only=True)
+
+        class RowView(object):
+            def get_serializer_class(self):
+                return RowSerializer
+
+            def get_serializer(self, *args, **kwargs):
+                return RowSerializer(*args, **kwargs)
+
+        parser = CSVParser()
+        parser.column_types = 'serializer'
+        csv_file = (b'name,count,active,day,local_day,created\r\n'
+                    b'a,1,false,2024-01-31,31/01/2024,2024-01-31T00:00:00\r\n')
+
+        data = parser.parse(BytesIO(csv_file), parser_context={'view': RowView()})
+        self.assertEqual(data, [{'name': 'a', 'count': 1, 'active': False,
+                                 'day': datetime.date(2024, 1, 31), 'local_day': '31/01/2024',
+                                 'created': '2024-01-31T00:00:00'}])
+
+        serializer = RowSerializer(data=data, many=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.validated_data[0]['day'], datetime.date(2024, 1, 31))
+        self.assertEqual(serializer.validated_data[0]['local_day'], datetime.date(2024, 1, 31))
+
     def test_unicode_parsing(self):
         parser = CSVParser()
         csv_file = 'col1,col2\r\nhello—goodbye,here—there'.encode('utf-8')
@@ -261,3 +1019,1210 @@ class TestCSVParser(TestCase):
 
         data = parser.parse(BytesIO(csv_file), parser_context={'encoding': 'SHIFT_JIS'})
         self.assertEqual(data, [{'col1': 'シフトジス', 'col2': 'シフトジス2'}])
+
+
+class TestParallelParsing(TestCase):
+
+    def setUp(self):
+        rows = []
+        for i in range(30):
+            if i % 7 == 3:
+                rows.append(b'%d,"Multi-line\r\nnote, %d",%d.5' % (i, i, i))
+            elif i % 11 == 5:
+                rows.append(b'')
+            else:
+                rows.append(b'%d,"Note ""%d""",x%d' % (i, i, i))
+        self.body = b'id,note,score\r\n' + b'\r\n'.join(rows) + b'\r\n'
+
+    def make_parser(self, executor):
+        parser = CSVParser()
+        parser.parallel_workers = 2
+        parser.parallel_executor = executor
+        parser.parallel_threshold = 64
+        parser.parallel_chunk_size = 100
+        return parser
+
+    def parse(self, parser, body, **parser_context):
+        data = parser.parse(BytesIO(body), parser_context=parser_context)
+        return data, data.header, list(data.numbered()), data.conversion_errors
+
+    def test_record_boundaries(self):
+        body = b'a,b\n"1\n2",3\n4,5\n'
+        self.assertEqual(list(record_boundaries([body], 1)), [4, 12, 16])
+        self.assertEqual(list(record_boundaries([body[:6], body[6:]], 5)), [12])
+        self.assertEqual(list(record_boundaries([body], 100)), [])
+
+    def test_parse_in_thread_pool(self):
+        parser = self.make_parser('thread')
+        contexts = [{}, {'compact_rows': True},
+                    {'column_types': {'id': 'int', 'score': 'float'}},
+                    {'column_types': {'id': 'int', 'score': 'float'}, 'compact_rows': True}]
+
+        for parser_context in contexts:
+            with mock.patch('rest_framework_csv.parsers.read_chunk', wraps=read_chunk) as chunks:
+                parsed = self.parse(parser, self.body, **parser_context)
+            self.assertGreater(chunks.call_count, 3)
+            self.assertEqual(parsed, self.parse(CSVParser(), self.body, **parser_context))
+
+        data, _, numbered, errors = parsed
+        self.assertEqual(numbered[3], (5, {'id': 3, 'note': 'Multi-linenote, 3', 'score': 3.5}))
+        self.assertEqual(errors[0], {'line': 2, 'column': 'score', 'value': 'x0',
+                                     'error': "could not convert string to float: 'x0'"})
+
+    def test_parse_in_process_pool(self):
+        parser = self.make_parser(CSVParser.parallel_executor)
+        executor = get_executor(parser.parallel_executor, parser.parallel_workers)
+        self.assertEqual(executor._mp_context.get_start_method(), 'spawn')
+        self.assertEqual(self.parse(parser, self.body), self.parse(CSVParser(), self.body))
+
+    def test_quotes_inside_values_fall_back_to_serial(self):
+        # The quote in 5" makes the line after it look like the end of a
+        # quoted value.
+        body = self.body + b'6,5" screen,1\r\n"Two\r\nlines",,\r\n' + self.body
+        parser = self.make_parser('thread')
+        for chunk_size in (10, 40, 100):
+            parser.parallel_chunk_size = chunk_size
+            self.assertEqual(self.parse(parser, body), self.parse(CSVParser(), body))
+
+    def test_parse_serially_when_small_or_unsplittable(self):
+        parser = self.make_parser('thread')
+        with mock.patch('rest_framework_csv.parsers.read_chunk') as chunks:
+            data = parser.parse(BytesIO(b'a,b\r\n1,2\r\n'))
+            self.assertEqual(data, [{'a': '1', 'b': '2'}])
+            data = parser.parse(BytesIO(self.body.decode('utf-8').encode('utf-16')),
+                                parser_context={'encoding': 'utf-16'})
+            self.assertEqual(len(data), 30)
+        chunks.assert_not_called()
+
+    def test_parse_errors(self):
+        parser = self.make_parser('thread')
+        with self.assertRaises(ParseError):
+            parser.parse(BytesIO(self.body.replace(b'Note', b'N\xffte')))
+
+
+class TestCSVStreamingParser(TestCase):
+
+    def setUp(self):
+        self.parser = CSVStreamingParser()
+        self.parser.chunk_size = 3
+
+    def test_parse_matches_csv_parser(self):
+        csv_files = [
+            b'v1,v2,v3\r\na,1,2.3\r\nb,4,5.6\r\n',
+            b'Name,ID,Country\rKathryn Miller,67,United States\rJen Mark,78,Canada',
+            b' col1 ,col2\n"multi\r\nline",\n\nlast,row\n',
+            'col1,col2\r\nhello\u2014goodbye,here\u2014there'.encode('utf-8'),
+        ]
+        for csv_file in csv_files:
+            data = self.parser.parse(BytesIO(csv_file))
+            expected = CSVParser().parse(BytesIO(csv_file))
+            self.assertEqual(data.header, expected.header)
+            self.assertEqual(list(data), expected)
+
+    def test_shift_jis_parsing(self):
+        csv_file = 'col1,col2\r\nシフトジス,シフトジス2'.encode('shift-jis')
+
+        data = self.parser.parse(BytesIO(csv_file), parser_context={'encoding': 'SHIFT_JIS'})
+        self.assertEqual(list(data), [{'col1': 'シフトジス', 'col2': 'シフトジス2'}])
+
+    def test_parse_compact_rows(self):
+        csv_file = b'v1,v2\r\na,1\r\nb,2\r\n'
+
+        data = self.parser.parse(BytesIO(csv_file), parser_context={'compact_rows': True})
+        rows = list(data)
+        self.assertIsInstance(rows[0], CompactRow)
+        self.assertEqual(rows, [{'v1': 'a', 'v2': '1'}, {'v1': 'b', 'v2': '2'}])
+
+    def test_parse_column_types(self):
+        csv_file = b'id,active\r\n1,yes\r\n"x\r\ny",maybe\r\n3,\r\n4\r\n'
+        parser_context = {'column_types': {'id': 'int', 'active': 'bool'}}
+
+        data = self.parser.parse(BytesIO(csv_file), parser_context=parser_context)
+        expected = CSVParser().parse(BytesIO(csv_file), parser_context=parser_context)
+        self.assertEqual(list(data), expected)
+        self.assertEqual(data.conversion_errors, expected.conversion_errors)
+        self.assertEqual(len(data.conversion_errors), 2)
+
+    def test_parse_reads_the_stream_lazily(self):
+        stream = BytesIO(b'a,b\n' + b'1,2\n' * 1000)
+
+        data = self.parser.parse(stream)
+        self.assertEqual(data.header, ['a', 'b'])
+        self.assertEqual(next(data), {'a': '1', 'b': '2'})
+        self.assertLess(stream.tell(), 100)
+
+    def test_parse_errors_in_later_rows(self):
+        data = self.parser.parse(BytesIO(b'a,b\n1,2\n3,4\n\xff,5\n'))
+
+        self.assertEqual(next(data), {'a': '1', 'b': '2'})
+        with self.assertRaises(ParseError):
+            list(data)
+
+
+class TestCSVMappedParser(TestCase):
+
+    def setUp(self):
+        self.parser = CSVMappedParser()
+        self.parser.chunk_size = 3
+
+    def upload(self, content):
+        upload = TemporaryUploadedFile('talks.csv', 'text/csv', len(content), None)
+        upload.write(content)
+        upload.flush()
+        upload.seek(0)
+        self.addCleanup(upload.close)
+        return upload
+
+    def test_parse_matches_csv_parser(self):
+        csv_files = [
+            b'v1,v2,v3\r\na,1,2.3\r\nb,4,5.6\r\n',
+            b' col1 ,col2\n"multi\r\nline",\n\nlast,row\n',
+            'col1,col2\r\nhello\u2014goodbye,here\u2014there'.encode('utf-8'),
+        ]
+        for csv_file in csv_files:
+            with self.parser.parse(self.upload(csv_file)) as data:
+                expected = CSVParser().parse(BytesIO(csv_file))
+                self.assertEqual(data.header, expected.header)
+                self.assertEqual(list(data), expected)
+
+    def test_parse_maps_the_file(self):
+        upload = self.upload(b'a,b\n1,2\n3,4\n')
+
+        with mock.patch('rest_framework_csv.misc.mmap.mmap', wraps=mmap.mmap) as mapped:
+            data = self.parser.parse(upload)
+        mapped.assert_called_once_with(upload.fileno(), 0, access=mmap.ACCESS_READ)
+        upload.close()
+        self.assertEqual(list(data.numbered()), [(2, {'a': '1', 'b': '2'}), (3, {'a': '3', 'b': '4'})])
+        data.close()
+        with self.assertRaises(ValueError):
+            list(data)
+
+    def test_parse_from_the_current_position(self):
+        csv_file = b'# Exported talks\nid,topic\n1,Testing\n2,Debugging\n'
+        for upload in (self.upload(csv_file), BytesIO(csv_file)):
+            upload.readline()
+            with self.parser.parse(upload) as data:
+                self.assertEqual(data.header, ['id', 'topic'])
+                self.assertEqual(list(data), [{'id': '1', 'topic': 'Testing'},
+                                              {'id': '2', 'topic': 'Debugging'}])
+                self.assertEqual(len(list(data)), 2)
+
+    def test_rows_can_be_read_again(self):
+        csv_file = b'id,active\r\n1,yes\r\n2,maybe\r\n3,\r\n'
+        parser_context = {'column_types': {'id': 'int', 'active': 'bool'}, 'compact_rows': True}
+
+        with self.parser.parse(self.upload(csv_file), parser_context=parser_context) as data:
+            first = list(data)
+            self.assertEqual(len(data.conversion_errors), 1)
+            self.assertEqual(list(data), first)
+            self.assertEqual(len(data.conversion_errors), 1)
+        expected = CSVParser().parse(BytesIO(csv_file), parser_context=parser_context)
+        self.assertEqual(first, expected)
+        self.assertEqual(data.conversion_errors, expected.conversion_errors)
+
+    def test_parse_in_memory_upload(self):
+        stream = BytesIO(b'a,b\n1,2\n')
+        upload = InMemoryUploadedFile(stream, 'file', 'talks.csv', 'text/csv', 8, None)
+
+        data = self.parser.parse(upload)
+        self.assertEqual(list(data), [{'a': '1', 'b': '2'}])
+        self.assertEqual(list(data), [{'a': '1', 'b': '2'}])
+
+    def test_parse_unseekable_stream(self):
+        class Unseekable(object):
+            def __init__(self, content):
+                self.read = BytesIO(content).read
+
+        data = self.parser.parse(Unseekable(b'a,b\n1,2\n'))
+        self.assertEqual(list(data), [{'a': '1', 'b': '2'}])
+        self.assertEqual(list(data), [])
+
+    def test_parse_errors(self):
+        with self.assertRaises(ParseError):
+            self.parser.parse(self.upload(b''))
+
+        with self.parser.parse(self.upload(b'a,b\n1,2\n\xff,5\n')) as data:
+            with self.assertRaises(ParseError):
+                list(data)
+
+
+class TalkUploadView(APIView):
+    parser_classes = (CSVMultiPartParser,)
+
+    def post(self, request, *args, **kwargs):
+        rows = list(request.data['talks'])
+        return Response({'event': request.data['event'], 'rows': rows,
+                         'notes': request.POST.getlist('notes')})
+
+
+class TestCSVMultiPartParser(TestCase):
+
+    def setUp(self):
+        self.parser = CSVMultiPartParser()
+        self.parser.chunk_size = 64
+
+    def parse(self, data, parser_context=None):
+        body = encode_multipart(BOUNDARY, data)
+        request = APIRequestFactory().post('/', body, content_type=MULTIPART_CONTENT)
+        stream = BytesIO(body)
+        parser_context = dict(parser_context or {}, request=request)
+        return stream, self.parser.parse(stream, MULTIPART_CONTENT, parser_context)
+
+    def test_form_reader_reads_forms_like_django(self):
+        # FormReader builds on MultiPartParser's internals, so this pins them
+        # for each Django version that tox runs.
+        body = encode_multipart(BOUNDARY, {
+            'event': 'DjangoCon',
+            'slides': [SimpleUploadedFile('../slides.pdf', b'%PDF'), SimpleUploadedFile('notes.txt', b'late')],
+            'notes': 'caf\xe9',
+        })
+        meta = {'CONTENT_TYPE': MULTIPART_CONTENT, 'CONTENT_LENGTH': str(len(body))}
+        data, files = MultiPartParser(meta, BytesIO(body), [MemoryFileUploadHandler()]).parse()
+
+        reader = FormReader(meta, BytesIO(body), [MemoryFileUploadHandler()], chunk_size=16)
+        for name in ('_meta', '_input_data', '_upload_handlers', '_encoding', '_content_length',
+                     '_boundary', '_chunk_size'):
+            self.assertTrue(hasattr(reader, name), name)
+        self.assertIsNone(reader.start())
+        self.assertIsNone(reader.read())
+        self.assertEqual(reader.data, data)
+        self.assertFalse(reader.data._mutable)
+        self.assertEqual(sorted(reader.files), sorted(files))
+        for name in files:
+            self.assertEqual([(f.name, f.content_type, f.read()) for f in reader.files.getlist(name)],
+                             [(f.name, f.content_type, f.read()) for f in files.getlist(name)])
+
+    def test_upload_form(self):
+        csv_file = SimpleUploadedFile('talks.csv', b'topic,speaker\r\nTesting,Ana\r\nDebugging,Aymeric\r\n')
+        request = APIRequestFactory().post('/', {'event': 'DjangoCon', 'talks': csv_file, 'notes': 'late'},
+                                           format='multipart')
+
+        response = TalkUploadView.as_view()(request)
+        self.assertEqual(response.data, {
+            'event': 'DjangoCon',
+            'rows': [{'topic': 'Testing', 'speaker': 'Ana'}, {'topic': 'Debugging', 'speaker': 'Aymeric'}],
+            'notes': ['late'],
+        })
+
+    def test_parse_reads_the_file_lazily(self):
+        csv_file = SimpleUploadedFile('talks.csv', b'a,b\r\n' + b'1,2\r\n' * 1000)
+        stream, result = self.parse({'event': 'DjangoCon', 'talks': csv_file})
+
+        rows = result.files['talks']
+        self.assertEqual(result.data['event'], 'DjangoCon')
+        self.assertLess(stream.tell(), len(stream.getvalue()) / 4)
+        self.assertEqual(next(rows), {'a': '1', 'b': '2'})
+        self.assertEqual(list(rows.numbered())[-1], (1001, {'a': '1', 'b': '2'}))
+
+    def test_parse_file_field(self):
+        other_file = SimpleUploadedFile('notes.txt', b'Some notes')
+        csv_file = SimpleUploadedFile('talks.csv', b'id,active\r\n1,yes\r\nx,no\r\n')
+        parser_context = {'file_field': 'talks', 'column_types': {'id': 'int', 'active': 'bool'}}
+        stream, result = self.parse({'notes': other_file, 'talks': csv_file, 'event': 'DjangoCon'},
+                                    parser_context)
+
+        self.assertEqual(result.files['notes'].read(), b'Some notes')
+        self.assertNotIn('event', result.data)
+        rows = result.files['talks']
+        self.assertEqual(list(rows), [{'id': 1, 'active': True}, {'id': 'x', 'active': False}])
+        self.assertEqual([error['line'] for error in rows.conversion_errors], [3])
+        self.assertEqual(result.data['event'], 'DjangoCon')
+        self.assertEqual(stream.tell(), len(stream.getvalue()))
+
+    @override_settings(DATA_UPLOAD_MAX_NUMBER_FILES=100)
+    def test_parse_too_many_files(self):
+        files = [SimpleUploadedFile('notes%d.txt' % i, b'Some notes') for i in range(151)]
+
+        with self.assertRaises(TooManyFilesSent):
+            self.parse({'notes': files, 'talks': SimpleUploadedFile('talks.csv', b'a,b\r\n')},
+                       {'file_field': 'talks'})
+
+        # The files after the CSV file are only read after its rows
+        stream, result = self.parse({'talks': SimpleUploadedFile('talks.csv', b'a,b\r\n1,2\r\n'),
+                                     'notes': files})
+        with self.assertRaises(TooManyFilesSent):
+            list(result.files['talks'])
+
+    def test_parse_sanitizes_file_names(self):
+        body = (b'--' + BOUNDARY.encode() + b'\r\n'
+                b'Content-Disposition: form-data; name="notes"; filename="../../etc/notes.txt"\r\n'
+                b'\r\n'
+                b'Some notes\r\n'
+                b'--' + BOUNDARY.encode() + b'--\r\n')
+        request = APIRequestFactory().post('/', body, content_type=MULTIPART_CONTENT)
+
+        result = self.parser.parse(BytesIO(body), MULTIPART_CONTENT, {'request': request, 'file_field': 'talks'})
+        self.assertEqual(result.files['notes'].name, 'notes.txt')
+
+    def test_parse_base64_parts(self):
+        def part(headers, content):
+            return (b'--' + BOUNDARY.encode() + b'\r\n' + headers +
+                    b'Content-Transfer-Encoding: base64\r\n\r\n' + content + b'\r\n')
+        body = (part(b'Content-Disposition: form-data; name="event"\r\n', b'RGphbmdvQ29u') +
+                part(b'Content-Disposition: form-data; name="talks"; filename="talks.csv"\r\n',
+                     base64.encodebytes(b'a,b\r\n' + b'1,2\r\n' * 100)) +
+                b'--' + BOUNDARY.encode() + b'--\r\n')
+        request = APIRequestFactory().post('/', body, content_type=MULTIPART_CONTENT)
+
+        result = self.parser.parse(BytesIO(body), MULTIPART_CONTENT, {'request': request})
+        self.assertEqual(result.data['event'], 'DjangoCon')
+        self.assertEqual(list(result.files['talks']), [{'a': '1', 'b': '2'}] * 100)
+
+    def test_parse_form_without_csv_file(self):
+        stream, result = self.parse({'event': 'DjangoCon'})
+
+        self.assertEqual(result.data['event'], 'DjangoCon')
+        self.assertEqual(len(result.files), 0)
+
+    def test_parse_errors(self):
+        request = APIRequestFactory().post('/', b'', content_type='multipart/form-data')
+        with self.assertRaises(ParseError):
+            self.parser.parse(BytesIO(b''), 'multipart/form-data', {'request': request})
+
+        with self.assertRaises(ParseError):
+            self.parse({'talks': SimpleUploadedFile('talks.csv', b'')})
+
+
+class TestDialectSniffing(TestCase):
+
+    def setUp(self):
+        dialect_cache.clear()
+
+    def test_sniff_delimiter(self):
+        samples = [
+            (b'a;b;c\r\n1;2,5;3\r\n4;5;"6;7"\r\n', ';'),
+            (b'a\tb\r\n1\t2\r\n3\t4', '\t'),
+            (b'a,b\n1,2\n3,4', ','),
+            (b'a|b\n', '|'),
+            (b'a\n1\n2\n', ','),
+            ('name;city\nJos\u00e9;M\u00e1laga\n'.encode('utf-8')[:-3], ';'),
+        ]
+        for sample, delimiter in samples:
+            self.assertEqual(sniff_delimiter(sample, 'utf-8'), delimiter)
+
+    def test_sniffed_delimiter_is_cached_by_key(self):
+        cache = DialectCache(maxsize=2)
+
+        self.assertEqual(sniff_delimiter(b'a;b\n1;2\n', 'utf-8', key='ana', cache=cache), ';')
+        with mock.patch('csv.Sniffer.sniff') as sniff:
+            self.assertEqual(sniff_delimiter(b'x;y\n1;2\n', 'utf-8', key='ana', cache=cache), ';')
+        sniff.assert_not_called()
+        # Not used when the delimiter isn't in the header
+        self.assertEqual(sniff_delimiter(b'x\ty\n1\t2\n', 'utf-8', key='ana', cache=cache), '\t')
+        self.assertEqual(cache.get('ana'), '\t')
+
+        sniff_delimiter(b'a,b\n', 'utf-8', key='bo', cache=cache)
+        sniff_delimiter(b'a,b\n', 'utf-8', key='cy', cache=cache)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('ana'))
+
+    def test_parsers_sniff_delimiter(self):
+        csv_file = b'name;score\r\nAna;1,5\r\nBo;"2;3"\r\n'
+        expected = [{'name': 'Ana', 'score': '1,5'}, {'name': 'Bo', 'score': '2;3'}]
+        parser_context = {'sniff_dialect': True}
+
+        for parser in (CSVParser(), CSVStreamingParser(), CSVMappedParser()):
+            data = parser.parse(BytesIO(csv_file), parser_context=parser_context)
+            self.assertEqual(list(data), expected)
+        data = CSVColumnarParser().parse(BytesIO(csv_file), parser_context=parser_context)
+        self.assertEqual(data, {'name': ['Ana', 'Bo'], 'score': ['1,5', '2;3']})
+        self.assertEqual(dialect_cache.get(b'name;score'), ';')
+
+        data = CSVParser().parse(BytesIO(csv_file), parser_context=dict(parser_context, delimiter=','))
+        self.assertEqual(data.header, ['name;score'])
+
+    def test_streaming_parser_sniffs_a_sample(self):
+        parser = CSVStreamingParser()
+        parser.sniff_dialect = True
+        parser.sniff_sample_size = 100
+        stream = BytesIO(b'a\tb\n' + b'1\t2\n' * 100000)
+
+        data = parser.parse(stream)
+        self.assertEqual(next(data), {'a': '1', 'b': '2'})
+        self.assertLessEqual(stream.tell(), parser.chunk_size)
+        self.assertEqual(len(list(data)), 99999)
+
+    def test_dialect_key(self):
+        class ClientParser(CSVParser):
+            sniff_dialect = True
+
+            def get_dialect_key(self, sample, parser_context):
+                return ('client', parser_context['client'])
+
+        parser = ClientParser()
+        parser.parse(BytesIO(b'a;b\n1;2\n'), parser_context={'client': 1})
+        self.assertEqual(dialect_cache.get(('client', 1)), ';')
+        with mock.patch('csv.Sniffer.sniff') as sniff:
+            data = parser.parse(BytesIO(b'c;d\n3;4\n'), parser_context={'client': 1})
+        sniff.assert_not_called()
+        self.assertEqual(data, [{'c': '3', 'd': '4'}])
+
+
+class TestCSVColumnarParser(TestCase):
+
+    def setUp(self):
+        self.parser = CSVColumnarParser()
+        self.parser.batch_size = 2
+        self.parser.chunk_size = 3
+
+    def test_parse_columns(self):
+        csv_file = b' v2 ,v1,v3\r\na,1,2.3\r\nb,4,5.6\r\nc,7,8.9\r\n'
+
+        data = self.parser.parse(BytesIO(csv_file))
+        self.assertIsInstance(data, OrderedColumns)
+        self.assertEqual(data.header, ['v2', 'v1', 'v3'])
+        self.assertEqual(list(data), ['v2', 'v1', 'v3'])
+        self.assertEqual(data, {'v2': ['a', 'b', 'c'], 'v1': ['1', '4', '7'],
+                                'v3': ['2.3', '5.6', '8.9']})
+        self.assertEqual(data.shape, (3, 3))
+
+    def test_parse_matches_csv_parser(self):
+        csv_files = [
+            b'Name,ID,Country\rKathryn Miller,67,United States\rJen Mark,78,Canada',
+            'col1;col2\r\nhello\u2014goodbye;"here;there"'.encode('utf-8'),
+            b'a,b\r\n' + b''.join(b'%d,%d\r\n' % (i, i * 2) for i in range(25)),
+        ]
+        for csv_file in csv_files:
+            context = {'delimiter': ';' if b';' in csv_file else ','}
+            data = self.parser.parse(BytesIO(csv_file), parser_context=context)
+            rows = CSVParser().parse(BytesIO(csv_file), parser_context=context)
+            self.assertEqual(data.header, rows.header)
+            self.assertEqual(data.row_count, len(rows))
+            self.assertEqual(data, {column: [row[column] for row in rows] for column in rows.header})
+
+    def test_parse_short_rows_and_blank_lines(self):
+        csv_file = b'a,b,c\r\n1,2,3\r\n\r\n4\r\n5,6,7,8\r\n\r\n'
+
+        data = self.parser.parse(BytesIO(csv_file))
+        self.assertEqual(data, {'a': ['1', '4', '5'], 'b': ['2', '', '6'], 'c': ['3', '', '7']})
+        self.assertEqual(data.shape, (3, 3))
+
+    def test_parse_column_types(self):
+        self.parser.column_types = {'id': 'int', 'active': 'bool'}
+        csv_file = b'id,active,name\r\n1,yes,a\r\n\r\n"x\r\ny",maybe,b\r\n3,,c\r\nz\r\n'
+
+        data = self.parser.parse(BytesIO(csv_file))
+        self.assertEqual(data, {'id': [1, 'xy', 3, 'z'], 'active': [True, 'maybe', None, None],
+                                'name': ['a', 'b', 'c', '']})
+        self.assertEqual([(error['line'], error['column'], error['value'])
+                          for error in data.conversion_errors],
+                         [(4, 'id', 'xy'), (4, 'active', 'maybe'), (7, 'id', 'z')])
+
+    def test_parse_unknown_columnar_format(self):
+        with self.assertRaises(ValueError):
+            self.parser.parse(BytesIO(b'a\r\n1\r\n'), parser_context={'columnar_format': 'numpy'})
+
+    @skipUnless(pandas, 'pandas is not installed')
+    def test_parse_pandas(self):
+        csv_file = b' v2 ;v1\r\na;1\r\nb;2\r\n'
+
+        data = self.parser.parse(BytesIO(csv_file), parser_context={
+            'columnar_format': 'pandas', 'delimiter': ';'})
+        self.assertIsInstance(data, pandas.DataFrame)
+        self.assertEqual(list(data.columns), ['v2', 'v1'])
+        self.assertEqual(data['v1'].tolist(), [1, 2])
+
+    @skipUnless(pyarrow, 'pyarrow is not installed')
+    def test_parse_arrow(self):
+        csv_file = b'v2;v1\r\na;1\r\nb;2\r\n'
+
+        data = self.parser.parse(BytesIO(csv_file), parser_context={
+            'columnar_format': 'arrow', 'delimiter': ';'})
+        self.assertIsInstance(data, pyarrow.Table)
+        self.assertEqual(data.column_names, ['v2', 'v1'])
+        self.assertEqual(data.column('v1').to_pylist(), [1, 2])
+
+
+class Talk(models.Model):
+    topic = models.CharField(max_length=100)
+    speaker = models.CharField(max_length=100)
+
+    class Meta:
+        app_label = 'rest_framework_csv'
+
+    @property
+    def words(self):
+        return self.topic.split()
+
+
+class TalkSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Talk
+        fields = ('topic', 'speaker')
+
+
+class TalkViewSet(CSVBulkCreateMixin, viewsets.ModelViewSet):
+    queryset = Talk.objects.all()
+    serializer_class = TalkSerializer
+    parser_classes = (CSVStreamingParser,)
+    authentication_classes = ()
+    permission_classes = ()
+    bulk_batch_size = 2
+
+
+class TestCSVBulkCreateMixin(TestCase):
+
+    def test_bulk_upload(self):
+        view = TalkViewSet.as_view({'post': 'bulk_upload'})
+        csv_file = (b'topic,speaker\r\n'
+                    b'Testing,Ana\r\n'
+                    b'Debugging,Aymeric\r\n'
+                    b'Profiling,Carlton\r\n')
+        request = APIRequestFactory().post('/talks/bulk_upload/', csv_file,
+                                           content_type='text/csv')
+
+        with self.assertNumQueries(6):  # An INSERT in a savepoint per batch
+            response = view(request)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data, {'created': 3, 'errors': []})
+        self.assertEqual(sorted(Talk.objects.values_list('topic', flat=True)),
+                         ['Debugging', 'Profiling', 'Testing'])
+
+    def test_bulk_upload_reports_errors_with_line_numbers(self):
+        view = TalkViewSet.as_view({'post': 'bulk_upload'})
+        csv_file = (b'topic,speaker\r\n'
+                    b'Testing,Ana\r\n'
+                    b'"Multi-line\r\ntopic",\r\n'
+                    b'Profiling,Carlton\r\n'
+                    b',Dana\r\n')
+        request = APIRequestFactory().post('/talks/bulk_upload/', csv_file,
+                                           content_type='text/csv')
+
+        response = view(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([error['line'] for error in response.data['errors']], [3, 6])
+        self.assertIn('speaker', response.data['errors'][0]['errors'])
+        self.assertIn('topic', response.data['errors'][1]['errors'])
+        self.assertEqual(Talk.objects.count(), 2)
+
+    def test_bulk_upload_without_valid_rows(self):
+        view = TalkViewSet.as_view({'post': 'bulk_upload'})
+        request = APIRequestFactory().post('/talks/bulk_upload/', b'topic,speaker\r\n,Ana\r\n',
+                                           content_type='text/csv')
+
+        response = view(request)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['created'], 0)
+
+    def test_bulk_upload_reports_integrity_errors_by_batch(self):
+        class UniqueTopicViewSet(TalkViewSet):
+            def perform_bulk_create(self, serializer, validated_data):
+                super(UniqueTopicViewSet, self).perform_bulk_create(serializer, validated_data)
+                if Talk.objects.filter(topic='Testing').count() > 1:
+                    raise IntegrityError('UNIQUE constraint failed: talk.topic')
+
+        view = UniqueTopicViewSet.as_view({'post': 'bulk_upload'})
+        csv_file = (b'topic,speaker\r\n'
+                    b'Testing,Ana\r\n'
+                    b'Debugging,Aymeric\r\n'
+                    b'Profiling,Carlton\r\n'
+                    b'Testing,Dana\r\n'
+                    b'Deploying,Eli\r\n')
+        request = APIRequestFactory().post('/talks/bulk_upload/', csv_file,
+                                           content_type='text/csv')
+
+        response = view(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'created': 3, 'errors': [{
+            'line': 4, 'end_line': 5,
+            'errors': {'non_field_errors': ['UNIQUE constraint failed: talk.topic']}}]})
+        self.assertEqual(sorted(Talk.objects.values_list('topic', flat=True)),
+                         ['Debugging', 'Deploying', 'Testing'])
+
+    def test_bulk_create_rows_from_parsed_rows(self):
+        view = TalkViewSet(request=None, format_kwarg=None)
+        rows = CSVParser().parse(BytesIO(b'topic,speaker\r\n"A\r\nB",Ana\r\n,Bob\r\n'))
+
+        created, errors = view.bulk_create_rows(rows)
+        self.assertEqual(created, 1)
+        self.assertEqual([error['line'] for error in errors], [4])
+
+
+class TalkPagination(PageNumberPagination):
+    page_size = 2
+
+
+class TalkExportViewSet(CSVStreamingExportMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Talk.objects.order_by('pk')
+    serializer_class = TalkSerializer
+    renderer_classes = (JSONRenderer, CSVStreamingRenderer)
+    pagination_class = TalkPagination
+    authentication_classes = ()
+    permission_classes = ()
+    export_batch_size = 2
+
+
+class TestKeysetBatches(TestCase):
+
+    def setUp(self):
+        Talk.objects.bulk_create([Talk(topic='Talk %d' % i, speaker='Speaker %d' % (i % 2))
+                                  for i in range(5)])
+
+    def test_batches(self):
+        with CaptureQueriesContext(connection) as queries:
+            batches = list(keyset_batches(Talk.objects.all(), batch_size=2))
+        self.assertEqual([[talk.topic for talk in batch] for batch in batches],
+                         [['Talk 0', 'Talk 1'], ['Talk 2', 'Talk 3'], ['Talk 4']])
+        self.assertEqual(len(queries), 3)
+        for query in queries:
+            self.assertNotIn('OFFSET', query['sql'])
+
+    def test_batches_in_descending_order_of_a_filtered_queryset(self):
+        queryset = Talk.objects.filter(speaker='Speaker 0')
+        batches = list(keyset_batches(queryset, batch_size=2, ordering='-topic'))
+        self.assertEqual([[talk.topic for talk in batch] for batch in batches],
+                         [['Talk 4', 'Talk 2'], ['Talk 0']])
+
+    def test_batches_in_the_order_of_the_queryset(self):
+        queryset = Talk.objects.order_by('-speaker')
+        batches = list(keyset_batches(queryset, batch_size=2))
+        self.assertEqual([[talk.topic for talk in batch] for batch in batches],
+                         [['Talk 1', 'Talk 3'], ['Talk 0', 'Talk 2'], ['Talk 4']])
+
+    def test_batches_ordered_by_a_nullable_field(self):
+        Venue.objects.bulk_create([Venue(name='Venue %d' % i, capacity=capacity)
+                                   for i, capacity in enumerate([300, None, 100, None, 300])])
+        for ordering in ['capacity', '-capacity', F('capacity').asc(nulls_last=True),
+                         F('capacity').desc(nulls_first=True), F('capacity').asc(nulls_first=True)]:
+            queryset = Venue.objects.order_by(ordering)
+            batches = list(keyset_batches(queryset, batch_size=2))
+            self.assertEqual([len(batch) for batch in batches], [2, 2, 1])
+            self.assertEqual([venue.name for batch in batches for venue in batch],
+                             [venue.name for venue in queryset.order_by(ordering, 'pk')])
+
+    def test_batches_ordered_by_an_expression(self):
+        queryset = Talk.objects.order_by(Lower('topic').desc())
+        with self.assertNumQueries(1):
+            batches = list(keyset_batches(queryset, batch_size=2))
+        self.assertEqual([[talk.topic for talk in batch] for batch in batches],
+                         [['Talk 4', 'Talk 3'], ['Talk 2', 'Talk 1'], ['Talk 0']])
+
+        batches = list(keyset_batches(Talk.objects.order_by('?'), batch_size=2))
+        self.assertEqual(sorted(talk.topic for batch in batches for talk in batch),
+                         ['Talk %d' % i for i in range(5)])
+
+    def test_batches_that_fill_the_last_batch(self):
+        with self.assertNumQueries(2):
+            batches = list(keyset_batches(Talk.objects.all(), batch_size=5))
+        self.assertEqual([len(batch) for batch in batches], [5])
+        self.assertEqual(list(keyset_batches(Talk.objects.none())), [])
+
+
+class TestCSVStreamingExportMixin(TestCase):
+
+    def setUp(self):
+        Talk.objects.bulk_create([Talk(topic='Talk %d' % i, speaker='Speaker %d' % (i % 2))
+                                  for i in range(5)])
+
+    def test_csv_export_streams_every_row(self):
+        view = TalkExportViewSet.as_view({'get': 'list'})
+        request = APIRequestFactory().get('/talks/', {'format': 'csv', 'page': 2})
+
+        with self.assertNumQueries(0):
+            response = view(request)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+
+        with self.assertNumQueries(3):  # One query per batch, and no COUNT
+            content = b''.join(response.streaming_content)
+        self.assertEqual(content, b'topic,speaker\r\n' + b''.join(
+            b'Talk %d,Speaker %d\r\n' % (i, i % 2) for i in range(5)))
+
+    def test_csv_export_keeps_the_requested_ordering(self):
+        view = TalkExportViewSet.as_view({'get': 'list'}, filter_backends=(OrderingFilter,))
+        request = APIRequestFactory().get('/talks/', {'format': 'csv', 'ordering': '-speaker'})
+
+        content = b''.join(view(request).streaming_content)
+        self.assertEqual(content, b'topic,speaker\r\n' + b''.join(
+            b'Talk %d,Speaker %d\r\n' % (i, i % 2) for i in [1, 3, 0, 2, 4]))
+
+    def test_csv_export_ordered_by_an_expression(self):
+        view = TalkExportViewSet.as_view({'get': 'list'}, queryset=Talk.objects.order_by(Lower('topic').desc()))
+        request = APIRequestFactory().get('/talks/', {'format': 'csv'})
+
+        content = b''.join(view(request).streaming_content)
+        self.assertEqual(content, b'topic,speaker\r\n' + b''.join(
+            b'Talk %d,Speaker %d\r\n' % (i, i % 2) for i in [4, 3, 2, 1, 0]))
+
+    def test_csv_export_keeps_every_item_of_list_fields(self):
+        class TalkWordsSerializer(TalkSerializer):
+            words = serializers.ListField(child=serializers.CharField())
+
+            class Meta(TalkSerializer.Meta):
+                fields = ('topic', 'words')
+
+        Talk.objects.create(topic='Testing in production', speaker='Speaker 5')
+        view = TalkExportViewSet.as_view({'get': 'list'}, serializer_class=TalkWordsSerializer)
+        request = APIRequestFactory().get('/talks/', {'format': 'csv'})
+
+        content = b''.join(view(request).streaming_content)
+        self.assertTrue(content.startswith(b'topic,words.0,words.1,words.2\r\n'))
+        self.assertTrue(content.endswith(b'Testing in production,Testing,in,production\r\n'))
+
+    def test_other_formats_are_paginated(self):
+        view = TalkExportViewSet.as_view({'get': 'list'})
+        response = view(APIRequestFactory().get('/talks/')).render()
+
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(len(response.data['results']), 2)
+
+
+class TalkCachedExportViewSet(CSVCachedExportMixin, TalkExportViewSet):
+    pass
+
+
+class TestParseRange(TestCase):
+
+    def test_byte_ranges(self):
+        self.assertEqual(parse_range('bytes=0-9', 100), (0, 10))
+        self.assertEqual(parse_range('bytes=90-200', 100), (90, 100))
+        self.assertEqual(parse_range('bytes=40-', 100), (40, 100))
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 100))
+        self.assertEqual(parse_range('bytes=-200', 100), (0, 100))
+
+    def test_ignored_ranges(self):
+        self.assertIsNone(parse_range(None, 100))
+        self.assertIsNone(parse_range('bytes=0-9,20-29', 100))
+        self.assertIsNone(parse_range('bytes=9-0', 100))
+        self.assertIsNone(parse_range('lines=0-9', 100))
+        self.assertIsNone(parse_range('bytes=-', 100))
+
+    def test_unsatisfiable_ranges(self):
+        for range_header, size in [('bytes=100-', 100), ('bytes=-0', 100), ('bytes=-10', 0)]:
+            with self.assertRaises(ValueError):
+                parse_range(range_header, size)
+
+
+class TestCSVCachedExportMixin(TestCase):
+
+    def setUp(self):
+        Talk.objects.bulk_create([Talk(topic='Talk %d' % i, speaker='Speaker %d' % (i % 2))
+                                  for i in range(5)])
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location)
+        self.storage = FileSystemStorage(location=self.location)
+        patcher = mock.patch.object(TalkCachedExportViewSet, 'export_storage', self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.clear()
+        self.expected = b'topic,speaker\r\n' + b''.join(
+            b'Talk %d,Speaker %d\r\n' % (i, i % 2) for i in range(5))
+
+    def get(self, params=None, **headers):
+        view = TalkCachedExportViewSet.as_view({'get': 'list'})
+        params = dict({'format': 'csv'}, **(params or {}))
+        return view(APIRequestFactory().get('/talks/', params, **headers))
+
+    def test_export_is_rendered_once(self):
+        with self.assertNumQueries(3):
+            response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Length'], str(len(self.expected)))
+        self.assertEqual(b''.join(response.streaming_content), self.expected)
+
+        Talk.objects.all().delete()
+        with self.assertNumQueries(0):
+            repeat = self.get()
+        self.assertEqual(repeat['ETag'], response['ETag'])
+        self.assertEqual(b''.join(repeat.streaming_content), self.expected)
+
+        # Other query parameters are another export
+        other = self.get({'search': 'x'})
+        self.assertNotEqual(other['ETag'], response['ETag'])
+        self.assertEqual(b''.join(other.streaming_content), b'topic,speaker\r\n')
+
+    def test_range_requests(self):
+        etag = self.get()['ETag']
+
+        response = self.get(HTTP_RANGE='bytes=15-29')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 15-29/%d' % len(self.expected))
+        self.assertEqual(b''.join(response.streaming_content), self.expected[15:30])
+
+        response = self.get(HTTP_RANGE='bytes=-5', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.expected[-5:])
+
+        response = self.get(HTTP_RANGE='bytes=15-', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.expected)
+
+        response = self.get(HTTP_RANGE='bytes=1000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */%d' % len(self.expected))
+
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_expired_exports_are_rendered_again(self):
+        first = self.get()
+        cache.clear()
+        second = self.get()
+        self.assertNotEqual(first['ETag'], second['ETag'])
+        self.assertEqual(len(os.listdir(os.path.join(self.location, 'csv-exports'))), 2)
+
+        self.assertEqual(delete_expired_exports(self.storage, 'csv-exports', 3600), 0)
+        self.assertEqual(delete_expired_exports(self.storage, 'csv-exports', -1), 2)
+        self.assertEqual(delete_expired_exports(self.storage, 'missing', 0), 0)
+
+        # The cache still points at a deleted file
+        response = self.get()
+        self.assertEqual(b''.join(response.streaming_content), self.expected)
+
+    def test_export_files_have_random_names(self):
+        key = 'rest_framework_csv.export.talks'
+        with mock.patch.object(TalkCachedExportViewSet, 'get_export_key', return_value=key):
+            self.get()
+            cache.clear()
+            self.get()
+
+        filenames = os.listdir(os.path.join(self.location, 'csv-exports'))
+        self.assertEqual(len(filenames), 2)
+        self.assertNotEqual(filenames[0], filenames[1])
+        for filename in filenames:
+            self.assertNotIn('talks', filename)
+
+    def test_export_storage_must_be_set(self):
+        with mock.patch.object(TalkCachedExportViewSet, 'export_storage', None):
+            with self.assertRaises(ImproperlyConfigured):
+                self.get()
+
+    def test_other_formats_are_paginated(self):
+        view = TalkCachedExportViewSet.as_view({'get': 'list'})
+        response = view(APIRequestFactory().get('/talks/')).render()
+        self.assertEqual(len(response.data['results']), 2)
+
+
+class DeferredExecutor(Executor):
+    """
+    Runs the submitted jobs in the current thread, when asked to.
+    """
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        self.jobs.append((future, fn, args, kwargs))
+        return future
+
+    def run_jobs(self):
+        while self.jobs:
+            future, fn, args, kwargs = self.jobs.pop(0)
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as exc:
+                future.set_exception(exc)
+
+
+class TalkBackgroundExportViewSet(CSVBackgroundExportMixin, TalkExportViewSet):
+    export_async_threshold = 3
+
+
+router = SimpleRouter()
+router.register('talks', TalkBackgroundExportViewSet, basename='talk')
+urlpatterns = router.urls + format_suffix_patterns(
+    [path('export', CSVExportView.as_view())], allowed=['csv', 'csv.gz'])
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class TestCSVBackgroundExportMixin(TestCase):
+
+    def setUp(self):
+        Talk.objects.bulk_create([Talk(topic='Talk %d' % i, speaker='Speaker %d' % (i % 2))
+                                  for i in range(5)])
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location)
+        self.executor = DeferredExecutor()
+        for name, value in [('export_storage', FileSystemStorage(location=self.location)),
+                            ('export_executor', self.executor)]:
+            patcher = mock.patch.object(TalkBackgroundExportViewSet, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        cache.clear()
+        self.expected = b'topic,speaker\r\n' + b''.join(
+            b'Talk %d,Speaker %d\r\n' % (i, i % 2) for i in range(5))
+
+    def test_large_exports_are_rendered_in_the_background(self):
+        response = self.client.get('/talks/', {'format': 'csv'})
+        self.assertEqual(response.status_code, 202)
+        url = response.json()['url']
+        self.assertEqual(response['Location'], url)
+        self.assertEqual(len(self.executor.jobs), 1)
+
+        # The same export gets the same job
+        self.assertEqual(self.client.get('/talks/', {'format': 'csv'}).json()['url'], url)
+        self.assertEqual(len(self.executor.jobs), 1)
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json(), {'status': 'pending'})
+
+        self.executor.run_jobs()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(b''.join(response.streaming_content), self.expected)
+
+        response = self.client.get(url, HTTP_RANGE='bytes=0-4')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'topic')
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/talks/', {'format': 'csv'})
+        self.assertEqual(b''.join(response.streaming_content), self.expected)
+
+    def test_small_exports_are_rendered_in_the_request(self):
+        Talk.objects.filter(pk__gt=Talk.objects.order_by('pk')[1].pk).delete()
+        response = self.client.get('/talks/', {'format': 'csv'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content).count(b'\r\n'), 3)
+        self.assertEqual(self.executor.jobs, [])
+
+    def test_failed_jobs(self):
+        url = self.client.get('/talks/', {'format': 'csv'}).json()['url']
+        with mock.patch.object(TalkBackgroundExportViewSet, 'render_export', side_effect=IOError), \
+                self.assertLogs('rest_framework_csv.mixins', 'ERROR'):
+            self.executor.run_jobs()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json(), {'status': 'failed'})
+
+        # The export can be requested again
+        self.assertNotEqual(self.client.get('/talks/', {'format': 'csv'}).json()['url'], url)
+
+    def test_unknown_jobs(self):
+        response = self.client.get('/talks/export-jobs/%s/' % ('0' * 32))
+        self.assertEqual(response.status_code, 404)
+
+
+class Venue(models.Model):
+    name = models.CharField(max_length=100)
+    capacity = models.IntegerField(null=True)
+    short_name = models.CharField(max_length=20, blank=True)
+
+    class Meta:
+        app_label = 'rest_framework_csv'
+
+
+class Session(models.Model):
+    title = models.CharField(max_length=100)
+    venue = models.ForeignKey(Venue, on_delete=models.CASCADE)
+
+    class Meta:
+        app_label = 'rest_framework_csv'
+
+
+class VenueSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Venue
+        fields = ('name', 'capacity')
+
+
+class SessionSerializer(serializers.ModelSerializer):
+    venue = VenueSerializer()
+
+    class Meta:
+        model = Session
+        fields = ('id', 'title', 'venue')
+
+
+class SessionExportViewSet(CSVStreamingExportMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Session.objects.select_related('venue')
+    serializer_class = SessionSerializer
+    renderer_classes = (CSVStreamingRenderer,)
+    authentication_classes = ()
+    permission_classes = ()
+
+
+class TestQuerySetRendering(TestCase):
+
+    def setUp(self):
+        venues = [Venue.objects.create(name='Hall A', capacity=300),
+                  Venue.objects.create(name='Room, "B"', capacity=None)]
+        Session.objects.bulk_create([Session(title='Session %d' % i, venue=venues[i % 2])
+                                     for i in range(5)])
+        self.header = ['id', 'title', 'venue.name', 'venue.capacity']
+
+    def test_render_queryset_like_serialized_data(self):
+        renderer = CSVRenderer()
+        queryset = Session.objects.order_by('pk')
+        renderer_context = {'header': self.header, 'labels': {'venue.name': 'Venue'}}
+
+        with self.assertNumQueries(1):
+            dump = renderer.render(queryset, renderer_context=renderer_context)
+        serialized = SessionSerializer(queryset.select_related('venue'), many=True).data
+        self.assertEqual(dump, renderer.render(serialized, renderer_context=renderer_context))
+        self.assertTrue(dump.startswith(b'id,title,Venue,venue.capacity\r\n'))
+
+    def test_render_empty_queryset(self):
+        renderer = CSVRenderer()
+        dump = renderer.render(Session.objects.none(), renderer_context={'header': ['title']})
+        self.assertEqual(dump, b'title\r\n')
+
+    def test_render_queryset_without_header(self):
+        renderer = CSVRenderer()
+        with self.assertRaises(ValueError):
+            renderer.render(Session.objects.all())
+
+    def test_render_queryset_with_underscores(self):
+        renderer = CSVRendererWithUnderscores()
+        Venue.objects.update(short_name='A')
+        renderer_context = {'header': ['title', 'venue_name', 'venue_short_name']}
+
+        dump = renderer.render(Session.objects.order_by('pk'), renderer_context=renderer_context)
+        self.assertTrue(dump.startswith(b'title,venue_name,venue_short_name\r\nSession 0,Hall A,A\r\n'))
+
+    def test_column_lookups(self):
+        self.assertEqual(column_lookup(Session, 'venue.short_name'), 'venue__short_name')
+        self.assertEqual(column_lookup(Session, 'venue_short_name', '_'), 'venue__short_name')
+        self.assertEqual(column_lookup(Session, 'venue_id', '_'), 'venue_id')
+        self.assertEqual(column_lookup(Session, 'pk'), 'pk')
+        self.assertIsNone(column_lookup(Session, 'venue.city'))
+        self.assertIsNone(column_lookup(Session, 'title.name'))
+        self.assertIsNone(column_lookup(Venue, 'session'))
+
+    def test_render_queryset_with_unknown_columns(self):
+        renderer = CSVRenderer()
+        with self.assertRaises(ValueError):
+            renderer.render(Session.objects.all(), renderer_context={'header': ['title', 'room']})
+
+    def test_export_values(self):
+        request = APIRequestFactory().get('/sessions/', {'format': 'csv'})
+        expected = b''.join(SessionExportViewSet.as_view({'get': 'list'})(request).streaming_content)
+
+        with mock.patch.object(SessionExportViewSet, 'export_values', True):
+            response = SessionExportViewSet.as_view({'get': 'list'})(request)
+            with self.assertNumQueries(1):
+                content = b''.join(response.streaming_content)
+        self.assertEqual(content, expected)
+        self.assertEqual(content.count(b'\r\n'), 6)
+
+    def test_export_values_with_unknown_columns(self):
+        class RoomSerializer(SessionSerializer):
+            room = serializers.SerializerMethodField()
+
+            class Meta(SessionSerializer.Meta):
+                fields = SessionSerializer.Meta.fields + ('room',)
+
+            def get_room(self, session):
+                return session.venue.name.upper()
+
+        class RoomRenderer(CSVStreamingRenderer):
+            header = ['title', 'venue.name', 'room']
+
+        request = APIRequestFactory().get('/sessions/', {'format': 'csv'})
+        view = SessionExportViewSet.as_view({'get': 'list'}, serializer_class=RoomSerializer,
+                                            renderer_classes=(RoomRenderer,), export_values=True)
+
+        with mock.patch.object(RoomRenderer, 'queryset_rows') as queryset_rows:
+            response = view(request)
+            content = b''.join(response.streaming_content)
+        queryset_rows.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(content.startswith(b'title,venue.name,room\r\nSession 0,Hall A,HALL A\r\n'))
+        self.assertEqual(content.count(b'\r\n'), 6)
+
+
+class TestMetrics(TestCase):
+
+    def setUp(self):
+        self.data = [{'a': i, 'b': {'x': 'hello—goodbye'}} for i in range(10)]
+
+    def test_no_metrics_by_default(self):
+        renderer = CSVRenderer()
+        with mock.patch.object(renderer, 'report_metrics') as report_metrics:
+            renderer.render(self.data)
+            b''.join(CSVStreamingRenderer().render(self.data))
+            CSVParser().parse(BytesIO(b'a\r\n1\r\n'))
+        report_metrics.assert_not_called()
+
+    def test_render_metrics(self):
+        renderer = CSVRenderer()
+        with mock.patch.object(renderer, 'report_metrics') as report_metrics:
+            dump = renderer.render(self.data, renderer_context={'collect_metrics': True})
+
+        metrics, = report_metrics.call_args[0]
+        self.assertEqual(metrics.operation, 'render')
+        self.assertIs(metrics.sender, renderer)
+        self.assertEqual((metrics.rows, metrics.columns), (10, 2))
+        self.assertEqual(metrics.bytes, len(dump))
+        self.assertEqual(metrics.peak_buffer, len(dump))
+        self.assertEqual(set(metrics.timings), {'header', 'flatten', 'write', 'total'})
+        self.assertAlmostEqual(metrics.timings['total'],
+                               sum(metrics.timings.values()) - metrics.timings['total'])
+
+    def test_render_signal(self):
+        received = []
+
+        def receiver(sender, metrics, **kwargs):
+            received.append((sender, metrics))
+
+        csv_rendered.connect(receiver, sender=CSVRenderer)
+        self.addCleanup(csv_rendered.disconnect, receiver, sender=CSVRenderer)
+
+        CSVRenderer().render(self.data)
+        PaginatedCSVRenderer().render({'results': self.data})
+        self.assertEqual(len(received), 1)
+        self.assertEqual(received[0][0], CSVRenderer)
+        self.assertEqual(received[0][1].rows, 10)
+
+    def test_streaming_metrics(self):
+        renderer = CSVStreamingRenderer()
+        renderer.collect_metrics = True
+
+        with mock.patch.object(renderer, 'report_metrics') as report_metrics:
+            dump = renderer.render(self.data, renderer_context={'chunk_size': 4})
+            chunks = [next(dump)]
+            report_metrics.assert_not_called()
+            chunks.extend(dump)
+
+        metrics, = report_metrics.call_args[0]
+        self.assertEqual(metrics.operation, 'stream')
+        self.assertEqual((metrics.rows, metrics.columns), (10, 2))
+        self.assertEqual(metrics.bytes, sum(map(len, chunks)))
+        self.assertEqual(metrics.peak_buffer, max(map(len, chunks)))
+        self.assertTrue(metrics.complete)
+        self.assertLessEqual(metrics.time_to_first_byte, metrics.timings['total'])
+        self.assertEqual(set(metrics.timings), {'header', 'flatten', 'write', 'send', 'total'})
+
+    def test_streaming_metrics_when_closed_early(self):
+        renderer = CSVStreamingRenderer()
+        renderer.collect_metrics = True
+
+        with mock.patch.object(renderer, 'report_metrics') as report_metrics:
+            chunks = renderer.render(self.data)
+            next(chunks)
+            next(chunks)
+            chunks.close()
+
+        metrics, = report_metrics.call_args[0]
+        self.assertFalse(metrics.complete)
+        self.assertEqual(metrics.rows, 1)
+
+    async def test_async_streaming_metrics(self):
+        renderer = CSVAsyncStreamingRenderer()
+        renderer.collect_metrics = True
+        renderer.batch_size = 4
+
+        with mock.patch.object(renderer, 'report_metrics') as report_metrics:
+            dump = b''.join([chunk async for chunk in renderer.render(self.data)])
+
+        metrics, = report_metrics.call_args[0]
+        self.assertEqual((metrics.rows, metrics.columns), (10, 2))
+        self.assertEqual(metrics.bytes, len(dump))
+        self.assertIn('fetch', metrics.timings)
+
+    def test_parse_metrics(self):
+        parser = CSVParser()
+        csv_file = b'v1,v2,v3\r\na,1,2.3\r\nb,4,5.6\r\n'
+
+        with mock.patch.object(parser, 'report_metrics') as report_metrics:
+            parser.parse(BytesIO(csv_file), parser_context={'collect_metrics': True})
+
+        metrics, = report_metrics.call_args[0]
+        self.assertEqual(metrics.operation, 'parse')
+        self.assertEqual((metrics.rows, metrics.columns, metrics.bytes), (2, 3, len(csv_file)))
+        self.assertEqual(set(metrics.timings), {'read', 'parse', 'total'})
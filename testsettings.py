@@ -8,8 +8,11 @@ DATABASES = {
 }
 
 INSTALLED_APPS = (
+    'django.contrib.auth',
     'django.contrib.contenttypes',
     'rest_framework_csv',
 )
 
+DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
+
 SECRET_KEY = 'testsecretkey'